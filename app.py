@@ -4,7 +4,6 @@ import os
 from pathlib import Path
 import time
 from typing import Optional
-import json
 import uuid
 import httpx
 
@@ -12,110 +11,147 @@ import httpx
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from data.extract_sleeper_data import main as extract_data
+from data.league_loader import loader as league_loader
+from frontend import streaming
 
 LANGGRAPH_SERVER_URL = os.getenv("LANGGRAPH_SERVER_URL")
 SUPABASE_KEY=os.getenv("SUPABASE_KEY", None)
 SUPABASE_URL=os.getenv("SUPABASE_API_URL", None)
 
-def _load_base_system_prompt() -> str:
-    """
-    Load the canonical system prompt markdown from the prompts package.
-
-    Note: in your repo this file is `buddy/prompts/buddy.md` (you referred to it as prompt.md).
-    """
-    prompt_path = project_root / "buddy" / "prompts" / "buddy.md"
-    try:
-        return prompt_path.read_text(encoding="utf-8")
-    except Exception:
-        # If anything goes wrong, fall back to empty and still include user context.
-        return ""
-
-def _build_user_context_system_prompt(username: str | None, league_id: str | None) -> str:
-    username_str = (username or "").strip() or "unknown"
-    league_id_str = (league_id or "").strip() or "unknown"
-    return (
-        "Context for this conversation:\n"
-        f"- Display Name: {username_str}\n"
-        f"- Sleeper league_id: {league_id_str}\n\n"
-        "You should tailor answers, SQL queries, and analysis to this league_id's data in the database "
-        "and communicate as if you are assisting this specific user."
-    )
-
-
-def _lg_process_line(line: str, current_event: str) -> str | None:
-    """Parse one SSE line from LangGraph /runs/stream into printable text chunks."""
-    if not line.startswith("data: "):
-        return None
-    data_content = line[6:]
-    if current_event != "messages":
-        return None
-
-    message_chunk, metadata = json.loads(data_content)
+# Messages drawn per history page; older ones stay off the page until asked for
+HISTORY_PAGE = 20
+# Rows kept per markdown table once an answer has moved into the history
+HISTORY_TABLE_ROWS = 25
 
-    if message_chunk.get("type") == "AIMessageChunk":
-        rm = message_chunk.get("response_metadata") or {}
-        if rm.get("finish_reason") == "tool_calls":
-            return "\n\n"
+def _history_markdown(content: str) -> str:
+    """Markdown for a message in the history, with long tables cut to `HISTORY_TABLE_ROWS` rows.
 
-        tool_call_chunks = message_chunk.get("tool_call_chunks") or []
-        if tool_call_chunks:
-            return None
-
-        return message_chunk.get("content", "")
-    return None
-
-
-def _lg_create_thread(user_id: str) -> dict:
+    The full table was shown when the answer streamed in; redrawing hundreds of rows for every old message is what
+    made long sessions slow.
+    """
+    out, table_rows, hidden = [], 0, 0
+    for line in content.splitlines():
+        if line.lstrip().startswith("|"):
+            table_rows += 1
+            # Header and separator rows come first
+            if table_rows > HISTORY_TABLE_ROWS + 2:
+                hidden += 1
+                continue
+        else:
+            if hidden:
+                out.append(f"\n_… {hidden} more rows_\n")
+            table_rows, hidden = 0, 0
+        out.append(line)
+    if hidden:
+        out.append(f"\n_… {hidden} more rows_")
+    return "\n".join(out)
+
+
+@st.fragment
+def _chat_history():
+    """Draw the last `history_shown` messages. Paging only reruns this fragment, not the whole page."""
+    messages = st.session_state.messages
+    shown = min(st.session_state.history_shown, len(messages))
+    if shown < len(messages):
+        if st.button(f"Show earlier messages ({len(messages) - shown} hidden)", key="history_more"):
+            st.session_state.history_shown += HISTORY_PAGE
+            st.rerun(scope="fragment")
+    for message in messages[len(messages) - shown:]:
+        # Rendered once per message and kept with it
+        if "markdown" not in message:
+            message["markdown"] = _history_markdown(message["content"])
+        with st.chat_message(message["role"]):
+            st.markdown(message["markdown"])
+            if message.get("usage"):
+                st.caption(message["usage"])
+
+
+def _lg_client() -> httpx.Client:
+    """The process-wide pooled client for the LangGraph server, shared by every Streamlit session."""
     if not LANGGRAPH_SERVER_URL:
         raise RuntimeError("LANGGRAPH_SERVER_URL is not set.")
-    with httpx.Client(timeout=120.0) as client:
-        resp = client.post(
-            url=f"{LANGGRAPH_SERVER_URL}/threads",
-            json={
-                "thread_id": str(uuid.uuid4()),
-                "metadata": {"user_id": user_id},
-                "if_exists": "do_nothing",
-            },
-        )
-        resp.raise_for_status()
-        return resp.json()
+    return streaming.client(LANGGRAPH_SERVER_URL)
 
 
-def _lg_stream(thread_id: str, message: str, *, username: str | None, league_id: str | None):
-    """Yield assistant text chunks from LangGraph server streaming endpoint."""
-    if not LANGGRAPH_SERVER_URL:
-        raise RuntimeError("LANGGRAPH_SERVER_URL is not set.")
+def _lg_create_thread(user_id: str) -> dict:
+    resp = _lg_client().post(
+        "/threads",
+        json={
+            "thread_id": str(uuid.uuid4()),
+            "metadata": {"user_id": user_id},
+            "if_exists": "do_nothing",
+        },
+        timeout=120.0,  # Render may need to spin the server up
+    )
+    resp.raise_for_status()
+    return resp.json()
 
-    base_prompt = _load_base_system_prompt()
-    user_context = _build_user_context_system_prompt(username=username, league_id=league_id)
-    system_prompt = (base_prompt.strip() + "\n\n" + user_context.strip()).strip()
-    current_event: str | None = None
-    with httpx.Client(timeout=60.0) as client:
-        with client.stream(
-            "POST",
-            url=f"{LANGGRAPH_SERVER_URL}/threads/{thread_id}/runs/stream",
+
+def _lg_prefetch(username: str | None, league_id: str) -> None:
+    """Ask the server to compute the common league summaries in a background stateless run."""
+    try:
+        _lg_client().post(
+            "/runs",
             json={
                 "assistant_id": "buddy",
-                "input": {
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "human", "content": message},
-                    ]
-                },
-                "stream_mode": "messages-tuple",
+                "input": {"prefetch": True, "username": username or "", "league_id": league_id},
+                "on_completion": "delete",
             },
-        ) as r:
-            r.raise_for_status()
-            for line in r.iter_lines():
-                if not line:
-                    continue
-                if line.startswith("event: "):
-                    current_event = line[7:].strip()
-                    continue
-                chunk = _lg_process_line(line, current_event or "")
-                if chunk:
-                    yield chunk
+            timeout=10.0,
+        ).raise_for_status()
+    except Exception:
+        # Prefetch only warms caches; the first answer is just slower without it
+        pass
+
+
+def _lg_usage(thread_id: str) -> str:
+    """Return a one-line token/latency summary of the thread's last run, or "" if unavailable."""
+    try:
+        resp = _lg_client().get(f"/threads/{thread_id}/state", timeout=10.0)
+        resp.raise_for_status()
+        usage = (resp.json().get("values") or {}).get("usage") or {}
+    except Exception:
+        return ""
+    turn, thread = usage.get("turn"), usage.get("thread", {})
+    if not turn:
+        return ""
+    text = (
+        f"{turn['input_tokens']:,} input / {turn['output_tokens']:,} output tokens · {turn['seconds']}s · "
+        f"conversation total {thread.get('input_tokens', 0) + thread.get('output_tokens', 0):,} tokens"
+    )
+    if usage.get("budget_exceeded"):
+        text += " · stopped early (usage limit)"
+    return text
+
+
+def _tool_status(event: dict) -> str:
+    """One-line status for a tool lifecycle event."""
+    tool = event.get("tool", "tool")
+    kind = event.get("event")
+    if kind == "started":
+        return f"Running {tool}..."
+    if kind == "progress":
+        return f"Running {tool}... {event['rows']:,} rows fetched"
+    if kind == "preview":
+        return f"Running {tool}... first rows below"
+    seconds = event.get("duration_ms", 0) / 1000
+    if event.get("status") == "error":
+        return f"{tool} failed after {seconds:.1f}s"
+    rows = f"{event['rows']:,} rows in " if event.get("rows") is not None else ""
+    return f"{tool} finished: {rows}{seconds:.1f}s"
+
+
+def _lg_stream(thread_id: str, message: str, *, context: dict | None = None):
+    """Yield ("text", str) assistant chunks and ("tool", dict) tool events from the LangGraph streaming endpoint.
+
+    The graph owns the system prompt. `context` (username and league_id) only needs to be sent with a thread's
+    first message; the graph keeps it in the thread state.
+    """
+    body = streaming.run_request(message, context=context)
+    for kind, payload in streaming.stream_run(_lg_client(), thread_id, body):
+        # The tool lifecycle events say more than the tool name
+        if kind != "tool_call":
+            yield kind, payload
 
 # Page configuration
 st.set_page_config(
@@ -269,6 +305,10 @@ if 'messages' not in st.session_state:
     st.session_state.messages = []
 if 'thread_id' not in st.session_state:
     st.session_state.thread_id = "1"
+if 'history_shown' not in st.session_state:
+    st.session_state.history_shown = HISTORY_PAGE
+if 'context_sent_for' not in st.session_state:
+    st.session_state.context_sent_for = None
 if 'use_langgraph_server' not in st.session_state:
     st.session_state.use_langgraph_server = bool(LANGGRAPH_SERVER_URL)
 
@@ -306,12 +346,17 @@ if not st.session_state.data_loaded:
                     status_text = st.empty()
                     
                     try:
-                        # Update progress
-                        status_text.text("Fetching league information...")
-                        progress_bar.progress(10)
-                        
-                        # Run data extraction
-                        extract_data(username=st.session_state.username, league_id=st.session_state.league_id)
+                        # Sessions loading the same league share one ingest and its progress
+                        job = league_loader.load(
+                            st.session_state.league_id,
+                            username=st.session_state.username,
+                        )
+                        while not job.wait(timeout=0.25):
+                            progress_bar.progress(job.percent)
+                            status_text.text(job.step)
+                        job.result()
+                        if st.session_state.use_langgraph_server:
+                            _lg_prefetch(st.session_state.username, st.session_state.league_id)
                         
                         progress_bar.progress(100)
                         status_text.text("Data loaded successfully!")
@@ -349,23 +394,20 @@ else:
     st.markdown("### Chat with Buddy")
     
     # Display chat history using Streamlit's chat components
-    for message in st.session_state.messages:
-        if message["role"] == "user":
-            with st.chat_message("user"):
-                st.write(message["content"])
-        else:
-            with st.chat_message("assistant"):
-                st.write(message["content"])
+    _chat_history()
     
     # Chat input
     user_input = st.chat_input("Ask Buddy about your fantasy league...")
     
     if user_input:
-        # Add user message to history
+        # Add user message to history. The new exchange is drawn below the history in this run, so there's no
+        # need to rerun and redraw everything once the answer has streamed.
         st.session_state.messages.append({
             "role": "user",
             "content": user_input
         })
+        with st.chat_message("user"):
+            st.markdown(user_input)
 
         full_response_parts: list[str] = []
         try:
@@ -375,21 +417,38 @@ else:
                         "LANGGRAPH_SERVER_URL is not set, so deployed thread-based chat is unavailable. "
                         "Set LANGGRAPH_SERVER_URL (Render LangGraph API URL) and restart."
                     )
-                for chunk in _lg_stream(
-                    st.session_state.thread_id,
-                    user_input,
-                    username=st.session_state.username,
-                    league_id=st.session_state.league_id,
-                ):
-                    full_response_parts.append(chunk)
-                    yield chunk
+                context = None
+                if st.session_state.context_sent_for != st.session_state.thread_id:
+                    context = {
+                        "username": st.session_state.username or "",
+                        "league_id": st.session_state.league_id or "",
+                    }
+                for kind, payload in _lg_stream(st.session_state.thread_id, user_input, context=context):
+                    if kind == "tool":
+                        tool_status.caption(_tool_status(payload))
+                        if payload.get("event") == "preview":
+                            tool_preview.markdown(payload["preview"])
+                        elif payload.get("event") == "finished":
+                            tool_preview.empty()
+                        continue
+                    full_response_parts.append(payload)
+                    yield payload
+                # The thread state now holds the user context
+                st.session_state.context_sent_for = st.session_state.thread_id
 
             with st.chat_message("assistant"):
+                # Tool progress is shown above the answer while query results are fetched
+                tool_status = st.empty()
+                tool_preview = st.empty()
                 st.write_stream(response_generator())
+                usage = _lg_usage(st.session_state.thread_id)
+                if usage:
+                    st.caption(usage)
 
             st.session_state.messages.append({
                 "role": "assistant",
-                "content": "".join(full_response_parts)
+                "content": "".join(full_response_parts),
+                "usage": usage,
             })
 
         except Exception as e:
@@ -397,9 +456,6 @@ else:
             with st.chat_message("assistant"):
                 st.error(error_msg)
             st.session_state.messages.append({"role": "assistant", "content": error_msg})
-        
-        # Rerun to show the complete conversation
-        st.rerun()
     
     # Sidebar with reset option
     with st.sidebar:
@@ -409,7 +465,9 @@ else:
             st.session_state.username = None
             st.session_state.league_id = None
             st.session_state.messages = []
+            st.session_state.history_shown = HISTORY_PAGE
             st.session_state.thread_id = "1"
+            st.session_state.context_sent_for = None
             st.rerun()
         
         st.markdown("---")
@@ -0,0 +1,213 @@
+"""
+Offline end-to-end agent benchmark.
+
+Runs the real `Agent` graph over the questions in `benchmarks/scenarios.json`. The LLM is replaced by
+`buddy.fake_llm.ScriptedChatModel`, which replays each scenario's recorded tool calls. `query_db` runs against a
+local Postgres loaded with `benchmarks/fixtures.py`. Results are deterministic apart from timing, so the numbers can
+gate CI.
+
+For each scenario it reports the median turn latency split into:
+- LLM time: wall time inside (fake) model calls, set by `--ttft` and `--token-latency`
+- tool time: wall time inside tool calls (concurrent calls counted once)
+- overhead: everything else (graph scheduling, schema and prompt assembly, compaction, state updates)
+
+It also reports input and output tokens per turn and peak traced memory. Memory is measured in a separate pass,
+because tracemalloc slows down the timed runs.
+
+Usage:
+    python benchmarks/fixtures.py postgresql+psycopg2://postgres@localhost:5432/buddy_bench
+    python benchmarks/agent_e2e.py --database-url postgresql+psycopg2://postgres@localhost:5432/buddy_bench
+    python benchmarks/agent_e2e.py ... --write-baseline benchmarks/baseline.json
+    python benchmarks/agent_e2e.py ... --baseline benchmarks/baseline.json   # exits 1 on a regression
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+SCENARIOS = Path(__file__).resolve().parent / "scenarios.json"
+
+# metric -> absolute slack added on top of the relative tolerance when comparing against a baseline
+CHECKED_METRICS = {
+    "total_ms": 10.0,
+    "overhead_ms": 5.0,
+    "tool_ms": 10.0,
+    "input_tokens": 0,
+    "output_tokens": 0,
+    "peak_kib": 256.0,
+}
+
+
+def _union_ms(intervals: list[tuple[float, float]]) -> float:
+    """Total time covered by possibly overlapping intervals, in milliseconds."""
+    total, end = 0.0, float("-inf")
+    for start, stop in sorted(intervals):
+        if stop <= end:
+            continue
+        total += stop - max(start, end)
+        end = stop
+    return total * 1000
+
+
+class TimingHandler(BaseCallbackHandler):
+    """Collects model and tool call intervals and token usage for one run."""
+    run_inline = True
+
+    def __init__(self):
+        self._started: dict = {}
+        self.llm: list[tuple[float, float]] = []
+        self.tools: list[tuple[float, float]] = []
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self.llm.append((self._started.pop(run_id), time.perf_counter()))
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.input_tokens += usage.get("input_tokens", 0)
+                self.output_tokens += usage.get("output_tokens", 0)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.llm.append((self._started.pop(run_id), time.perf_counter()))
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self.tools.append((self._started.pop(run_id), time.perf_counter()))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self.tools.append((self._started.pop(run_id), time.perf_counter()))
+
+
+async def run_turn(agent, scenario: dict, thread_id: str) -> dict:
+    """Run one scenario on a fresh thread and return its metrics."""
+    handler = TimingHandler()
+    started = time.perf_counter()
+    await agent.ainvoke(
+        scenario["question"],
+        config={"configurable": {"thread_id": thread_id}, "callbacks": [handler]}
+    )
+    total_ms = (time.perf_counter() - started) * 1000
+    llm_ms, tool_ms = _union_ms(handler.llm), _union_ms(handler.tools)
+    return {
+        "total_ms": total_ms,
+        "llm_ms": llm_ms,
+        "tool_ms": tool_ms,
+        "overhead_ms": max(total_ms - _union_ms(handler.llm + handler.tools), 0.0),
+        "input_tokens": handler.input_tokens,
+        "output_tokens": handler.output_tokens,
+        "llm_calls": len(handler.llm),
+        "tool_calls": len(handler.tools),
+    }
+
+
+async def run_suite(agent, scenarios: list[dict], repeat: int, warmup: int) -> dict:
+    report = {}
+    for scenario in scenarios:
+        name = scenario["name"]
+        for i in range(warmup):
+            await run_turn(agent, scenario, f"warmup-{name}-{i}")
+
+        samples = [await run_turn(agent, scenario, f"{name}-{i}") for i in range(repeat)]
+
+        tracemalloc.start()
+        await run_turn(agent, scenario, f"memory-{name}")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        report[name] = {
+            metric: round(statistics.median(s[metric] for s in samples), 2)
+            for metric in samples[0]
+        }
+        report[name]["peak_kib"] = round(peak / 1024, 1)
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return one line per metric that regressed beyond `tolerance` (relative) plus the metric's slack."""
+    regressions = []
+    for name, metrics in report.items():
+        for metric, slack in CHECKED_METRICS.items():
+            base = baseline.get(name, {}).get(metric)
+            if base is None:
+                continue
+            limit = base * (1 + tolerance) + slack
+            if metrics[metric] > limit:
+                regressions.append(f"{name}.{metric}: {metrics[metric]} > {limit:.1f} (baseline {base})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="Local Postgres with the fixture league (default: $BENCH_DATABASE_URL).")
+    parser.add_argument("--load-fixtures", action="store_true", help="(Re)load the fixture league first.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--ttft", type=float, default=0.0, help="Simulated seconds to first token per LLM call.")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Simulated seconds per output token.")
+    parser.add_argument("--only", nargs="+", help="Scenario names to run.")
+    parser.add_argument("--json", type=Path, help="Write the report to this file.")
+    parser.add_argument("--baseline", type=Path, help="Compare against this report and exit 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression.")
+    parser.add_argument("--write-baseline", type=Path, help="Write the report as the new baseline.")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url or BENCH_DATABASE_URL is required")
+
+    # buddy.env reads these at import time
+    os.environ["SUPABASE_URL"] = args.database_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+    if args.load_fixtures:
+        from benchmarks import fixtures
+        fixtures.load(args.database_url)
+
+    from buddy.fake_llm import ScriptedChatModel
+    from buddy.graph import Agent
+    from buddy.prompts import prompts
+
+    scenarios = json.loads(SCENARIOS.read_text())
+    if args.only:
+        scenarios = [s for s in scenarios if s["name"] in args.only]
+
+    model = ScriptedChatModel.from_file(SCENARIOS, ttft=args.ttft, token_latency=args.token_latency)
+    agent = Agent(name="Bench", system_prompt=prompts.buddy_system_prompt, llm=model, cache_threshold=None)
+
+    report = asyncio.run(run_suite(agent, scenarios, args.repeat, args.warmup))
+
+    columns = ["total_ms", "llm_ms", "tool_ms", "overhead_ms", "input_tokens", "output_tokens", "peak_kib"]
+    print(f"{'scenario':<18}" + "".join(f"{c:>14}" for c in columns))
+    for name, metrics in report.items():
+        print(f"{name:<18}" + "".join(f"{metrics[c]:>14}" for c in columns))
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    if args.write_baseline:
+        args.write_baseline.write_text(json.dumps(report, indent=2))
+        print(f"\nWrote baseline to {args.write_baseline}")
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Concurrency benchmark: how many simultaneous conversations one worker can serve.
+
+Both modes run the same graph (routing, answer cache lookup, compaction, the chatbot node) with a model that just
+waits `--latency` seconds, so the numbers only reflect how runs are scheduled, not model or database speed.
+
+- before: the old execution model, where every run occupies a worker thread for its whole duration and the LLM call
+          blocks that thread (`--threads` worker threads, one graph run per thread)
+- after:  the async graph, where all runs share one event loop and the LLM call is awaited (`Agent.ainvoke`)
+
+A concurrency level counts as "served" when its p95 latency stays within `--slo` times the LLM latency.
+
+Usage:
+    python benchmarks/concurrency.py --latency 0.5 --threads 16 --levels 1 8 32 128 512
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from buddy.graph import Agent
+
+
+class SleepyChatModel(BaseChatModel):
+    """Answers "ok" after a fixed delay. With `blocking`, async calls sleep on the calling thread like a sync client
+    would; otherwise they await."""
+    latency: float = 0.5
+    blocking: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "sleepy"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="ok"))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.blocking:
+            time.sleep(self.latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return self._result()
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    return statistics.quantiles(samples, n=100)[q - 1] if len(samples) > 1 else samples[0]
+
+
+def bench_agent(latency: float, blocking: bool) -> Agent:
+    model = SleepyChatModel(latency=latency, blocking=blocking)
+    return Agent(name="Bench", tools=[], llm=model, schema=None, compactor=None, cache_threshold=None)
+
+
+def run_before(agent: Agent, concurrency: int, threads: int) -> list[float]:
+    def one_run(i: int) -> float:
+        # The graph run holds this thread until it finishes, as a sync graph with a blocking client did
+        asyncio.run(agent.ainvoke("hi", config={"configurable": {"thread_id": f"before-{i}"}}))
+        return time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        submitted = time.perf_counter()
+        futures = [pool.submit(one_run, i) for i in range(concurrency)]
+        # Latency as seen by the client includes time spent queued for a free thread
+        return [f.result() - submitted for f in futures]
+
+
+async def run_after(agent: Agent, concurrency: int) -> list[float]:
+    async def one_run(i: int) -> float:
+        started = time.perf_counter()
+        await agent.ainvoke("hi", config={"configurable": {"thread_id": str(i)}})
+        return time.perf_counter() - started
+
+    return await asyncio.gather(*(one_run(i) for i in range(concurrency)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated LLM latency in seconds.")
+    parser.add_argument("--threads", type=int, default=16, help="Worker threads available in `before` mode.")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32, 128, 512])
+    parser.add_argument("--slo", type=float, default=1.5, help="Allowed p95 as a multiple of the LLM latency.")
+    args = parser.parse_args()
+
+    before_agent = bench_agent(args.latency, blocking=True)
+    after_agent = bench_agent(args.latency, blocking=False)
+
+    served = {"before": 0, "after": 0}
+    print(f"{'mode':<8}{'concurrent':>11}{'runs/s':>9}{'p50 s':>8}{'p95 s':>8}")
+    for level in args.levels:
+        for mode in ("before", "after"):
+            started = time.perf_counter()
+            if mode == "before":
+                latencies = run_before(before_agent, level, args.threads)
+            else:
+                latencies = asyncio.run(run_after(after_agent, level))
+            elapsed = time.perf_counter() - started
+
+            p95 = _percentile(latencies, 95)
+            if p95 <= args.latency * args.slo:
+                served[mode] = max(served[mode], level)
+            print(f"{mode:<8}{level:>11}{level / elapsed:>9.1f}{statistics.median(latencies):>8.2f}{p95:>8.2f}")
+
+    print(f"\nMax concurrent conversations within {args.slo}x LLM latency at p95: "
+          f"before={served['before']}, after={served['after']}")
+
+
+if __name__ == "__main__":
+    main()
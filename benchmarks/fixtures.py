@@ -0,0 +1,180 @@
+"""
+Deterministic fixture league for offline benchmarks.
+
+Creates the league tables the agent queries (a subset of the columns in buddy/prompts/schema.md) in a local
+Postgres and fills them with a seeded, synthetic 12-team league.
+
+Usage:
+    python benchmarks/fixtures.py postgresql+psycopg2://postgres@localhost:5432/buddy_bench
+"""
+import argparse
+import json
+import random
+
+from sqlalchemy import create_engine, text
+
+LEAGUE_ID = "bench_league"
+USERNAME = "bench_user_1"
+SEASON = "2025"
+TEAMS = 12
+ROSTER_SIZE = 13
+PLAYERS = 450
+WEEKS = 10
+
+POSITIONS = ["PG", "SG", "SF", "PF", "C"]
+STATS = ["pts", "reb", "ast", "stl", "blk", "turnovers", "tpm", "fgm", "fga", "ftm", "fta"]
+
+DDL = f"""
+DROP TABLE IF EXISTS league_information, league_users, league_rosters, players, aggregated_player_statistics,
+    weekly_player_statistics, matchups, ingest_versions;
+
+CREATE TABLE league_information (
+    league_id text PRIMARY KEY, name text NOT NULL, status text NOT NULL, sport text NOT NULL,
+    season_type text NOT NULL, season text NOT NULL, total_rosters integer NOT NULL, draft_id text NOT NULL,
+    settings jsonb NOT NULL, scoring_settings jsonb NOT NULL, roster_positions jsonb NOT NULL
+);
+CREATE TABLE league_users (
+    league_id text NOT NULL, user_id text NOT NULL, username text NOT NULL, display_name text,
+    metadata jsonb NOT NULL, is_owner boolean NOT NULL, PRIMARY KEY (league_id, user_id)
+);
+CREATE TABLE league_rosters (
+    league_id text NOT NULL, roster_id integer NOT NULL, owner_id text NOT NULL, starters jsonb NOT NULL,
+    players jsonb NOT NULL, reserve jsonb NOT NULL, wins integer NOT NULL, losses integer NOT NULL,
+    ties integer NOT NULL, waiver_position integer NOT NULL, waiver_budget_used integer NOT NULL,
+    total_moves integer NOT NULL, fpts integer NOT NULL, fpts_decimal integer NOT NULL,
+    fpts_against integer NOT NULL, fpts_against_decimal integer NOT NULL, PRIMARY KEY (league_id, roster_id)
+);
+CREATE TABLE players (
+    player_id text PRIMARY KEY, first_name text, last_name text, full_name text, status text, team text,
+    team_abbr text, position text, primary_fantasy_position text, fantasy_positions jsonb, age integer,
+    injury_status text, active boolean
+);
+CREATE TABLE aggregated_player_statistics (
+    player_id text PRIMARY KEY, gp numeric, {", ".join(f"{s} numeric" for s in STATS)}, fantasy_points numeric
+);
+CREATE TABLE weekly_player_statistics (
+    league_id text NOT NULL, season text NOT NULL, week integer NOT NULL, player_id text NOT NULL,
+    {", ".join(f"{s} numeric" for s in STATS)}, fantasy_points numeric,
+    PRIMARY KEY (league_id, season, week, player_id)
+);
+CREATE TABLE matchups (
+    league_id text NOT NULL, roster_id integer NOT NULL, matchup_id integer NOT NULL, starters jsonb NOT NULL,
+    players jsonb NOT NULL, points numeric NOT NULL, PRIMARY KEY (league_id, roster_id, matchup_id)
+);
+CREATE TABLE ingest_versions (
+    league_id text PRIMARY KEY, data_version bigint NOT NULL, ingested_at timestamptz NOT NULL DEFAULT now()
+);
+"""
+
+SCORING = {"pts": 1.0, "reb": 1.2, "ast": 1.5, "stl": 3.0, "blk": 3.0, "turnovers": -1.0, "tpm": 0.5}
+ROSTER_POSITIONS = ["PG", "SG", "G", "SF", "PF", "F", "C", "UTIL", "UTIL", "UTIL", "BN", "BN", "BN"]
+
+
+def _fantasy_points(line: dict) -> float:
+    return round(sum(line[s] * w for s, w in SCORING.items()), 2)
+
+
+def _stat_line(rng: random.Random, scale: float) -> dict:
+    fga = round(rng.uniform(5, 20) * scale, 1)
+    fta = round(rng.uniform(1, 8) * scale, 1)
+    fgm = round(fga * rng.uniform(0.4, 0.55), 1)
+    ftm = round(fta * rng.uniform(0.65, 0.9), 1)
+    tpm = round(rng.uniform(0, 3.5) * scale, 1)
+    return {
+        "pts": round(2 * fgm + ftm + tpm, 1), "reb": round(rng.uniform(2, 12) * scale, 1),
+        "ast": round(rng.uniform(1, 9) * scale, 1), "stl": round(rng.uniform(0.3, 2) * scale, 1),
+        "blk": round(rng.uniform(0.1, 2) * scale, 1), "turnovers": round(rng.uniform(0.5, 4) * scale, 1),
+        "tpm": tpm, "fgm": fgm, "fga": fga, "ftm": ftm, "fta": fta,
+    }
+
+
+def rows(seed: int = 0) -> dict[str, list[dict]]:
+    """Build the fixture rows for every table."""
+    rng = random.Random(seed)
+    tables: dict[str, list[dict]] = {name: [] for name in (
+        "league_information", "league_users", "league_rosters", "players", "aggregated_player_statistics",
+        "weekly_player_statistics", "matchups", "ingest_versions"
+    )}
+
+    tables["league_information"].append({
+        "league_id": LEAGUE_ID, "name": "Benchmark League", "status": "in_season", "sport": "nba",
+        "season_type": "regular", "season": SEASON, "total_rosters": TEAMS, "draft_id": "bench_draft",
+        "settings": json.dumps({"playoff_teams": 6}), "scoring_settings": json.dumps(SCORING),
+        "roster_positions": json.dumps(ROSTER_POSITIONS),
+    })
+
+    for p in range(PLAYERS):
+        player_id = str(1000 + p)
+        position = POSITIONS[p % len(POSITIONS)]
+        eligible = [position] + ([POSITIONS[(p + 1) % len(POSITIONS)]] if rng.random() < 0.4 else [])
+        tables["players"].append({
+            "player_id": player_id, "first_name": f"First{p}", "last_name": f"Last{p}",
+            "full_name": f"First{p} Last{p}", "status": "Active", "team": f"Team{p % 30}",
+            "team_abbr": f"T{p % 30:02d}", "position": position, "primary_fantasy_position": position,
+            "fantasy_positions": json.dumps(eligible), "age": rng.randint(19, 38),
+            "injury_status": "Out" if rng.random() < 0.05 else None, "active": True,
+        })
+        scale = rng.uniform(0.4, 1.6)
+        season_line = _stat_line(rng, scale)
+        tables["aggregated_player_statistics"].append({
+            "player_id": player_id, "gp": rng.randint(5, 10) * 1.0, **season_line,
+            "fantasy_points": _fantasy_points(season_line),
+        })
+        for week in range(1, WEEKS + 1):
+            line = _stat_line(rng, scale)
+            tables["weekly_player_statistics"].append({
+                "league_id": LEAGUE_ID, "season": SEASON, "week": week, "player_id": player_id, **line,
+                "fantasy_points": _fantasy_points(line),
+            })
+
+    player_ids = [p["player_id"] for p in tables["players"]]
+    rng.shuffle(player_ids)
+    for team in range(TEAMS):
+        user_id = f"u{team + 1}"
+        roster = player_ids[team * ROSTER_SIZE:(team + 1) * ROSTER_SIZE]
+        wins = rng.randint(0, WEEKS)
+        tables["league_users"].append({
+            "league_id": LEAGUE_ID, "user_id": user_id, "username": f"bench_user_{team + 1}",
+            "display_name": f"Team {team + 1}", "metadata": json.dumps({"team_name": f"Team {team + 1}"}),
+            "is_owner": team == 0,
+        })
+        tables["league_rosters"].append({
+            "league_id": LEAGUE_ID, "roster_id": team + 1, "owner_id": user_id, "starters": json.dumps(roster[:10]),
+            "players": json.dumps(roster), "reserve": json.dumps([]), "wins": wins, "losses": WEEKS - wins,
+            "ties": 0, "waiver_position": rng.randint(1, TEAMS), "waiver_budget_used": rng.randint(0, 100),
+            "total_moves": rng.randint(0, 30), "fpts": rng.randint(9000, 14000), "fpts_decimal": rng.randint(0, 99),
+            "fpts_against": rng.randint(9000, 14000), "fpts_against_decimal": rng.randint(0, 99),
+        })
+        tables["matchups"].append({
+            "league_id": LEAGUE_ID, "roster_id": team + 1, "matchup_id": team // 2 + 1,
+            "starters": json.dumps(roster[:10]), "players": json.dumps(roster),
+            "points": round(rng.uniform(900, 1400), 2),
+        })
+
+    tables["ingest_versions"].append({"league_id": LEAGUE_ID, "data_version": 1})
+    return tables
+
+
+def load(database_url: str, seed: int = 0):
+    """(Re)create the fixture tables in `database_url` and fill them."""
+    engine = create_engine(database_url)
+    with engine.begin() as conn:
+        conn.execute(text(DDL))
+        for table, table_rows in rows(seed).items():
+            columns = list(table_rows[0])
+            placeholders = ", ".join(f":{c}" for c in columns)
+            conn.execute(text(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"), table_rows)
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database_url")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    load(args.database_url, args.seed)
+    print(f"Loaded fixture league {LEAGUE_ID!r} into {args.database_url}")
+
+
+if __name__ == "__main__":
+    main()
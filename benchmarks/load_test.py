@@ -0,0 +1,144 @@
+"""
+Concurrent multi-user load test for a LangGraph server running the `buddy` graph.
+
+Each simulated user creates a thread and sends a scripted conversation: the questions of `benchmarks/scenarios.json`,
+starting at a different one per user. It uses the same thread and streaming run APIs as `frontend/chat_deployed.py`.
+Users are run at increasing concurrency levels. For each level the test reports throughput, time to first token
+(TTFT), full turn latency and the error rate.
+
+To measure the server and not OpenAI, run it with the scripted model and the fixture league:
+
+    python benchmarks/fixtures.py postgresql+psycopg2://postgres@localhost:5432/buddy_bench
+    FAKE_LLM=1 SUPABASE_URL=postgresql+psycopg2://postgres@localhost:5432/buddy_bench \\
+        langgraph dev --no-browser --port 2024
+    python benchmarks/load_test.py --url http://localhost:2024 --levels 1 8 32 64 --turns 3
+
+`FAKE_LLM_TTFT` and `FAKE_LLM_TOKEN_LATENCY` on the server set the simulated model speed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+
+from frontend import streaming
+
+SCENARIOS = Path(__file__).resolve().parent / "scenarios.json"
+
+# Kept in sync with benchmarks/fixtures.py, which needs SQLAlchemy to import
+LEAGUE_ID = "bench_league"
+USERNAME = "bench_user_1"
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile, `q` in [0, 100]."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+async def run_turn(http: httpx.AsyncClient, thread_id: str, body: dict, timeout: float) -> dict:
+    """Send one message and time it. Errors are returned, not raised, so one failure doesn't stop the user."""
+    started = time.perf_counter()
+    ttft = None
+    try:
+        async for kind, _ in streaming.astream_run(http, thread_id, body, timeout=timeout):
+            if ttft is None and kind == "text":
+                ttft = time.perf_counter() - started
+    except Exception as e:
+        error = f"HTTP {e.response.status_code}" if isinstance(e, httpx.HTTPStatusError) else type(e).__name__
+        return {"error": error, "latency": time.perf_counter() - started}
+    return {"error": None if ttft is not None else "no text", "ttft": ttft, "latency": time.perf_counter() - started}
+
+
+async def run_user(http: httpx.AsyncClient, user: int, questions: list[str], args) -> list[dict]:
+    """One user: a new thread and `args.turns` messages, with `args.think_time` seconds between them."""
+    try:
+        response = await http.post(
+            "/threads",
+            json={"thread_id": str(uuid.uuid4()), "metadata": {"user_id": f"load-{user}"}},
+            timeout=args.timeout,
+        )
+        response.raise_for_status()
+        thread_id = response.json()["thread_id"]
+    except Exception as e:
+        return [{"error": f"create thread: {type(e).__name__}", "latency": 0.0}]
+
+    results = []
+    for turn in range(args.turns):
+        question = questions[(user + turn) % len(questions)]
+        # The user context only goes with the first message of a thread, as in app.py
+        context = {"username": args.username, "league_id": args.league_id} if turn == 0 else None
+        results.append(await run_turn(http, thread_id, streaming.run_request(question, context), args.timeout))
+        if args.think_time:
+            await asyncio.sleep(args.think_time)
+    return results
+
+
+async def run_level(concurrency: int, questions: list[str], args) -> dict:
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as http:
+        started = time.perf_counter()
+        users = await asyncio.gather(*(run_user(http, u, questions, args) for u in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    turns = [t for user in users for t in user]
+    ok = [t for t in turns if t["error"] is None]
+    ttft = [t["ttft"] * 1000 for t in ok]
+    latency = [t["latency"] * 1000 for t in ok]
+    return {
+        "users": concurrency,
+        "turns": len(turns),
+        "errors": len(turns) - len(ok),
+        "error_rate": round((len(turns) - len(ok)) / len(turns), 4) if turns else 0.0,
+        "error_types": dict(Counter(t["error"] for t in turns if t["error"])),
+        "turns_per_s": round(len(ok) / elapsed, 2),
+        "ttft_p50_ms": round(percentile(ttft, 50), 1),
+        "ttft_p95_ms": round(percentile(ttft, 95), 1),
+        "ttft_p99_ms": round(percentile(ttft, 99), 1),
+        "latency_p50_ms": round(percentile(latency, 50), 1),
+        "latency_p95_ms": round(percentile(latency, 95), 1),
+        "wall_s": round(elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=os.getenv("LANGGRAPH_SERVER_URL", "http://localhost:2024"))
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 32], help="Concurrent users per level.")
+    parser.add_argument("--turns", type=int, default=3, help="Messages per user.")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds a user waits between messages.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds allowed per request.")
+    parser.add_argument("--username", default=USERNAME)
+    parser.add_argument("--league-id", default=LEAGUE_ID)
+    parser.add_argument("--json", type=Path, help="Write the report to this file.")
+    args = parser.parse_args()
+
+    questions = [s["question"] for s in json.loads(SCENARIOS.read_text())]
+
+    columns = ["users", "turns", "error_rate", "turns_per_s", "ttft_p50_ms", "ttft_p95_ms", "ttft_p99_ms",
+               "latency_p50_ms", "latency_p95_ms"]
+    print("".join(f"{c:>16}" for c in columns))
+    report = []
+    for level in args.levels:
+        result = asyncio.run(run_level(level, questions, args))
+        report.append(result)
+        print("".join(f"{result[c]:>16}" for c in columns))
+        if result["error_types"]:
+            print(f"{'':>16}errors: {result['error_types']}")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+SSE parsing micro-benchmark for high-token-rate streams.
+
+Builds a synthetic LangGraph `messages-tuple` stream: one event per token, carrying the same metadata the server
+sends with every chunk. It then times how fast each client turns the raw bytes into assistant text.
+
+- legacy: what app.py and chat_deployed.py did before `frontend/streaming.py`. Text is decoded and split into
+          lines, each `data:` line goes through `json.loads`, and the text is assembled by string concatenation.
+- parser/json: `frontend.streaming.SSEParser` with the standard json module.
+- parser/orjson: the same parser with orjson (the default when it's installed).
+
+Usage:
+    python benchmarks/sse_parse.py --tokens 20000 --chunk-size 4096 --repeat 5
+"""
+import argparse
+import codecs
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from frontend import streaming
+
+METADATA = {
+    "langgraph_step": 3,
+    "langgraph_node": "chatbot",
+    "langgraph_triggers": ["branch:to:chatbot"],
+    "langgraph_path": ["__pregel_pull", "chatbot"],
+    "langgraph_checkpoint_ns": "chatbot:4f1d6f3e-1f0e-5a4e-b2d5-9c1c2a0c9d11",
+    "checkpoint_ns": "chatbot:4f1d6f3e-1f0e-5a4e-b2d5-9c1c2a0c9d11",
+    "ls_provider": "openai",
+    "ls_model_name": "gpt-4.1-mini-2025-04-14",
+    "ls_model_type": "chat",
+    "ls_temperature": 0.1,
+    "thread_id": "5b0c1a8e-8f5c-4d53-9f0e-1f6b0e7a4f2c",
+    "user_id": "bench_user_1",
+}
+
+
+def build_stream(tokens: int) -> bytes:
+    """A messages-tuple stream with one event per token, framed like the LangGraph server frames it."""
+    parts = ['event: metadata\r\ndata: {"run_id":"1f0e","attempt":1}\r\n\r\n']
+    for i in range(tokens):
+        chunk = {
+            "content": f" tok{i % 97}",
+            "additional_kwargs": {},
+            "response_metadata": {},
+            "type": "AIMessageChunk",
+            "name": None,
+            "id": "run-7c1b2a3d-4e5f-6a7b-8c9d-0e1f2a3b4c5d",
+            "example": False,
+            "tool_calls": [],
+            "invalid_tool_calls": [],
+            "usage_metadata": None,
+            "tool_call_chunks": [],
+        }
+        parts.append(f"event: messages\r\ndata: {json.dumps([chunk, METADATA])}\r\n\r\n")
+    return "".join(parts).encode()
+
+
+def chunked(stream: bytes, size: int) -> list[bytes]:
+    return [stream[i:i + size] for i in range(0, len(stream), size)]
+
+
+def legacy(chunks: list[bytes]) -> str:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    full_content, pending, current_event = "", "", None
+    for chunk in chunks:
+        lines = (pending + decoder.decode(chunk)).splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if not line:
+                continue
+            if line.startswith("event: "):
+                current_event = line[7:].strip()
+            elif line.startswith("data: ") and current_event == "messages":
+                message_chunk, metadata = json.loads(line[6:])
+                if message_chunk.get("type") == "AIMessageChunk" and not message_chunk["tool_call_chunks"]:
+                    full_content += message_chunk["content"]
+    return full_content
+
+
+def parser(loads):
+    def run(chunks: list[bytes]) -> str:
+        original, streaming.loads = streaming.loads, loads
+        try:
+            sse, parts = streaming.SSEParser(), []
+            for chunk in chunks:
+                for event in sse.feed(chunk):
+                    item = streaming.decode(event)
+                    if item is not None and item[0] == "text":
+                        parts.append(item[1])
+            return "".join(parts)
+        finally:
+            streaming.loads = original
+    return run
+
+
+def main():
+    parser_ = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser_.add_argument("--tokens", type=int, default=20_000)
+    parser_.add_argument("--chunk-size", type=int, default=4096, help="Bytes per network read.")
+    parser_.add_argument("--repeat", type=int, default=5)
+    args = parser_.parse_args()
+
+    stream = build_stream(args.tokens)
+    chunks = chunked(stream, args.chunk_size)
+    candidates = {"legacy": legacy, "parser/json": parser(lambda data: json.loads(data.decode()))}
+    try:
+        import orjson
+        candidates["parser/orjson"] = parser(orjson.loads)
+    except ImportError:
+        print("orjson is not installed, skipping parser/orjson")
+
+    expected = legacy(chunks)
+    for name, run in candidates.items():
+        assert run(chunks) == expected, f"{name} assembled different text"
+
+    # Interleaved rounds, so background noise hits every candidate alike
+    samples = {name: [] for name in candidates}
+    for _ in range(args.repeat):
+        for name, run in candidates.items():
+            started = time.perf_counter()
+            run(chunks)
+            samples[name].append(time.perf_counter() - started)
+
+    print(f"{len(stream) / 1e6:.1f} MB, {args.tokens} events, {len(chunks)} chunks of {args.chunk_size} bytes\n")
+    print(f"{'client':<16}{'median ms':>12}{'events/s':>14}{'MB/s':>10}{'speedup':>10}")
+    baseline = statistics.median(samples["legacy"])
+    for name, times in samples.items():
+        median = statistics.median(times)
+        print(f"{name:<16}{median * 1000:>12.1f}{args.tokens / median:>14,.0f}{len(stream) / median / 1e6:>10.1f}"
+              f"{baseline / median:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
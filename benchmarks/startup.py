@@ -0,0 +1,110 @@
+"""
+Import-time and cold-start benchmark.
+
+Each scenario runs in a fresh interpreter, so nothing is shared between samples:
+
+- server:     `import buddy.graph` (what the LangGraph API server does when it loads the `buddy` graph)
+- local:      import `frontend/chat_local.py` and build its Agent, up to the first prompt
+- first_turn: `local` plus the first graph compile/run setup (engine creation and LLM client construction)
+
+Usage:
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --importtime   # print the slowest imports of the server scenario
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {
+    "server": "import buddy.graph",
+    "local": (
+        "import sys\n"
+        "sys.path.insert(0, 'frontend')\n"
+        "import chat_local\n"
+        "from buddy.graph import Agent\n"
+        "from buddy.prompts import prompts\n"
+        "agent = Agent(name='Buddy', system_prompt=prompts.buddy_system_prompt)\n"
+        "agent.runnable\n"
+    ),
+    "first_turn": (
+        "import sys\n"
+        "sys.path.insert(0, 'frontend')\n"
+        "import chat_local\n"
+        "from buddy.graph import Agent\n"
+        "from buddy.prompts import prompts\n"
+        "from buddy.tools import session\n"
+        "agent = Agent(name='Buddy', system_prompt=prompts.buddy_system_prompt)\n"
+        "agent.runnable\n"
+        "agent.llm\n"
+        "session.engine\n"
+    ),
+}
+
+TIMER = (
+    "import time\n"
+    "_t0 = time.perf_counter()\n"
+    "{code}\n"
+    "print(f'__elapsed__ {{time.perf_counter() - _t0:.6f}}')\n"
+)
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    # Placeholders so module-level config never fails; nothing in these scenarios opens a connection.
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    env.setdefault("SUPABASE_URL", "postgresql+psycopg2://benchmark@localhost:1/benchmark")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def run_once(code: str) -> float:
+    """Run `code` in a fresh interpreter and return the in-process elapsed time in seconds."""
+    out = subprocess.run(
+        [sys.executable, "-c", TIMER.format(code=code)],
+        cwd=PROJECT_ROOT, env=_env(), capture_output=True, text=True, check=True
+    ).stdout
+    line = next(l for l in out.splitlines() if l.startswith("__elapsed__"))
+    return float(line.split()[1])
+
+
+def slowest_imports(code: str, top: int = 15) -> list[tuple[int, str]]:
+    """Return the `top` imports with the largest cumulative time (microseconds) from `-X importtime`."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, env=_env(), capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if not cumulative_us.strip().isdigit():
+            continue  # header line
+        rows.append((int(cumulative_us), name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", action="store_true", help="Show the slowest imports for `server`.")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<12}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for name, code in SCENARIOS.items():
+        samples = [run_once(code) * 1000 for _ in range(args.runs)]
+        print(f"{name:<12}{statistics.median(samples):>12.1f}{min(samples):>10.1f}{max(samples):>10.1f}")
+
+    if args.importtime:
+        print("\nSlowest imports (cumulative ms) for `server`:")
+        for cumulative_us, module in slowest_imports(SCENARIOS["server"]):
+            print(f"{cumulative_us / 1000:>10.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
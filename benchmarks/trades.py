@@ -0,0 +1,128 @@
+"""
+Trade engine benchmark.
+
+Times `buddy.trades.find()` on a seeded, synthetic 12-team league held in memory, so no database is needed. The
+screening bounds are checked against exact lineups of sampled candidates; with --exact, the result is also compared
+with re-scoring every candidate.
+
+Usage:
+    python benchmarks/trades.py --teams 12 --roster-size 13 --repeat 5 [--seed 7] [--exact]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+
+from buddy import lineup, trades
+
+ROSTER_POSITIONS = ["PG", "SG", "G", "SF", "PF", "F", "C", "UTIL", "UTIL", "UTIL", "BN", "BN", "BN"]
+POSITIONS = [["PG"], ["SG"], ["PG", "SG"], ["SF"], ["PF"], ["SF", "PF"], ["PF", "C"], ["C"], ["SG", "SF"]]
+
+
+def build_league(teams: int, roster_size: int, seed: int = 7) -> lineup.League:
+    rng = random.Random(seed)
+    rows = []
+    for roster_id in range(1, teams + 1):
+        for slot in range(roster_size):
+            ppg = max(0.0, rng.gauss(25, 9))
+            rows.append({
+                "player_id": f"{roster_id}_{slot}",
+                "roster_id": roster_id,
+                "full_name": f"Player {roster_id}-{slot}",
+                "position": None,
+                "team_abbr": "BEN",
+                "fantasy_positions": rng.choice(POSITIONS),
+                "injury_status": "Out" if rng.random() < 0.05 else None,
+                "games": 20.0,
+                "fantasy_ppg": round(ppg, 2),
+                "game_score": round(ppg / 2 + rng.gauss(0, 2), 2),
+                "rank_std": None,
+            })
+    players = pd.DataFrame(rows)
+    players["position"] = players["fantasy_positions"].str[0]
+    players["rank_std"] = players["fantasy_ppg"].rank(ascending=False)
+    players["projection"] = players["fantasy_ppg"].where(players["injury_status"].isna(), 0.0)
+    rosters = pd.DataFrame({
+        "roster_id": range(1, teams + 1),
+        "username": [f"bench_user_{i}" for i in range(1, teams + 1)],
+        "display_name": [f"Team {i}" for i in range(1, teams + 1)],
+        "players": [list(players.loc[players["roster_id"] == i, "player_id"]) for i in range(1, teams + 1)],
+        "starters": [[] for _ in range(teams)],
+    })
+    return lineup.League("bench_league", ROSTER_POSITIONS, rosters, players)
+
+
+def _teams(league: lineup.League, roster_id: int) -> tuple[tuple, list[tuple]]:
+    players = league.players.reset_index(drop=True)
+    starting = lineup.starting_slots(league.roster_positions)
+    team = lambda r: trades._team(players[players["roster_id"] == r].reset_index(drop=True), starting)
+    return team(roster_id), [team(r) for r in league.rosters["roster_id"] if r != roster_id]
+
+
+def check_screen(league: lineup.League, samples: int = 500) -> int:
+    """Check that the screen's bounds are never below the exact lineup deltas of sampled candidates."""
+    user, partners = _teams(league, 1)
+    screened = trades.screen(user, partners)
+    rng = random.Random(0)
+    sample = np.array(rng.sample(range(len(screened["partner"])), min(samples, len(screened["partner"]))), dtype=int)
+    partner = screened["partner"][sample]
+    user_after, partner_after = trades.rescore(user, partners, partner, screened["give"][sample],
+                                               screened["get"][sample])
+    assert (user_after - screened["user_before"] <= screened["user_bound"][sample] + 1e-9).all()
+    assert (partner_after - screened["partner_before"][partner] <= screened["partner_bound"][sample] + 1e-9).all()
+    return len(screened["partner"])
+
+
+def check_exact(league: lineup.League, result: pd.DataFrame, top_k: int):
+    """Check `find()` against re-scoring every candidate exactly."""
+    user, partners = _teams(league, 1)
+    screened = trades.screen(user, partners)
+    partner, give, get = screened["partner"], screened["give"], screened["get"]
+    user_after, partner_after = trades.rescore(user, partners, partner, give, get)
+    deltas = {
+        (int(partner[c]), tuple(int(i) for i in give[c]), tuple(int(i) for i in get[c])): (
+            round(float(user_after[c] - screened["user_before"]), 2),
+            round(float(partner_after[c] - screened["partner_before"][partner[c]]), 2),
+        )
+        for c in range(len(partner))
+    }
+    expected = [deltas[key] for key in trades.ranked(deltas, top_k)]
+    assert list(zip(result["your_delta"], result["their_delta"])) == expected, "find() differs from exhaustive"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=12)
+    parser.add_argument("--roster-size", type=int, default=13)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--exact", action="store_true", help="also compare with re-scoring every candidate (slow)")
+    args = parser.parse_args()
+
+    league = build_league(args.teams, args.roster_size, args.seed)
+    candidates = check_screen(league)
+
+    samples = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        result = trades.find(league, 1, top_k=args.top_k)
+        samples.append(time.perf_counter() - started)
+
+    print(f"{args.teams} teams, {args.roster_size} players each, {candidates:,} candidate trades\n")
+    print(result.to_string(index=False))
+    if args.exact:
+        check_exact(league, result, args.top_k)
+        print("\nMatches exhaustive re-scoring")
+    print(f"\nfind(): median {statistics.median(samples) * 1000:.1f} ms, max {max(samples) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
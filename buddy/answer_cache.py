@@ -0,0 +1,206 @@
+"""
+Semantic answer cache.
+
+Members of the same league ask the same questions ("what are the standings", "best free agent center"). Answers are
+stored in the LangGraph store under `(answer_cache, league_id, data_version, scope)` and looked up by embedding
+similarity of the normalized question. The data version comes from `ingest_versions`, so a new ingest moves every
+lookup to a fresh namespace and stale answers are never served. Questions about "my" team are scoped to the user;
+everything else is shared by the league.
+
+Questions are embedded in-process with a small ONNX sentence embedding model (fastembed), so paraphrases match without
+a network round trip on every turn. Embeddings alone rate "top 10 scorers in
+week 12" and "top 20 scorers in week 13" as near-identical, so a hit also needs the same key terms: numbers, names and
+positions (see `key_terms`). Follow-ups that lean on the thread ("what about guards?") mean something different in
+every thread and are neither served from nor written to the cache.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+import time
+from typing import List, Optional, Sequence
+
+from langgraph.store.base import BaseStore
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "answer_cache"
+EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+DIMS = 384
+DEFAULT_THRESHOLD = 0.92
+# Nearest cached questions checked for matching key terms
+CANDIDATES = 5
+
+_CONTRACTIONS = {
+    "who's": "who is", "what's": "what is", "where's": "where is", "how's": "how is", "it's": "it is",
+    "i'm": "i am", "i've": "i have", "should've": "should have", "don't": "do not", "isn't": "is not",
+}
+_PERSONAL = re.compile(r"\b(i|me|my|mine|myself|we|us|our|ours)\b")
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+_FILLER = re.compile(r"\b(please|hey|buddy|can you|could you|tell me|show me|give me)\b")
+
+
+def normalize(question: str) -> str:
+    """Lowercase, expand contractions and drop punctuation and filler words."""
+    text = question.lower().replace("’", "'")
+    for contraction, expanded in _CONTRACTIONS.items():
+        text = text.replace(contraction, expanded)
+    text = _FILLER.sub(" ", text)
+    text = _NON_WORD.sub(" ", text)
+    return " ".join(text.split())
+
+
+_NUMBER_WORDS = {
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5", "six": "6", "seven": "7", "eight": "8",
+    "nine": "9", "ten": "10", "fifteen": "15", "twenty": "20", "first": "1", "second": "2", "third": "3",
+    "last": "last", "next": "next", "this": "this",
+}
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_WORD = re.compile(r"[A-Za-z0-9][A-Za-z0-9'.-]*|[.?!]")
+_NOT_NAMES = {
+    "i", "i'm", "what", "who", "whom", "which", "how", "when", "where", "why", "is", "are", "was", "were", "do", "does",
+    "did", "should", "would", "could", "can", "will", "list", "show", "give", "tell", "compare", "find", "get", "the",
+    "a", "an", "my", "our", "in", "on", "for", "of", "please", "hey", "buddy",
+}
+_POSITIONS = {
+    "pg": "pg", "point": "pg", "sg": "sg", "shooting": "sg", "sf": "sf", "small": "sf", "pf": "pf", "power": "pf",
+    "c": "c", "center": "c", "centers": "c", "guard": "g", "guards": "g", "forward": "f", "forwards": "f",
+    "g": "g", "f": "f", "util": "util", "bench": "bn",
+}
+_FOLLOW_UP = re.compile(
+    r"^(and|also|what about|how about|same|ok|okay|so|then|now|but)\b"
+    r"|\b(he|him|his|she|her|they|them|their|it|its|that|those|these|this one|that one|instead|else|again|more)\b"
+)
+
+
+def _names(question: str) -> set[str]:
+    """Capitalized words, e.g. player and team names. The first word of a sentence only counts when the next word is
+    capitalized too ("LeBron James"), since it is capitalized anyway."""
+    words = _WORD.findall(question)
+    names = set()
+    for i, word in enumerate(words):
+        if not word[0].isupper() or word.lower() in _NOT_NAMES:
+            continue
+        starts_sentence = i == 0 or words[i - 1] in ".?!"
+        if starts_sentence and not (i + 1 < len(words) and words[i + 1][0].isupper()):
+            continue
+        names.add(word.rstrip(".").lower())
+    return names
+
+
+def key_terms(question: str) -> str:
+    """The terms two questions must share to share an answer: numbers (including "ten", "last", "next"), names and
+    positions, as a sorted, space-separated string."""
+    terms = {f"n:{n}" for n in _NUMBER.findall(question)}
+    terms |= {f"e:{name}" for name in _names(question)}
+    for word in normalize(question).split():
+        if word in _NUMBER_WORDS:
+            terms.add(f"n:{_NUMBER_WORDS[word]}")
+        elif word in _POSITIONS:
+            terms.add(f"p:{_POSITIONS[word]}")
+    return " ".join(sorted(terms))
+
+
+def is_follow_up(question: str) -> bool:
+    """Whether a question only makes sense with the earlier turns of its thread."""
+    normalized = normalize(question)
+    return len(normalized.split()) < 2 or bool(_FOLLOW_UP.search(normalized))
+
+
+_embeddings = None
+_embeddings_error: Optional[Exception] = None
+_embeddings_lock = threading.Lock()
+
+
+def _model():
+    """Load the embedding model on first use; it is downloaded once and then read from the local cache.
+
+    A failed load is not retried: fastembed spends tens of seconds retrying the download, which every turn would
+    wait for. The cache then stays off until the process restarts.
+    """
+    global _embeddings, _embeddings_error
+    with _embeddings_lock:
+        if _embeddings_error is not None:
+            raise _embeddings_error
+        if _embeddings is None:
+            try:
+                from fastembed import TextEmbedding
+
+                _embeddings = TextEmbedding(model_name=EMBEDDING_MODEL)
+            except Exception as e:
+                _embeddings_error = e
+                raise
+    return _embeddings
+
+
+def warm_up():
+    """Load the embedding model in the background, so the first lookup doesn't wait for it."""
+    def load():
+        try:
+            _model()
+        except Exception as e:
+            logger.warning("Answer cache embedding model unavailable: %s", e)
+
+    threading.Thread(target=load, name="buddy-embedding-load", daemon=True).start()
+
+
+def _embed(texts: List[str]) -> List[List[float]]:
+    return [vector.tolist() for vector in _model().embed(texts)]
+
+
+async def embed_texts(texts: Sequence[str]) -> List[List[float]]:
+    """Embedding function for the store index (referenced from langgraph.json, dims=DIMS). Being async, the store
+    uses it for both its sync and async methods. The model runs in a worker thread so it doesn't block the event
+    loop."""
+    return await asyncio.to_thread(_embed, list(texts))
+
+
+def index_config() -> dict:
+    """The `index` of a local store (e.g. `InMemoryStore(index=index_config())`) matching the server's."""
+    return {"embed": embed_texts, "dims": DIMS, "fields": ["question"]}
+
+
+def namespace(league_id: str, data_version: int, username: str, question: str) -> tuple:
+    scope = f"user:{username}" if _PERSONAL.search(normalize(question)) else "league"
+    return NAMESPACE, league_id, str(data_version), scope
+
+
+async def alookup(store: BaseStore, ns: tuple, question: str, threshold: float = DEFAULT_THRESHOLD) -> Optional[dict]:
+    """Return the cached entry for the most similar question in `ns` with the same key terms, if it is similar
+    enough."""
+    terms = key_terms(question)
+    for item in await store.asearch(ns, query=normalize(question), limit=CANDIDATES):
+        if item.score is None or item.score < threshold:
+            break
+        if item.value.get("key_terms") == terms:
+            return {**item.value, "score": item.score}
+    return None
+
+
+_purged: set[tuple[str, str]] = set()
+
+
+async def aremember(store: BaseStore, ns: tuple, question: str, answer: str):
+    """Store an answer and drop the league's answers from older data versions."""
+    normalized = normalize(question)
+    await store.aput(
+        ns,
+        key=hashlib.sha1(normalized.encode()).hexdigest(),
+        value={"question": normalized, "key_terms": key_terms(question), "answer": answer, "created_at": time.time()},
+    )
+
+    league_id, data_version = ns[1], ns[2]
+    # Only once per process and version: after a new ingest, earlier versions are unreachable anyway
+    if (league_id, data_version) in _purged:
+        return
+    _purged.add((league_id, data_version))
+
+    for stale in await store.alist_namespaces(prefix=(NAMESPACE, league_id), max_depth=4):
+        if stale[2] == data_version:
+            continue
+        while items := await store.asearch(stale, limit=100):
+            for item in items:
+                await store.adelete(stale, item.key)
+        logger.info("Purged stale answer cache namespace %s", stale)
+
@@ -0,0 +1,92 @@
+"""
+Token and latency budgets.
+
+Each turn is limited in tokens, LLM calls and wall time, and each thread is limited in total tokens and time. When a
+turn runs out, the graph stops calling tools and the model writes a final answer from what it already has. A
+thread that has run out gets a fixed reply without an LLM call.
+"""
+import time
+from dataclasses import dataclass
+
+WRAP_UP_PROMPT = (
+    "You have run out of budget for this question ({reason}) and can't call any more tools. Answer now with what "
+    "the results so far show. Say briefly what you could not check, and suggest a narrower question if that would "
+    "help."
+)
+
+THREAD_LIMIT_MESSAGE = (
+    "This conversation has reached its usage limit. Please start a new chat to keep going."
+)
+
+
+@dataclass
+class Budget:
+    """Per-turn and per-thread limits.
+
+    Attributes:
+        turn_tokens: Input plus output tokens allowed in one turn.
+        turn_llm_calls: LLM calls allowed in one turn, which bounds the chatbot/tools loop.
+        turn_seconds: Wall time allowed for one turn.
+        thread_tokens: Input plus output tokens allowed over the whole thread.
+        thread_seconds: Wall time allowed over the whole thread.
+    """
+    turn_tokens: int = 80_000
+    turn_llm_calls: int = 8
+    turn_seconds: float = 60.0
+    thread_tokens: int = 1_000_000
+    thread_seconds: float = 1800.0
+
+    def turn_exceeded(self, state) -> str:
+        """Return why the current turn is out of budget, or "" if it isn't.
+
+        Args:
+            state: The graph state (`BuddyState`).
+        """
+        turn_tokens = state.input_tokens + state.output_tokens
+        elapsed = time.time() - state.turn_started_at if state.turn_started_at else 0.0
+        if turn_tokens >= self.turn_tokens:
+            return f"{turn_tokens} tokens used, limit {self.turn_tokens}"
+        if state.llm_calls >= self.turn_llm_calls:
+            return f"{state.llm_calls} model calls, limit {self.turn_llm_calls}"
+        if elapsed >= self.turn_seconds:
+            return f"{elapsed:.0f}s elapsed, limit {self.turn_seconds:.0f}s"
+        return self.thread_exceeded(state, pending_tokens=turn_tokens, pending_seconds=elapsed)
+
+    def thread_exceeded(self, state, pending_tokens: int = 0, pending_seconds: float = 0.0) -> str:
+        """Return why the thread is out of budget, or "" if it isn't.
+
+        Args:
+            state: The graph state (`BuddyState`).
+            pending_tokens: Tokens used by the current turn, not yet added to the thread totals.
+            pending_seconds: Time spent in the current turn, not yet added to the thread totals.
+        """
+        thread_tokens = state.thread_input_tokens + state.thread_output_tokens + pending_tokens
+        thread_seconds = state.thread_seconds + pending_seconds
+        if thread_tokens >= self.thread_tokens:
+            return f"{thread_tokens} tokens used in this conversation, limit {self.thread_tokens}"
+        if thread_seconds >= self.thread_seconds:
+            return f"{thread_seconds:.0f}s spent in this conversation, limit {self.thread_seconds:.0f}s"
+        return ""
+
+
+def format_usage(usage: dict) -> str:
+    """One-line summary of a run's `usage` state for display.
+
+    Args:
+        usage: The `usage` value from the thread state.
+
+    Returns:
+        str: E.g. "1,234 in (800 cached) / 210 out tokens, 2 model calls, 3.1s · conversation: 5,678 tokens".
+    """
+    if not usage:
+        return ""
+    turn, thread = usage.get("turn", {}), usage.get("thread", {})
+    text = (
+        f"{turn.get('input_tokens', 0):,} in ({turn.get('cached_input_tokens', 0):,} cached) / "
+        f"{turn.get('output_tokens', 0):,} out tokens, {turn.get('llm_calls', 0)} model calls, "
+        f"{turn.get('seconds', 0)}s · conversation: "
+        f"{thread.get('input_tokens', 0) + thread.get('output_tokens', 0):,} tokens"
+    )
+    if usage.get("budget_exceeded"):
+        text += f" · stopped early: {usage['budget_exceeded']}"
+    return text
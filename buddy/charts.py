@@ -0,0 +1,125 @@
+"""
+Server-side chart building for the make_chart tool.
+
+Figures are built from stored query results, so the model only sends a small chart spec and never re-emits data
+points as tokens. Large series are aggregated or downsampled before serializing to keep the JSON payload small.
+"""
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Upper bounds on what ends up in the figure JSON
+MAX_POINTS = 500
+MAX_BARS = 50
+HISTOGRAM_BINS = 30
+
+
+def _require(df: "pd.DataFrame", *columns: Optional[str]):
+    missing = [c for c in columns if c is not None and c not in df.columns]
+    if missing:
+        raise ValueError(f"unknown column(s) {missing}. Available columns: {list(df.columns)}")
+
+
+def _downsample_line(df: "pd.DataFrame", x: str, y: str, group: Optional[str], max_points: int) -> "pd.DataFrame":
+    """Average consecutive points into at most `max_points` buckets overall, preserving each series' shape."""
+    import numpy as np
+    import pandas as pd
+
+    def _bucket(series_df: "pd.DataFrame", points: int) -> "pd.DataFrame":
+        series_df = series_df.sort_values(x)
+        if len(series_df) <= points:
+            return series_df
+        buckets = np.arange(len(series_df)) * points // len(series_df)
+        agg = {c: "first" for c in series_df.columns}
+        agg[y] = "mean"
+        return series_df.groupby(buckets).agg(agg)
+
+    if group is None:
+        return _bucket(df, max_points)
+    per_series = max(max_points // max(df[group].nunique(), 1), 2)
+    return pd.concat([_bucket(g, per_series) for _, g in df.groupby(group)], ignore_index=True)
+
+
+def _downsample_scatter(df: "pd.DataFrame", max_points: int) -> "pd.DataFrame":
+    """Keep an evenly spaced subset of rows."""
+    if len(df) <= max_points:
+        return df
+    step = -(-len(df) // max_points)
+    return df.iloc[::step]
+
+
+def build_chart_json(
+        df: "pd.DataFrame",
+        chart_type: str,
+        x: str,
+        y: Optional[str] = None,
+        color: Optional[str] = None,
+        aggregate: Optional[str] = None,
+        title: str = "",
+        max_points: int = MAX_POINTS,
+        max_bars: int = MAX_BARS
+) -> tuple[str, int]:
+    """Build a Plotly figure from a query result and serialize it.
+
+    Args:
+        df: The stored query result.
+        chart_type: One of "bar", "line", "scatter" or "histogram".
+        x: The x column.
+        y: The y column (unused for histograms).
+        color: Optional column to split series by.
+        aggregate: Optional pandas aggregation applied to y per (x, color).
+        title: The figure title.
+        max_points: Maximum points per line/scatter figure.
+        max_bars: Maximum bars in a bar chart; the largest values are kept.
+
+    Returns:
+        tuple: The figure JSON (readable with `plotly.io.from_json`) and the number of plotted points.
+    """
+    import numpy as np
+    import pandas as pd
+    import plotly.graph_objects as go
+
+    _require(df, x, y, color)
+    if chart_type != "histogram" and y is None:
+        raise ValueError(f"a {chart_type} chart needs a y column")
+
+    data = df[[c for c in dict.fromkeys([x, y, color]) if c is not None]].dropna().copy()
+
+    if chart_type == "histogram":
+        values = pd.to_numeric(data[x], errors="coerce").dropna()
+        counts, edges = np.histogram(values, bins=min(HISTOGRAM_BINS, max(len(values), 1)))
+        centers = (edges[:-1] + edges[1:]) / 2
+        fig = go.Figure(go.Bar(x=centers.round(3), y=counts, width=np.diff(edges)))
+        fig.update_layout(title=title, xaxis_title=x, yaxis_title="count", bargap=0.02)
+        return fig.to_json(), len(counts)
+
+    data[y] = pd.to_numeric(data[y], errors="coerce")
+    keys = [c for c in (x, color) if c is not None]
+    if aggregate:
+        data = data.groupby(keys, as_index=False)[y].agg(aggregate)
+
+    if chart_type == "bar":
+        if not aggregate and data.duplicated(keys).any():
+            data = data.groupby(keys, as_index=False)[y].sum()
+        top_x = data.groupby(x)[y].sum().nlargest(max_bars).index
+        data = data[data[x].isin(top_x)].copy()
+    elif chart_type == "line":
+        data = _downsample_line(data, x, y, color, max_points)
+    elif chart_type == "scatter":
+        data = _downsample_scatter(data, max_points).copy()
+    else:
+        raise ValueError(f"unsupported chart_type {chart_type!r}")
+
+    data[y] = data[y].round(3)
+    series = [(None, data)] if color is None else list(data.groupby(color))
+
+    fig = go.Figure()
+    for name, series_df in series:
+        kwargs = dict(x=series_df[x], y=series_df[y], name=None if name is None else str(name))
+        if chart_type == "bar":
+            fig.add_trace(go.Bar(**kwargs))
+        else:
+            fig.add_trace(go.Scatter(mode="lines+markers" if chart_type == "line" else "markers", **kwargs))
+    fig.update_layout(title=title, xaxis_title=x, yaxis_title=y, showlegend=color is not None)
+    return fig.to_json(), len(data)
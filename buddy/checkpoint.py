@@ -0,0 +1,190 @@
+"""
+Persistent checkpointers for running the graph outside the LangGraph API server.
+
+`CHECKPOINT_URI` picks the backend: `memory://` keeps threads in process (no extra dependencies),
+`sqlite:///path/to/file.sqlite` persists them for development and `postgresql://...` for production. Checkpoints are serialized with msgpack, tool outputs above a size limit are replaced by the same
+pointer history compaction uses, and only the last `CHECKPOINT_KEEP_LAST` checkpoints of each thread are kept.
+
+The savers are async and bound to the event loop that opens them, so `open_checkpointer` must run on the loop that
+runs the graph (`Agent` does this on first use). The SQLite and Postgres savers need the `checkpoint` extra.
+"""
+import abc
+import logging
+from typing import Any, Optional
+
+from langchain_core.messages import ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from buddy import env
+from buddy.compaction import COMPACTED_MARKER, compact_tool_message
+
+logger = logging.getLogger(__name__)
+
+# Tool outputs larger than this are not worth persisting in full; compaction would replace them anyway
+MAX_TOOL_CHARS = 8000
+
+
+class CompactSerializer(JsonPlusSerializer):
+    """msgpack serializer that stores large tool outputs as a pointer to the stored result.
+
+    Attributes:
+        max_tool_chars: ToolMessage contents longer than this are compacted before serializing.
+    """
+
+    def __init__(self, max_tool_chars: int = MAX_TOOL_CHARS, **kwargs):
+        super().__init__(**kwargs)
+        self.max_tool_chars = max_tool_chars
+
+    def _slim_message(self, message: Any) -> Any:
+        if (
+                isinstance(message, ToolMessage)
+                and isinstance(message.content, str)
+                and len(message.content) > self.max_tool_chars
+                and not message.content.startswith(COMPACTED_MARKER)
+        ):
+            return compact_tool_message(message)
+        return message
+
+    def _slim(self, obj: Any) -> Any:
+        # Channel values and writes are message lists; whole checkpoints nest them under "channel_values"
+        if isinstance(obj, list):
+            return [self._slim_message(m) for m in obj]
+        if isinstance(obj, dict) and isinstance(obj.get("channel_values"), dict):
+            return {**obj, "channel_values": {k: self._slim(v) for k, v in obj["channel_values"].items()}}
+        return obj
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        # JsonPlusSerializer writes msgpack (langgraph-checkpoint>=2.0)
+        return super().dumps_typed(self._slim(obj))
+
+
+class _PruningMixin(abc.ABC):
+    """Deletes all but the newest `keep_last` checkpoints of a thread after each write."""
+    keep_last: int = 20
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        next_config = await super().aput(config, checkpoint, metadata, new_versions)
+        configurable = next_config["configurable"]
+        try:
+            await self._prune(configurable["thread_id"], configurable.get("checkpoint_ns", ""))
+        except Exception as e:
+            logger.warning("Checkpoint pruning failed for thread %s: %s", configurable["thread_id"], e)
+        return next_config
+
+    @abc.abstractmethod
+    async def _prune(self, thread_id: str, checkpoint_ns: str):
+        """Delete the thread's checkpoints older than the newest `keep_last`."""
+
+
+def _sqlite_saver(path: str, serde: CompactSerializer, keep_last: int):
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    class PruningSqliteSaver(_PruningMixin, AsyncSqliteSaver):
+        async def _prune(self, thread_id: str, checkpoint_ns: str):
+            # checkpoint_id is a time-ordered uuid6, so the newest checkpoints sort last
+            async with self.lock:
+                for table in ("writes", "checkpoints"):
+                    await self.conn.execute(
+                        f"""
+                        DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN (
+                            SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+                            ORDER BY checkpoint_id DESC LIMIT ?
+                        )
+                        """,
+                        (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last)
+                    )
+                await self.conn.commit()
+
+    # The saver starts the (not yet awaited) connection and creates its tables on first use
+    saver = PruningSqliteSaver(aiosqlite.connect(path), serde=serde)
+    saver.keep_last = keep_last
+    return saver
+
+
+async def _postgres_saver(uri: str, serde: CompactSerializer, keep_last: int):
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+
+    class PruningPostgresSaver(_PruningMixin, AsyncPostgresSaver):
+        async def _prune(self, thread_id: str, checkpoint_ns: str):
+            async with self._cursor() as cur:
+                for table in ("checkpoint_writes", "checkpoints"):
+                    await cur.execute(
+                        f"""
+                        DELETE FROM {table} WHERE thread_id = %s AND checkpoint_ns = %s AND checkpoint_id NOT IN (
+                            SELECT checkpoint_id FROM checkpoints WHERE thread_id = %s AND checkpoint_ns = %s
+                            ORDER BY checkpoint_id DESC LIMIT %s
+                        )
+                        """,
+                        (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last)
+                    )
+                # Channel values are stored once per version; drop versions no remaining checkpoint points at
+                await cur.execute(
+                    """
+                    DELETE FROM checkpoint_blobs b WHERE b.thread_id = %s AND b.checkpoint_ns = %s AND NOT EXISTS (
+                        SELECT 1 FROM checkpoints c, jsonb_each_text(c.checkpoint -> 'channel_versions') v
+                        WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+                        AND v.key = b.channel AND v.value = b.version
+                    )
+                    """,
+                    (thread_id, checkpoint_ns)
+                )
+
+    pool = AsyncConnectionPool(
+        uri,
+        min_size=1,
+        max_size=10,
+        open=False,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row}
+    )
+    await pool.open()
+    saver = PruningPostgresSaver(pool, serde=serde)
+    saver.keep_last = keep_last
+    await saver.setup()
+    return saver
+
+
+async def open_checkpointer(
+        uri: Optional[str] = None,
+        keep_last: Optional[int] = None,
+        max_tool_chars: int = MAX_TOOL_CHARS
+):
+    """Open the checkpointer configured by `uri`. Must be awaited on the event loop that runs the graph.
+
+    Args:
+        uri: `memory://`, `sqlite:///<path>` or `postgresql://...`. Defaults to `CHECKPOINT_URI`.
+        keep_last: Checkpoints kept per thread. Defaults to `CHECKPOINT_KEEP_LAST`.
+        max_tool_chars: Tool outputs longer than this are stored compacted.
+
+    Returns:
+        BaseCheckpointSaver: The saver, or None if no URI is configured.
+    """
+    uri = uri or env.CHECKPOINT_URI
+    if not uri:
+        return None
+    keep_last = keep_last or env.CHECKPOINT_KEEP_LAST
+    serde = CompactSerializer(max_tool_chars=max_tool_chars)
+
+    if uri.startswith("memory:"):
+        from langgraph.checkpoint.memory import InMemorySaver
+
+        # Lost on exit, so neither pruned nor compacted
+        logger.info("Keeping checkpoints in memory")
+        return InMemorySaver()
+
+    try:
+        if uri.startswith("sqlite:///"):
+            saver = _sqlite_saver(uri.removeprefix("sqlite:///"), serde, keep_last)
+        elif uri.startswith(("postgres://", "postgresql://")):
+            saver = await _postgres_saver(uri, serde, keep_last)
+        else:
+            raise ValueError(f"Unsupported CHECKPOINT_URI scheme: {uri.split(':', 1)[0]}")
+    except ImportError as e:
+        raise ImportError(
+            f"CHECKPOINT_URI={uri.split(':', 1)[0]}:... needs the checkpoint extra (pip install '.[checkpoint]'): {e}"
+        ) from e
+
+    logger.info("Opened %s checkpointer (keeping %d checkpoints per thread)", uri.split(":", 1)[0], keep_last)
+    return saver
@@ -0,0 +1,114 @@
+"""
+Conversation history compaction.
+
+Long threads would otherwise resend every old query_db table on each LLM call. The compaction step keeps the most
+recent turns verbatim, replaces older tool outputs with a one-line pointer to the stored result, and folds the
+oldest turns into a running summary once the history goes over a token budget. Both steps work in batches so the
+history only changes (and the provider's prompt cache is only invalidated) occasionally, not on every turn.
+"""
+import re
+from dataclasses import dataclass
+from typing import List
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from buddy.tokens import count_tokens
+
+COMPACTED_MARKER = "[compacted]"
+
+SUMMARY_PROMPT = (
+    "Summarize the earlier part of this fantasy basketball conversation for your own future reference. Keep the "
+    "user's goals and preferences, the players, teams and users discussed, conclusions and recommendations given, "
+    "and any result_id values with what they contain. Drop SQL and raw tables. Be concise."
+)
+
+_SCHEMA_TABLE = re.compile(r"^(\w+)\(", re.MULTILINE)
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Estimate the tokens a message adds to a prompt, including tool call arguments."""
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    tokens = count_tokens(content)
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += count_tokens(str(tool_call.get("args", "")))
+    return tokens
+
+
+def split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Group messages into turns, each starting at a HumanMessage."""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def schema_tables(messages: List[BaseMessage]) -> List[str]:
+    """Tables whose schema is present in the given history."""
+    tables = []
+    for message in messages:
+        if isinstance(message, SystemMessage) and message.content.startswith("## DB SCHEMA"):
+            tables.extend(_SCHEMA_TABLE.findall(message.content))
+    return tables
+
+
+def compact_tool_message(message: ToolMessage) -> ToolMessage:
+    """Replace a tool output with a short description that points at the stored result."""
+    artifact = message.artifact if isinstance(message.artifact, dict) else {}
+    if "result_id" in artifact:
+        columns = ", ".join(artifact.get("columns", []))
+        content = (
+            f"{COMPACTED_MARKER} {message.name or 'tool'} returned {artifact.get('rows', '?')} rows "
+            f"(columns: {columns}) as result_id {artifact['result_id']}. Re-run the query if the values are needed."
+        )
+    else:
+        text = message.content if isinstance(message.content, str) else str(message.content)
+        content = f"{COMPACTED_MARKER} {text[:200]}"
+    return message.model_copy(update={"content": content})
+
+
+@dataclass
+class Compactor:
+    """Decides what to compact in a thread's history.
+
+    Attributes:
+        keep_turns: The number of most recent turns that are never touched.
+        tool_batch_tokens: Old, uncompacted tool output is only compacted once it adds up to this many tokens.
+        token_budget: Once the history is larger than this, turns older than `keep_turns` are summarized.
+        summary_batch_tokens: Older turns are only summarized once they add up to this many tokens, so a history
+            whose recent turns alone exceed `token_budget` isn't re-summarized on every turn.
+        min_tool_tokens: Tool outputs smaller than this are left as they are.
+    """
+    keep_turns: int = 3
+    tool_batch_tokens: int = 2000
+    token_budget: int = 12000
+    summary_batch_tokens: int = 4000
+    min_tool_tokens: int = 100
+
+    def _old_messages(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        turns = split_turns(messages)
+        return [m for turn in turns[:-self.keep_turns] for m in turn] if len(turns) > self.keep_turns else []
+
+    def compact_tool_outputs(self, messages: List[BaseMessage]) -> List[ToolMessage]:
+        """Return replacements (same ids) for large tool outputs outside the recent turns, or [] if the batch
+        isn't big enough to be worth invalidating the cached prefix for."""
+        candidates = [
+            m for m in self._old_messages(messages)
+            if isinstance(m, ToolMessage)
+            and not str(m.content).startswith(COMPACTED_MARKER)
+            and message_tokens(m) >= self.min_tool_tokens
+        ]
+        if sum(message_tokens(m) for m in candidates) < self.tool_batch_tokens:
+            return []
+        return [compact_tool_message(m) for m in candidates]
+
+    def messages_to_summarize(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """Return the turns to fold into the summary, or [] while the history is within budget or the older turns
+        are too few to be worth invalidating the cached prefix for."""
+        if sum(message_tokens(m) for m in messages) <= self.token_budget:
+            return []
+        old = self._old_messages(messages)
+        if sum(message_tokens(m) for m in old) < self.summary_batch_tokens:
+            return []
+        return old
@@ -11,6 +11,33 @@ REDIS_URI=os.getenv("REDIS_URI", None)
 DATABASE_URI=os.getenv("DATABASE_URI", None)
 TAVILY_KEY=os.getenv("TAVILY_KEY", None)
 
+# Optional embedded replica of each league's tables (see buddy/replica.py). Disabled when unset.
+# Built and read by the LangGraph server, so set it there.
+REPLICA_DIR=os.getenv("REPLICA_DIR", None)
+REPLICA_MAX_AGE_SECONDS=int(os.getenv("REPLICA_MAX_AGE_SECONDS", "21600"))
+
+# Preflight budgets for model-generated SQL (see buddy/sql_guard.py)
+QUERY_DEFAULT_LIMIT=int(os.getenv("QUERY_DEFAULT_LIMIT", "200"))
+QUERY_MAX_COST=float(os.getenv("QUERY_MAX_COST", "500000"))
+QUERY_MAX_ROWS=int(os.getenv("QUERY_MAX_ROWS", "1000"))
+
+# Checkpointer for running the graph outside the LangGraph server (see buddy/checkpoint.py). None when unset.
+CHECKPOINT_URI=os.getenv("CHECKPOINT_URI", None)
+CHECKPOINT_KEEP_LAST=int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+
+# Local telemetry (see buddy/telemetry.py): JSONL span export and a metrics endpoint. Both off when unset.
+TELEMETRY_JSONL=os.getenv("TELEMETRY_JSONL", None)
+TELEMETRY_PORT=int(os.getenv("TELEMETRY_PORT", "0")) or None
+# Interface the metrics endpoint binds to. Set to 0.0.0.0 to let scrapers on other hosts reach it.
+TELEMETRY_HOST=os.getenv("TELEMETRY_HOST", "127.0.0.1")
+TELEMETRY_WINDOW=int(os.getenv("TELEMETRY_WINDOW", "1000"))
+
+# Serve the graph with the scripted benchmark model instead of OpenAI (see buddy/fake_llm.py), e.g. for
+# benchmarks/load_test.py. "1" uses benchmarks/scenarios.json; any other value is a path to a scenarios file.
+FAKE_LLM=os.getenv("FAKE_LLM", None)
+FAKE_LLM_TTFT=float(os.getenv("FAKE_LLM_TTFT", "0.3"))
+FAKE_LLM_TOKEN_LATENCY=float(os.getenv("FAKE_LLM_TOKEN_LATENCY", "0.01"))
+
 
 required_env_vars = [
     "SUPABASE_URL",
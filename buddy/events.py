@@ -0,0 +1,64 @@
+"""
+Tool lifecycle events on the graph's "custom" stream.
+
+Clients streaming with `stream_mode="custom"` receive one dict per event, so they can show progress while a tool runs
+instead of waiting for the next LLM token:
+
+    {"type": "tool", "event": "started",  "tool": "query_db", "tool_call_id": "call_..."}
+    {"type": "tool", "event": "progress", ..., "rows": 500}
+    {"type": "tool", "event": "preview",  ..., "rows": 5, "columns": [...], "preview": "<markdown table>"}
+    {"type": "tool", "event": "finished", ..., "rows": 1200, "duration_ms": 840.2, "status": "success"}
+
+`rows` is only set by tools that return rows.
+"""
+from typing import Any, Callable, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+PREVIEW_ROWS = 5
+
+
+def _noop(_: Any):
+    pass
+
+
+def writer() -> Callable[[Any], None]:
+    """The current run's custom stream writer, or a no-op outside a graph run (e.g. a tool called directly)."""
+    try:
+        from langgraph.config import get_stream_writer
+
+        return get_stream_writer()
+    except Exception:
+        return _noop
+
+
+def tool_event(event: str, tool: str, tool_call_id: Optional[str], **fields):
+    """Send one tool lifecycle event to the custom stream."""
+    writer()({"type": "tool", "event": event, "tool": tool, "tool_call_id": tool_call_id, **fields})
+
+
+def tool_call_id(config: Optional[RunnableConfig]) -> Optional[str]:
+    """The id of the tool call being executed, set by the tool executor."""
+    return (config or {}).get("configurable", {}).get("tool_call_id")
+
+
+def render(event: dict) -> str:
+    """Render a tool event as plain text for terminal clients.
+
+    Returns:
+        str: The text to print, or "" for events that are not worth showing.
+    """
+    if event.get("type") != "tool":
+        return ""
+    tool, kind = event.get("tool", "tool"), event.get("event")
+    if kind == "progress":
+        return f"< {tool}: {event['rows']} rows fetched >\n"
+    if kind == "preview":
+        return f"\n{event['preview']}\n< first rows of the result, still running >\n\n"
+    if kind == "finished":
+        seconds = event.get("duration_ms", 0) / 1000
+        if event.get("status") == "error":
+            return f"< {tool} failed after {seconds:.1f}s >\n\n"
+        rows = f"{event['rows']} rows in " if event.get("rows") is not None else ""
+        return f"< {tool} finished: {rows}{seconds:.1f}s >\n\n"
+    return ""
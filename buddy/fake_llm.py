@@ -0,0 +1,136 @@
+"""
+A scripted chat model for running the agent without OpenAI.
+
+Replays recorded tool-call sequences per question with a simulated time to first token and per-token latency, and
+reports token usage like a real provider would, so benchmarks measure everything except the model itself.
+"""
+import asyncio
+import json
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from buddy.tokens import count_tokens
+
+
+_RESULT_ID = re.compile(r"result_id: (r_\w+)")
+
+
+def _key(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def _fill(args: dict, messages: List[BaseMessage]) -> dict:
+    """Replace `{{result_id}}` with the id of the latest stored query result, as the real model would."""
+    result_id = next(
+        (m.group(1) for msg in reversed(messages) if isinstance(msg, ToolMessage)
+         for m in [_RESULT_ID.search(str(msg.content))] if m),
+        ""
+    )
+    return {k: v.replace("{{result_id}}", result_id) if isinstance(v, str) else v for k, v in args.items()}
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Answers from a script instead of a provider.
+
+    Attributes:
+        scripts: Question -> steps. Each step is the model's reply to one call within the turn, either
+            `{"tool_calls": [{"name": ..., "args": {...}}]}` or `{"content": "..."}`. The last step is repeated if
+            the turn needs more calls than scripted. `{{result_id}}` in string arguments is replaced with the
+            latest result id.
+        ttft: Simulated seconds to the first token of each call.
+        token_latency: Simulated seconds per output token.
+        fallback: The reply to questions without a script.
+    """
+    scripts: dict[str, List[dict]] = {}
+    ttft: float = 0.0
+    token_latency: float = 0.0
+    fallback: str = "I don't have a scripted answer for that."
+
+    @classmethod
+    def from_file(cls, path: str | Path, **kwargs) -> "ScriptedChatModel":
+        """Load scripts from a JSON file with a list of `{"question": ..., "steps": [...]}` objects."""
+        scenarios = json.loads(Path(path).read_text())
+        return cls(scripts={_key(s["question"]): s["steps"] for s in scenarios}, **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        # The step is the number of model replies since the user's message
+        turn_start = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+        question = messages[turn_start].content if messages else ""
+        steps = self.scripts.get(_key(str(question))) or [{"content": self.fallback}]
+        calls_so_far = sum(isinstance(m, AIMessage) for m in messages[turn_start:])
+        step = steps[min(calls_so_far, len(steps) - 1)]
+
+        tool_calls = [
+            {"name": c["name"], "args": _fill(c["args"], messages), "id": f"call_{uuid.uuid4().hex[:12]}",
+             "type": "tool_call"}
+            for c in step.get("tool_calls", [])
+        ]
+        content = step.get("content", "")
+        input_tokens = sum(count_tokens(m.content if isinstance(m.content, str) else str(m.content)) for m in messages)
+        output_tokens = count_tokens(content) + sum(count_tokens(json.dumps(c["args"])) for c in tool_calls)
+        return AIMessage(
+            content=content,
+            tool_calls=tool_calls,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens
+            },
+            response_metadata={"model_name": "scripted", "finish_reason": "tool_calls" if tool_calls else "stop"}
+        )
+
+    def _delay(self, message: AIMessage) -> float:
+        return self.ttft + message.usage_metadata["output_tokens"] * self.token_latency
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._reply(messages)
+        time.sleep(self._delay(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._reply(messages)
+        await asyncio.sleep(self._delay(message))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        message = self._reply(messages)
+        await asyncio.sleep(self.ttft)
+
+        words = message.content.split(" ") if message.content else []
+        for i, word in enumerate(words):
+            text = word if i == 0 else f" {word}"
+            await asyncio.sleep(count_tokens(text) * self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                for i, c in enumerate(message.tool_calls)
+            ],
+            usage_metadata=message.usage_metadata,
+            response_metadata=message.response_metadata
+        ))
+
+
+def load(path: Optional[str] = None, **kwargs) -> ScriptedChatModel:
+    """Load the scripted model, by default with the benchmark scenarios."""
+    path = path or Path(__file__).resolve().parent.parent / "benchmarks" / "scenarios.json"
+    return ScriptedChatModel.from_file(path, **kwargs)
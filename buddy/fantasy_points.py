@@ -0,0 +1,142 @@
+"""
+League-specific fantasy points.
+
+A league's `scoring_settings` map stat keys to points, e.g. `{"pts": 1, "reb": 1.2, "ast": 1.5, "to": -1}`. Scoring
+every player is one matrix product: the (players x stats) matrix of stat lines times the weight vector. The same
+product scores the season totals and every week at once.
+
+`compute()` scores a whole league and `extract_sleeper_data.py` stores the result in `league_fantasy_points` on each
+ingest, so "fantasy points per game under my scoring" is a lookup instead of model-written SQL. The lineup and trade
+tools use `weights()` and `score()` directly.
+"""
+import logging
+from typing import TYPE_CHECKING, Mapping, Optional
+
+from sqlalchemy import text
+
+from buddy import telemetry
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# Numeric stat columns shared by aggregated_player_statistics and weekly_player_statistics
+STAT_COLUMNS = (
+    "pts", "reb", "ast", "stl", "blk", "turnovers", "tpm", "tpa", "tpmi", "fgm", "fga", "fgmi", "ftm", "fta", "ftmi",
+    "oreb", "dreb", "pf", "tf", "ff", "dd", "td", "blk_stl", "pts_reb", "pts_ast", "reb_ast", "pts_reb_ast",
+    "bonus_pt_40p", "bonus_pt_50p", "bonus_ast_15p", "bonus_reb_20p", "gs", "sp", "plus_minus",
+)
+
+# Sleeper scoring keys whose column has a different name
+ALIASES = {"to": "turnovers"}
+
+SEASON_WEEK = 0
+
+
+def weights(scoring_settings: Mapping[str, float]) -> dict[str, float]:
+    """The scoring weights per stat column. Keys with no matching column (e.g. NFL-only settings) are dropped.
+
+    Args:
+        scoring_settings: The league's `scoring_settings`.
+
+    Returns:
+        dict[str, float]: Column -> points per unit, without zero weights.
+    """
+    result: dict[str, float] = {}
+    for key, value in (scoring_settings or {}).items():
+        column = ALIASES.get(key, key)
+        if column in STAT_COLUMNS and value:
+            result[column] = result.get(column, 0.0) + float(value)
+    return result
+
+
+def score(stats: "pd.DataFrame", scoring: Mapping[str, float]) -> "np.ndarray":
+    """Fantasy points of every row of `stats` in one matrix product.
+
+    Args:
+        stats: One stat line per row. Missing stats count as zero.
+        scoring: Column -> weight, e.g. from `weights()`.
+
+    Returns:
+        np.ndarray: The points of each row.
+    """
+    import numpy as np
+
+    columns = [c for c in scoring if c in stats.columns]
+    if not columns:
+        return np.zeros(len(stats))
+    matrix = stats[columns].to_numpy(dtype=float, na_value=0.0)
+    vector = np.fromiter((scoring[c] for c in columns), dtype=float, count=len(columns))
+    return matrix @ vector
+
+
+def _read_stats(conn: "Connection", table: str, columns: list[str], where: str, params: dict) -> "pd.DataFrame":
+    import pandas as pd
+
+    # Column names come from STAT_COLUMNS only, never from the scoring settings as given
+    selected = ", ".join(f"CAST({c} AS double precision) AS {c}" for c in columns)
+    keys = "season, week, player_id" if table == "weekly_player_statistics" else "player_id, CAST(gp AS double precision) AS gp"
+    result = conn.execute(text(f"SELECT {keys}, {selected} FROM public.{table} {where}"), params)
+    return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+
+def compute(league_id: str, conn: Optional["Connection"] = None) -> "pd.DataFrame":
+    """Score the season totals and every ingested week of a league under its own scoring settings.
+
+    Args:
+        league_id: The league.
+        conn: An open connection. Defaults to a new connection from the agent's engine.
+
+    Returns:
+        pd.DataFrame: Rows for `league_fantasy_points`: league_id, season, week (0 for the season totals),
+            player_id, fantasy_points, games and fantasy_points_per_game (season rows only).
+    """
+    import pandas as pd
+
+    if conn is None:
+        from buddy.tools import session
+
+        with session.engine.connect() as conn:
+            return compute(league_id, conn)
+
+    with telemetry.span("fantasy_points.compute", league_id=league_id):
+        league = conn.execute(
+            text("SELECT season, scoring_settings FROM public.league_information WHERE league_id = :league_id"),
+            {"league_id": league_id},
+        ).first()
+        if league is None:
+            raise ValueError(f"League {league_id} has not been ingested")
+        scoring = weights(league.scoring_settings)
+        if not scoring:
+            logger.warning("League %s has no scoring settings for NBA stats", league_id)
+        columns = list(scoring) or ["pts"]
+
+        season = _read_stats(conn, "aggregated_player_statistics", columns, "", {})
+        season_points = score(season, scoring)
+        games = pd.to_numeric(season["gp"], errors="coerce")
+        season_rows = pd.DataFrame({
+            "league_id": league_id,
+            "season": league.season,
+            "week": SEASON_WEEK,
+            "player_id": season["player_id"],
+            "fantasy_points": season_points.round(2),
+            "games": games,
+            "fantasy_points_per_game": (season_points / games.where(games > 0)).round(2),
+        })
+
+        weekly = _read_stats(
+            conn, "weekly_player_statistics", columns, "WHERE league_id = :league_id", {"league_id": league_id}
+        )
+        weekly_rows = pd.DataFrame({
+            "league_id": league_id,
+            "season": weekly["season"],
+            "week": weekly["week"],
+            "player_id": weekly["player_id"],
+            "fantasy_points": score(weekly, scoring).round(2),
+            "games": None,
+            "fantasy_points_per_game": None,
+        })
+        return pd.concat([season_rows, weekly_rows], ignore_index=True)
@@ -1,17 +1,51 @@
+import asyncio
+import logging
+import threading
+import time
 from pydantic import BaseModel
-from typing import Annotated, List, Generator
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessageChunk, AIMessage
+from typing import Annotated, AsyncGenerator, Coroutine, List, Generator, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    BaseMessage, HumanMessage, SystemMessage, AIMessageChunk, AIMessage, RemoveMessage, ToolMessage
+)
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph.message import add_messages
 from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode
-from buddy.tools import query_db
+from langgraph.store.base import BaseStore
+from buddy.tools import query_db, league_summary, optimize_lineup, find_trades, make_chart, session
+from buddy.tool_executor import ToolExecutor
 from buddy.prompts import prompts
+from buddy.schema import SchemaProvider, provider as schema_provider
+from buddy import answer_cache, budget, compaction, env, events, routing, telemetry, tokens
+from buddy.budget import Budget
+from buddy.compaction import Compactor
+from buddy.routing import Router
+
+logger = logging.getLogger(__name__)
 
 
 class BuddyState(BaseModel):
     messages: Annotated[List[BaseMessage], add_messages] = []
     chart_json: str = ""
+    summary: str = ""
+    username: str = ""
+    league_id: str = ""
+    schema_tables: List[str] = []
+    schema_tokens_saved: int = 0
+    input_tokens: int = 0
+    cached_input_tokens: int = 0
+    cache_hit: bool = False
+    route: str = ""
+    turn_started_at: float = 0.0
+    output_tokens: int = 0
+    llm_calls: int = 0
+    thread_input_tokens: int = 0
+    thread_output_tokens: int = 0
+    thread_seconds: float = 0.0
+    thread_turns: int = 0
+    budget_exceeded: str = ""
+    usage: dict = {}
+    prefetch: bool = False
 
 
 class Agent:
@@ -24,59 +58,464 @@ class Agent:
         model: The model to use for the agent.
         system_prompt: The system prompt for the agent.
         temperature: The temperature for the agent.
+        schema: Provides the DB schema injected into the system prompt, filtered to the tables the current
+            question needs. None to send the system prompt as is.
+        compactor: Decides when old tool outputs are compacted and old turns summarized. None to keep the
+            full history.
+        cache_threshold: Minimum similarity for serving an answer from the semantic answer cache. None disables
+            the cache.
+        store: Store for the answer cache when running locally. The LangGraph API server provides its own.
+        llm: A chat model to use instead of `ChatOpenAI(model=model)`, e.g. a scripted model for benchmarks.
+        tool_timeouts: Per-tool deadlines in seconds, overriding `tool_executor.DEFAULT_TIMEOUTS`.
+        fast_model: The model for turns the router classifies as lookups.
+        router: Classifies each turn as a lookup or an analysis request. None sends every turn to `model`.
+        checkpoint_uri: Persist threads with the checkpointer for this URI (see `buddy.checkpoint`). It is opened
+            on first use by the Agent entry points; `runnable` compiles without it until then, which is what the
+            LangGraph server (which brings its own) gets.
+        budget: Token, LLM call and time limits per turn and per thread. None disables them.
     """
 
     def __init__(
             self,
             name: str,
-            tools: List = [query_db],
+            tools: List = [query_db, league_summary, optimize_lineup, find_trades, make_chart],
             model: str = "gpt-4.1-mini-2025-04-14",
             system_prompt: str = "You are a helpful assistant.",
-            temperature: float = 0.1
+            temperature: float = 0.1,
+            schema: Optional[SchemaProvider] = schema_provider,
+            compactor: Optional[Compactor] = Compactor(),
+            cache_threshold: Optional[float] = answer_cache.DEFAULT_THRESHOLD,
+            store: Optional[BaseStore] = None,
+            llm: Optional[BaseChatModel] = None,
+            tool_timeouts: Optional[dict[str, float]] = None,
+            fast_model: str = "gpt-4.1-nano-2025-04-14",
+            router: Optional[Router] = Router(),
+            checkpoint_uri: Optional[str] = None,
+            budget: Optional[Budget] = Budget()
     ):
         self.name = name
         self.tools = tools
         self.model = model
+        self.fast_model = fast_model
+        self.router = router
         self.system_prompt = system_prompt
         self.temperature = temperature
+        self.schema = schema
+        self.compactor = compactor
+        self.cache_threshold = cache_threshold
+        self.store = store
+        self.checkpoint_uri = checkpoint_uri
+        self.budget = budget
+        self.tool_executor = ToolExecutor(tools, timeouts=tool_timeouts)
+
+        self._chat_model_override = llm
+        self._llm = None
+        self._fast_llm = None
+        self._summary_llm = None
+        self._wrap_up_llm = None
+        self._runnable = None
+        self._checkpointer = None
+        self._checkpointer_lock = asyncio.Lock()
+        self._warm_up_started = threading.Event()
+
+    def _chat_model(self, model: str):
+        if self._chat_model_override is not None:
+            return self._chat_model_override
 
-        self.llm = ChatOpenAI(
-            model=self.model,
+        # Imported here so `langchain_openai` stays out of import time
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(
+            model=model,
             temperature=self.temperature
-        ).bind_tools(self.tools)
+        )
+
+    @property
+    def llm(self):
+        """The tool-bound chat model, created on first use."""
+        if self._llm is None:
+            self._llm = self._chat_model(self.model).bind_tools(self.tools)
+        return self._llm
+
+    @property
+    def fast_llm(self):
+        """The tool-bound chat model for lookups, created on first use."""
+        if self._fast_llm is None:
+            self._fast_llm = self._chat_model(self.fast_model).bind_tools(self.tools)
+        return self._fast_llm
+
+    def llm_for(self, route: str):
+        """The tool-bound chat model for a route."""
+        return self.fast_llm if route == routing.LOOKUP else self.llm
+
+    @property
+    def summary_llm(self):
+        """The chat model used to summarize old turns, without tools."""
+        if self._summary_llm is None:
+            # Tagged so the summary never shows up in the user-facing "messages" stream
+            self._summary_llm = self._chat_model(self.model).with_config(tags=["nostream", "langsmith:nostream"])
+        return self._summary_llm
+
+    @property
+    def wrap_up_llm(self):
+        """The chat model that writes the final answer when a turn runs out of budget, without tools."""
+        if self._wrap_up_llm is None:
+            self._wrap_up_llm = self._chat_model(self.model)
+        return self._wrap_up_llm
+
+    async def asummarize(self, summary: str, messages: List[BaseMessage]) -> str:
+        """Fold `messages` into the running conversation summary.
+
+        Args:
+            summary: The existing summary, if any.
+            messages: The turns being removed from the history.
 
-        self.runnable = self.build_graph()
+        Returns:
+            str: The updated summary.
+        """
+        lines = []
+        for m in messages:
+            content = m.content if isinstance(m.content, str) else str(m.content)
+            if isinstance(m, HumanMessage):
+                lines.append(f"User: {content}")
+            elif isinstance(m, AIMessage) and content:
+                lines.append(f"Buddy: {content}")
+            elif isinstance(m, ToolMessage):
+                lines.append(f"Tool ({m.name}): {content[:300]}")
+        transcript = "\n".join(lines)
+        previous = f"Summary so far:\n{summary}\n\n" if summary else ""
+
+        response = await self.summary_llm.ainvoke([
+            SystemMessage(content=compaction.SUMMARY_PROMPT),
+            HumanMessage(content=f"{previous}Conversation to add:\n{transcript}")
+        ])
+        return response.content
+
+    @property
+    def runnable(self):
+        """The compiled graph. Compiled once on first access and reused."""
+        if self._runnable is None:
+            self._runnable = self.build_graph()
+        return self._runnable
+
+    async def arunnable(self):
+        """The compiled graph, with the checkpointer opened on the running event loop on first use."""
+        if self.checkpoint_uri and self._checkpointer is None:
+            async with self._checkpointer_lock:
+                if self._checkpointer is None:
+                    from buddy.checkpoint import open_checkpointer
+
+                    self._checkpointer = await open_checkpointer(self.checkpoint_uri)
+                    self._runnable = None
+        return self.runnable
+
+    def warm_up(self):
+        """Open pooled DB connections, load the tokenizer and embedding model and introspect the schema in the
+        background.
+
+        Only the first call does anything. It runs on the first graph run so the work overlaps with the first
+        LLM call instead of adding to import time or to the first query_db call.
+        """
+        if self._warm_up_started.is_set():
+            return
+        self._warm_up_started.set()
+
+        session.warm_up()
+        tokens.warm_up()
+        answer_cache.warm_up()
+        telemetry.start_exporters()
+        if self.schema is not None:
+            threading.Thread(target=self.schema.tables, name="buddy-schema-warm-up", daemon=True).start()
 
     def build_graph(self):
         """
         Build the LangGraph application.
         """
 
-        def buddy_node(state: BuddyState) -> BuddyState:
-            response = self.llm.invoke(
-                [SystemMessage(content=self.system_prompt)] +
-                state.messages
+        # One byte-identical prefix shared by every thread and call. Everything that varies comes after it, and the
+        # history only changes when it is compacted, so the provider's prompt cache can reuse the longest prefix.
+        prefix = [SystemMessage(content=self.system_prompt)]
+
+        def current_question(state: BuddyState) -> str:
+            for m in reversed(state.messages):
+                if isinstance(m, HumanMessage):
+                    return m.content if isinstance(m.content, str) else str(m.content)
+            return ""
+
+        def turn_messages(state: BuddyState) -> List[BaseMessage]:
+            turn_start = max((i for i, m in enumerate(state.messages) if isinstance(m, HumanMessage)), default=0)
+            return state.messages[turn_start:]
+
+        def route_node(state: BuddyState) -> dict:
+            route = self.router.route(current_question(state)) if self.router is not None else routing.ANALYSIS
+            logger.info("Routing turn to %s", route)
+            return {"route": route, "turn_started_at": time.time()}
+
+        async def prefetch_node(state: BuddyState) -> dict:
+            # Background run sent by the frontend after ingestion; no messages, no LLM call
+            from buddy import prefetch
+
+            self.warm_up()
+            if state.league_id:
+                await asyncio.to_thread(prefetch.run, state.league_id, state.username)
+            return {"prefetch": False}
+
+        def entry_router(state: BuddyState) -> str:
+            return "run_prefetch" if state.prefetch else "router"
+
+        async def cache_namespace(state: BuddyState) -> Optional[tuple]:
+            if self.cache_threshold is None or not state.league_id:
+                return None
+            follows_earlier_turns = state.summary or sum(isinstance(m, HumanMessage) for m in state.messages) > 1
+            if follows_earlier_turns and answer_cache.is_follow_up(current_question(state)):
+                # Its answer depends on this thread's history, so it can't be shared
+                return None
+            data_version = await session.adata_version(state.league_id)
+            if data_version is None:
+                return None
+            return answer_cache.namespace(state.league_id, data_version, state.username, current_question(state))
+
+        async def cache_lookup_node(state: BuddyState, *, store: Optional[BaseStore] = None) -> dict:
+            ns = await cache_namespace(state) if store is not None else None
+            if ns is None:
+                return {"cache_hit": False}
+            try:
+                hit = await answer_cache.alookup(store, ns, current_question(state), self.cache_threshold)
+            except Exception as e:
+                logger.warning("Answer cache lookup failed: %s", e)
+                hit = None
+            if hit is None:
+                return {"cache_hit": False}
+
+            logger.info("Answer cache hit (score %.3f) for %r", hit["score"], hit["question"])
+            return {
+                "cache_hit": True,
+                "chart_json": "",
+                "usage": {
+                    "turn": {"input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0, "llm_calls": 0,
+                             "seconds": 0.0, "route": "answer_cache"},
+                    "thread": {**state.usage.get("thread", {})},
+                    "budget_exceeded": "",
+                },
+                "messages": [AIMessage(
+                    content=hit["answer"],
+                    response_metadata={"answer_cache": {"score": hit["score"], "question": hit["question"]}}
+                )]
+            }
+
+        def cache_router(state: BuddyState) -> str:
+            return END if state.cache_hit else "compact"
+
+        async def cache_store_node(state: BuddyState, *, store: Optional[BaseStore] = None) -> dict:
+            # Turns that drew a chart are not cached: the chart isn't part of the stored answer. Neither are turns
+            # where a tool failed, since the answer is about the failure, not the question.
+            cacheable = (
+                store is not None and not state.chart_json and not state.budget_exceeded
+                and not any(getattr(m, "status", None) == "error" for m in turn_messages(state))
+            )
+            ns = await cache_namespace(state) if cacheable else None
+            answer = state.messages[-1].content
+            if ns is None or not answer or not isinstance(answer, str):
+                return {}
+            try:
+                await answer_cache.aremember(store, ns, current_question(state), answer)
+            except Exception as e:
+                logger.warning("Answer cache write failed: %s", e)
+            return {}
+
+        async def compact_node(state: BuddyState) -> dict:
+            if self.compactor is None:
+                return {}
+
+            to_summarize = self.compactor.messages_to_summarize(state.messages)
+            removed_ids = {m.id for m in to_summarize}
+            replaced = [m for m in self.compactor.compact_tool_outputs(state.messages) if m.id not in removed_ids]
+            update = {"messages": replaced}
+            if to_summarize:
+                update["summary"] = await self.asummarize(state.summary, to_summarize)
+                update["messages"] = replaced + [RemoveMessage(id=i) for i in removed_ids]
+                # Schema sent in the removed turns has to be sent again when it is next needed
+                update["schema_tables"] = compaction.schema_tables(
+                    [m for m in state.messages if m.id not in removed_ids]
+                )
+                logger.info("Summarized %d old messages", len(to_summarize))
+            if replaced:
+                logger.info("Compacted %d old tool outputs", len(replaced))
+            return update
+
+        def context_messages(state: BuddyState) -> List[BaseMessage]:
+            # Fixed for the life of a thread, so it stays part of the cached prefix after the first turn
+            if not (state.username or state.league_id):
+                return []
+            return [SystemMessage(content=prompts.user_context(state.username, state.league_id))]
+
+        def summary_messages(state: BuddyState) -> List[BaseMessage]:
+            if not state.summary:
+                return []
+            return [SystemMessage(content=f"Summary of the earlier conversation:\n{state.summary}")]
+
+        async def schema_message(state: BuddyState) -> List[BaseMessage]:
+            if self.schema is None:
+                return []
+
+            # The current question plus the previous one, so follow-ups like "and last week?" keep their tables
+            questions = [
+                m.content for m in reversed(state.messages)
+                if isinstance(m, HumanMessage) and isinstance(m.content, str)
+            ][:2]
+            schema_block, saved, tables = await self.schema.arender_for(questions, exclude=state.schema_tables)
+            state.schema_tokens_saved = saved
+            logger.info("Schema filtering saved ~%d input tokens", saved)
+
+            if not tables:
+                return []
+            # Stored in the history (not rebuilt per call) so earlier turns stay byte-identical
+            state.schema_tables = state.schema_tables + tables
+            return [SystemMessage(content=f"## DB SCHEMA\n\n{schema_block}")]
+
+        def add_usage(state: BuddyState, response: BaseMessage):
+            usage = getattr(response, "usage_metadata", None) or {}
+            state.input_tokens += usage.get("input_tokens", 0)
+            state.cached_input_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0)
+            state.output_tokens += usage.get("output_tokens", 0)
+            state.llm_calls += 1
+
+        def finish_turn(state: BuddyState):
+            turn_ms = (time.time() - state.turn_started_at) * 1000 if state.turn_started_at else 0.0
+            state.thread_input_tokens += state.input_tokens
+            state.thread_output_tokens += state.output_tokens
+            state.thread_seconds += turn_ms / 1000
+            state.thread_turns += 1
+            # Read by the frontends after each run
+            state.usage = {
+                "turn": {
+                    "input_tokens": state.input_tokens,
+                    "cached_input_tokens": state.cached_input_tokens,
+                    "output_tokens": state.output_tokens,
+                    "llm_calls": state.llm_calls,
+                    "seconds": round(turn_ms / 1000, 2),
+                    "route": state.route,
+                },
+                "thread": {
+                    "input_tokens": state.thread_input_tokens,
+                    "output_tokens": state.thread_output_tokens,
+                    "seconds": round(state.thread_seconds, 2),
+                    "turns": state.thread_turns,
+                },
+                "budget_exceeded": state.budget_exceeded,
+            }
+
+            telemetry.observe(f"turn.{state.route or routing.ANALYSIS}", turn_ms)
+            routing.stats.record(
+                state.route or routing.ANALYSIS,
+                latency_ms=turn_ms,
+                input_tokens=state.input_tokens,
+                output_tokens=state.output_tokens,
+                llm_calls=state.llm_calls
+            )
+            logger.info(
+                "Turn input tokens: %d cached, %d uncached",
+                state.cached_input_tokens, state.input_tokens - state.cached_input_tokens
+            )
+
+        async def buddy_node(state: BuddyState, config: RunnableConfig) -> BuddyState:
+            self.warm_up()
+            if isinstance(state.messages[-1], HumanMessage):
+                # A new turn starts without the previous turn's chart or token counts
+                state.chart_json = ""
+                state.input_tokens = 0
+                state.cached_input_tokens = 0
+                state.output_tokens = 0
+                state.llm_calls = 0
+                state.budget_exceeded = ""
+
+                if self.budget is not None and (reason := self.budget.thread_exceeded(state)):
+                    logger.info("Thread out of budget: %s", reason)
+                    state.budget_exceeded = reason
+                    state.messages = state.messages + [AIMessage(
+                        content=budget.THREAD_LIMIT_MESSAGE,
+                        response_metadata={"budget_exceeded": reason}
+                    )]
+                    finish_turn(state)
+                    return state
+
+                state.messages = state.messages + await schema_message(state)
+
+            response = await self.llm_for(state.route).ainvoke(
+                prefix +
+                context_messages(state) +
+                summary_messages(state) +
+                state.messages,
+                telemetry.with_llm_timing(config)
+            )
+            state.messages = state.messages + [response]
+            add_usage(state, response)
+            if not response.tool_calls:
+                finish_turn(state)
+            return state
+
+        async def wrap_up_node(state: BuddyState, config: RunnableConfig) -> BuddyState:
+            reason = self.budget.turn_exceeded(state)
+            logger.info("Turn out of budget, wrapping up: %s", reason)
+            state.budget_exceeded = reason
+
+            # Every tool call needs a result before the model can be called again
+            skipped = [
+                ToolMessage(
+                    content=f"Not run: out of budget ({reason}).",
+                    name=tool_call["name"], tool_call_id=tool_call["id"], status="error"
+                )
+                for tool_call in state.messages[-1].tool_calls
+            ]
+            state.messages = state.messages + skipped
+
+            response = await self.wrap_up_llm.ainvoke(
+                prefix +
+                context_messages(state) +
+                summary_messages(state) +
+                state.messages +
+                [SystemMessage(content=budget.WRAP_UP_PROMPT.format(reason=reason))],
+                telemetry.with_llm_timing(config)
             )
             state.messages = state.messages + [response]
+            add_usage(state, response)
+            finish_turn(state)
             return state
 
         def router(state: BuddyState) -> str:
             last_message = state.messages[-1]
             if not last_message.tool_calls:
-                return END
-            else:
-                return "tools"
+                return "cache_store"
+            if self.budget is not None and self.budget.turn_exceeded(state):
+                return "wrap_up"
+            return "tools"
 
         builder = StateGraph(BuddyState)
 
-        builder.add_node("chatbot", buddy_node)
-        builder.add_node("tools", ToolNode(self.tools))
+        nodes = {
+            "run_prefetch": prefetch_node,
+            "router": route_node,
+            "cache_lookup": cache_lookup_node,
+            "compact": compact_node,
+            "chatbot": buddy_node,
+            "tools": self.tool_executor.arun,
+            "wrap_up": wrap_up_node,
+            "cache_store": cache_store_node,
+        }
+        for name, node in nodes.items():
+            builder.add_node(name, telemetry.traced(f"node.{name}")(node))
 
-        builder.add_edge(START, "chatbot")
-        builder.add_conditional_edges("chatbot", router, ["tools", END])
+        builder.add_conditional_edges(START, entry_router, ["run_prefetch", "router"])
+        builder.add_edge("run_prefetch", END)
+        builder.add_edge("router", "cache_lookup")
+        builder.add_conditional_edges("cache_lookup", cache_router, ["compact", END])
+        builder.add_edge("compact", "chatbot")
+        builder.add_conditional_edges("chatbot", router, ["tools", "wrap_up", "cache_store"])
         builder.add_edge("tools", "chatbot")
+        builder.add_edge("wrap_up", END)
+        builder.add_edge("cache_store", END)
 
-        return builder.compile() #Use when running locally
+        return builder.compile(store=self.store, checkpointer=self._checkpointer)
 
     def inspect_graph(self):
         """
@@ -84,11 +523,11 @@ class Agent:
         """
         from IPython.display import display, Image
 
-        graph = self.build_graph()
+        graph = self.runnable
         display(Image(graph.get_graph(xray=True).draw_mermaid_png()))
 
-    def invoke(self, message: str, **kwargs) -> str:
-        """Synchronously invoke the graph.
+    async def ainvoke(self, message: str, **kwargs) -> str:
+        """Asynchronously invoke the graph.
 
         Args:
             message: The user message.
@@ -96,7 +535,8 @@ class Agent:
         Returns:
             str: The LLM response.
         """
-        result = self.runnable.invoke(
+        runnable = await self.arunnable()
+        result = await runnable.ainvoke(
             input={
                 "messages": [HumanMessage(content=message)]
             },
@@ -105,49 +545,150 @@ class Agent:
 
         return result["messages"][-1].content
 
-    def stream(self, message: str, **kwargs) -> Generator[str, None, None]:
-        """Synchronously stream the results of the graph run.
+    async def astream(self, message: str, **kwargs) -> AsyncGenerator[str, None]:
+        """Asynchronously stream the results of the graph run.
 
         Args:
             message: The user message.
 
         Returns:
-            str: The final LLM response or tool call response
+            str: LLM tokens, tool call names and tool progress (rows fetched, a preview, row count and duration)
         """
-        for message_chunk, metadata in self.runnable.stream(
+        runnable = await self.arunnable()
+        async for mode, chunk in runnable.astream(
                 input={
                     "messages": [HumanMessage(content=message)]
                 },
-                stream_mode="messages",
+                stream_mode=["messages", "custom"],
                 **kwargs
         ):
-            if isinstance(message_chunk, AIMessageChunk):
-                if message_chunk.response_metadata:
-                    finish_reason = message_chunk.response_metadata.get("finish_reason", "")
-                    if finish_reason == "tool_calls":
-                        yield "\n\n"
+            text = events.render(chunk) if mode == "custom" else _render_chunk(*chunk)
+            if text:
+                yield text
+
+    async def aget_state(self, config: dict):
+        """Asynchronously get the state of a thread.
+
+        Args:
+            config: The run config with the thread_id.
+
+        Returns:
+            StateSnapshot: The thread's latest state.
+        """
+        runnable = await self.arunnable()
+        return await runnable.aget_state(config)
+
+    def get_state(self, config: dict):
+        """Synchronously get the state of a thread, on the same event loop as `invoke` and `stream`.
+
+        Args:
+            config: The run config with the thread_id.
+
+        Returns:
+            StateSnapshot: The thread's latest state.
+        """
+        return _background_loop.run(self.aget_state(config))
+
+    def invoke(self, message: str, **kwargs) -> str:
+        """Synchronously invoke the graph.
+
+        The graph's nodes are async; this runs `ainvoke` on a background event loop.
+
+        Args:
+            message: The user message.
+
+        Returns:
+            str: The LLM response.
+        """
+        return _background_loop.run(self.ainvoke(message, **kwargs))
+
+    def stream(self, message: str, **kwargs) -> Generator[str, None, None]:
+        """Synchronously stream the results of the graph run.
+
+        The graph's nodes are async; this iterates `astream` on a background event loop.
+
+        Args:
+            message: The user message.
+
+        Returns:
+            str: The final LLM response or tool call response
+        """
+        yield from _background_loop.iterate(self.astream(message, **kwargs))
+
+
+def _render_chunk(message_chunk: BaseMessage, metadata: dict) -> Optional[str]:
+    """Turn one "messages" stream event into the text shown to the user."""
+    if isinstance(message_chunk, AIMessageChunk):
+        if message_chunk.response_metadata:
+            finish_reason = message_chunk.response_metadata.get("finish_reason", "")
+            if finish_reason == "tool_calls":
+                return "\n\n"
+
+        if message_chunk.tool_call_chunks:
+            # Only the tool name; its progress follows on the custom stream instead of raw argument JSON
+            names = [c["name"] for c in message_chunk.tool_call_chunks if c.get("name")]
+            return "".join(f"\n\n< TOOL CALL: {name} >\n\n" for name in names) or None
+        return message_chunk.content
+
+    if isinstance(message_chunk, AIMessage) and (
+            metadata.get("langgraph_node") == "cache_lookup" or "budget_exceeded" in message_chunk.response_metadata
+    ):
+        # Answers served from the answer cache and the thread limit reply arrive as one complete message
+        return message_chunk.content
+    return None
+
+
+class _BackgroundLoop:
+    """An event loop on a daemon thread that backs the synchronous Agent entry points."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="buddy-event-loop", daemon=True).start()
+        return self._loop
+
+    def run(self, coro: Coroutine):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def iterate(self, agen: AsyncGenerator) -> Generator:
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self.run(agen.aclose())
+
 
-                if message_chunk.tool_call_chunks:
-                    tool_chunk = message_chunk.tool_call_chunks[0]
+_background_loop = _BackgroundLoop()
 
-                    tool_name = tool_chunk.get("name", "")
-                    args = tool_chunk.get("args", "")
 
-                    if tool_name:
-                        tool_call_str = f"\n\n< TOOL CALL: {tool_name} >\n\n"
+def _fake_llm_overrides() -> dict:
+    """Agent arguments that swap OpenAI for the scripted model when `FAKE_LLM` is set, for load tests."""
+    if not env.FAKE_LLM:
+        return {}
+    from buddy import fake_llm
 
-                    if args:
-                        tool_call_str = args
-                    yield tool_call_str
-                else:
-                    yield message_chunk.content
-                continue
+    path = None if env.FAKE_LLM.lower() in ("1", "true", "yes") else env.FAKE_LLM
+    llm = fake_llm.load(path, ttft=env.FAKE_LLM_TTFT, token_latency=env.FAKE_LLM_TOKEN_LATENCY)
+    # No answer cache: the load test repeats its scripted questions, and repeats would be answered from the cache
+    # without running the graph
+    return {"llm": llm, "cache_threshold": None}
 
 
 # Define and instantiate the agent
 agent = Agent(
     name="Buddy",
-    system_prompt=prompts.buddy_system_prompt
+    system_prompt=prompts.buddy_system_prompt,
+    checkpoint_uri=env.CHECKPOINT_URI,
+    **_fake_llm_overrides()
 )
-graph = agent.build_graph()
+graph = agent.runnable
 
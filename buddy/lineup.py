@@ -0,0 +1,369 @@
+"""
+Optimal lineups.
+
+Filling a league's starting slots (`roster_positions`) from a roster is an assignment problem: each slot takes at
+most one player, a player can only fill slots his `fantasy_positions` allow, and the sum of projected points should
+be as high as possible. `assign()` solves it exactly with the Hungarian algorithm (shortest augmenting paths, with
+the inner loop vectorized in NumPy). A 10-slot, 15-player roster takes about half a millisecond. `assign_many()`
+solves stacks of lineups together, for a small fraction of that each.
+
+Projections are season fantasy points per game under the league's own scoring, as stored in `league_fantasy_points`
+by the ingest (see `buddy/fantasy_points.py`). Players without a stored value are scored from their season stats.
+Players listed as out score zero.
+"""
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from sqlalchemy import text
+
+from buddy import fantasy_points, telemetry
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+    from sqlalchemy.engine import Connection
+
+GUARDS, FORWARDS = {"PG", "SG"}, {"SF", "PF"}
+ALL_POSITIONS = GUARDS | FORWARDS | {"C"}
+
+# Positions each starting slot accepts. Any other slot (BN, IR, ...) is not a starting slot.
+SLOT_ELIGIBILITY = {
+    "PG": {"PG"},
+    "SG": {"SG"},
+    "SF": {"SF"},
+    "PF": {"PF"},
+    "C": {"C"},
+    "G": GUARDS,
+    "F": FORWARDS,
+    "UTIL": ALL_POSITIONS,
+}
+
+# Injury statuses that keep a player out of the lineup
+OUT_STATUSES = {"Out", "IR", "Suspension"}
+
+# Cost of an ineligible player-slot pair; any real lineup beats it
+_INELIGIBLE = 1e9
+
+
+def starting_slots(roster_positions: Iterable[str]) -> list[str]:
+    """The starting slots of a league, in roster order."""
+    return [slot for slot in roster_positions if slot in SLOT_ELIGIBILITY]
+
+
+def positions_of(fantasy_positions: Optional[Iterable[str]]) -> set[str]:
+    """A player's positions, with "G" and "F" expanded to the positions they cover."""
+    positions: set[str] = set()
+    for p in fantasy_positions or []:
+        positions |= GUARDS if p == "G" else FORWARDS if p == "F" else {p}
+    return positions
+
+
+def eligibility(slots: list[str], player_positions: list[set[str]]) -> "np.ndarray":
+    """Boolean (slots x players) matrix of which player may fill which slot."""
+    import numpy as np
+
+    return np.array([[bool(SLOT_ELIGIBILITY[s] & p) for p in player_positions] for s in slots], dtype=bool)
+
+
+def assign(cost: "np.ndarray") -> "np.ndarray":
+    """Minimum-cost assignment of every row to a distinct column (Hungarian algorithm).
+
+    Args:
+        cost: (n x m) cost matrix with n <= m.
+
+    Returns:
+        np.ndarray: For each row, the index of its column.
+    """
+    import numpy as np
+
+    n, m = cost.shape
+    if n > m:
+        raise ValueError("assign needs at least as many columns as rows")
+    # 1-based potentials and matching as in the classic formulation; column 0 is a virtual start column
+    u, v = np.zeros(n + 1), np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=int)
+    way = np.zeros(m + 1, dtype=int)
+    for row in range(1, n + 1):
+        match[0] = row
+        col = 0
+        min_slack = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[col] = True
+            current = match[col]
+            free = ~used[1:]
+            slack = cost[current - 1] - u[current] - v[1:]
+            better = free & (slack < min_slack[1:])
+            min_slack[1:][better] = slack[better]
+            way[1:][better] = col
+            candidates = np.where(free, min_slack[1:], np.inf)
+            next_col = int(np.argmin(candidates)) + 1
+            delta = candidates[next_col - 1]
+            used_cols = np.flatnonzero(used)
+            u[match[used_cols]] += delta
+            v[used_cols] -= delta
+            min_slack[1:][free] -= delta
+            col = next_col
+            if match[col] == 0:
+                break
+        # Flip the augmenting path
+        while col:
+            prev = way[col]
+            match[col] = match[prev]
+            col = prev
+
+    result = np.empty(n, dtype=int)
+    for c in range(1, m + 1):
+        if match[c]:
+            result[match[c] - 1] = c - 1
+    return result
+
+
+def assign_many(cost: "np.ndarray") -> "np.ndarray":
+    """`assign()` for a stack of cost matrices, solved together: each step of the algorithm is vectorized across
+    the problems that still need it. Much cheaper per problem than calling `assign()` in a loop, and slower for a
+    single problem.
+
+    Args:
+        cost: (problems x n x m) cost matrices with n <= m.
+
+    Returns:
+        np.ndarray: (problems x n): for each row of each problem, the index of its column.
+    """
+    import numpy as np
+
+    problems, n, m = cost.shape
+    if n > m:
+        raise ValueError("assign_many needs at least as many columns as rows")
+    # 1-based potentials and matching as in the classic formulation; column 0 is a virtual start column
+    u, v = np.zeros((problems, n + 1)), np.zeros((problems, m + 1))
+    match = np.zeros((problems, m + 1), dtype=int)
+    way = np.zeros((problems, m + 1), dtype=int)
+    for row in range(1, n + 1):
+        match[:, 0] = row
+        col = np.zeros(problems, dtype=int)
+        min_slack = np.full((problems, m + 1), np.inf)
+        used = np.zeros((problems, m + 1), dtype=bool)
+        # The problems whose augmenting path for this row hasn't reached a free column yet
+        active = np.arange(problems)
+        while len(active):
+            current_col = col[active]
+            used[active, current_col] = True
+            current = match[active, current_col]
+            used_here = used[active]
+            free = ~used_here[:, 1:]
+            slack = cost[active, current - 1] - u[active, current][:, None] - v[active, 1:]
+            slack_here = min_slack[active, 1:]
+            better = free & (slack < slack_here)
+            slack_here = np.where(better, slack, slack_here)
+            way[active, 1:] = np.where(better, current_col[:, None], way[active, 1:])
+            candidates = np.where(free, slack_here, np.inf)
+            next_col = candidates.argmin(axis=1) + 1
+            delta = candidates[np.arange(len(active)), next_col - 1]
+            # Each used column is matched to a different row, so these updates never collide
+            p, c = np.nonzero(used_here)
+            u[active[p], match[active[p], c]] += delta[p]
+            v[active] -= np.where(used_here, delta[:, None], 0.0)
+            min_slack[active, 1:] = np.where(free, slack_here - delta[:, None], slack_here)
+            col[active] = next_col
+            active = active[match[active, next_col] != 0]
+        # Flip the augmenting paths
+        active = np.flatnonzero(col)
+        while len(active):
+            prev = way[active, col[active]]
+            match[active, col[active]] = match[active, prev]
+            col[active] = prev
+            active = active[prev != 0]
+
+    result = np.empty((problems, n), dtype=int)
+    p, c = np.nonzero(match[:, 1:])
+    result[p, match[p, c + 1] - 1] = c
+    return result
+
+
+def _solve(eligible: "np.ndarray", value: "np.ndarray") -> "np.ndarray":
+    """The player column of each slot in the best lineup; a column past the last player means the slot stays empty.
+    Takes one (slots x players) problem or a stack of them, with values (players) or (problems x players)."""
+    import numpy as np
+
+    slots, players = eligible.shape[-2:]
+    if not slots:
+        return np.zeros(eligible.shape[:-1], dtype=int)
+    cost = np.where(eligible, -value[..., None, :], _INELIGIBLE)
+    if slots > players:
+        # Empty placeholder players, so every slot gets a column
+        cost = np.concatenate([cost, np.zeros((*cost.shape[:-1], slots - players))], axis=-1)
+    return assign(cost) if cost.ndim == 2 else assign_many(cost)
+
+
+def best_points(eligible: "np.ndarray", value: "np.ndarray") -> "float | np.ndarray":
+    """Projected points of the best lineup, from an `eligibility()` matrix and the players' projections.
+
+    Also takes a stack of (slots x players) matrices with (problems x players) projections, and then returns the
+    points of each problem's best lineup.
+    """
+    import numpy as np
+
+    slots, players = eligible.shape[-2:]
+    if not slots or not players:
+        return 0.0 if eligible.ndim == 2 else np.zeros(eligible.shape[:-2])
+    chosen = _solve(eligible, value)
+    column = np.minimum(chosen, players - 1)
+    filled = (chosen < players) & np.take_along_axis(eligible, column[..., None], axis=-1)[..., 0]
+    points = np.where(filled, np.take_along_axis(value, column, axis=-1), 0.0).sum(axis=-1)
+    return float(points) if eligible.ndim == 2 else points
+
+
+def optimize(players: "pd.DataFrame", roster_positions: Iterable[str]) -> tuple["pd.DataFrame", "pd.DataFrame"]:
+    """Best lineup for a roster.
+
+    Args:
+        players: One row per rostered player with `player_id`, `fantasy_positions` and `projection`.
+        roster_positions: The league's roster positions, e.g. ["PG", "SG", "G", ..., "UTIL", "BN", "BN"].
+
+    Returns:
+        tuple: (lineup, bench). `lineup` has one row per starting slot (`slot`, the player's columns); a slot no
+            eligible player can fill has no player. `bench` has the remaining players.
+    """
+    import pandas as pd
+
+    slots = starting_slots(roster_positions)
+    players = players.reset_index(drop=True)
+    eligible = eligibility(slots, [positions_of(p) for p in players["fantasy_positions"]])
+    chosen = _solve(eligible, players["projection"].to_numpy(dtype=float, na_value=0.0))
+    rows, starters = [], set()
+    for slot_index, player_index in enumerate(chosen):
+        slot = slots[slot_index]
+        if player_index < len(players) and eligible[slot_index, player_index]:
+            starters.add(player_index)
+            rows.append({"slot": slot, **players.iloc[player_index].to_dict()})
+        else:
+            rows.append({"slot": slot})
+    lineup = pd.DataFrame(rows, columns=["slot", *players.columns])
+    bench = players.drop(index=list(starters)).sort_values("projection", ascending=False)
+    return lineup, bench
+
+
+@dataclass
+class League:
+    """What lineup and trade questions need about a league.
+
+    Attributes:
+        league_id: The league.
+        roster_positions: The league's roster positions.
+        rosters: One row per team: roster_id, username, display_name, players, starters.
+        players: One row per rostered player: player_id, roster_id, full_name, position, team_abbr,
+            fantasy_positions, injury_status, games, fantasy_ppg, game_score, rank_std and projection.
+    """
+    league_id: str
+    roster_positions: list[str]
+    rosters: "pd.DataFrame"
+    players: "pd.DataFrame"
+
+    def roster(self, roster_id: int) -> "pd.DataFrame":
+        return self.players[self.players["roster_id"] == roster_id]
+
+    def find_roster(self, name: str) -> Optional[int]:
+        """The roster id of the team whose username or display name is `name` (case-insensitive)."""
+        name = name.strip().lower()
+        for row in self.rosters.itertuples():
+            if name in ((row.username or "").lower(), (row.display_name or "").lower()):
+                return row.roster_id
+        return None
+
+
+_ROSTERED = """
+    SELECT r.roster_id, rp.player_id, p.full_name, p.position, p.team_abbr, p.fantasy_positions, p.injury_status,
+           CAST(s.gp AS double precision) AS games, CAST(s.game_score AS double precision) AS game_score,
+           CAST(s.rank_std AS double precision) AS rank_std,
+           CAST(f.fantasy_points_per_game AS double precision) AS stored_ppg{stats}
+    FROM league_rosters r
+    CROSS JOIN LATERAL jsonb_array_elements_text(r.players) AS rp(player_id)
+    JOIN players p ON p.player_id = rp.player_id
+    LEFT JOIN aggregated_player_statistics s ON s.player_id = p.player_id
+    LEFT JOIN league_fantasy_points f ON f.league_id = r.league_id AND f.season = :season AND f.week = :week
+        AND f.player_id = p.player_id
+    WHERE r.league_id = :league_id
+      AND NOT COALESCE(r.reserve, '[]'::jsonb) ? rp.player_id
+"""
+
+
+def load(league_id: str, conn: Optional["Connection"] = None) -> League:
+    """Load the rosters of a league with each player's eligibility and projection.
+
+    Args:
+        league_id: The league.
+        conn: An open connection. Defaults to a new connection from the agent's engine.
+
+    Returns:
+        League: The league's rosters and players.
+    """
+    import pandas as pd
+
+    if conn is None:
+        from buddy.tools import session
+
+        with session.engine.connect() as conn:
+            return load(league_id, conn)
+
+    with telemetry.span("lineup.load", league_id=league_id):
+        conn.execute(text("SET TRANSACTION READ ONLY"))
+        league = conn.execute(
+            text(
+                "SELECT season, roster_positions, scoring_settings FROM league_information WHERE league_id = :league_id"
+            ),
+            {"league_id": league_id},
+        ).first()
+        if league is None:
+            raise ValueError(f"League {league_id} has not been loaded")
+        scoring = fantasy_points.weights(league.scoring_settings)
+        stats = "".join(f", CAST(s.{c} AS double precision) AS {c}" for c in scoring)
+
+        result = conn.execute(
+            text(_ROSTERED.format(stats=stats)),
+            {"league_id": league_id, "season": league.season, "week": fantasy_points.SEASON_WEEK},
+        )
+        players = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+        result = conn.execute(text("""
+            SELECT r.roster_id, u.username, u.display_name, r.players, r.starters
+            FROM league_rosters r
+            LEFT JOIN league_users u ON u.league_id = r.league_id AND u.user_id = r.owner_id
+            WHERE r.league_id = :league_id
+            ORDER BY r.roster_id
+        """), {"league_id": league_id})
+        rosters = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+    # Players the ingest hasn't scored yet (e.g. a league loaded before league_fantasy_points existed)
+    players["fantasy_ppg"] = players["stored_ppg"]
+    missing = players["fantasy_ppg"].isna()
+    if missing.any():
+        totals = fantasy_points.score(players[missing], scoring)
+        games = players.loc[missing, "games"].where(players.loc[missing, "games"] > 0)
+        players.loc[missing, "fantasy_ppg"] = (totals / games).round(2)
+    out = players["injury_status"].isin(OUT_STATUSES)
+    players["projection"] = players["fantasy_ppg"].fillna(0.0).where(~out, 0.0)
+    players = players.drop(columns=["stored_ppg", *scoring])
+    return League(league_id, list(league.roster_positions or []), rosters, players)
+
+
+def best_lineup(league: League, roster_id: int) -> tuple["pd.DataFrame", float, float]:
+    """The best lineup of one team, next to its current starters.
+
+    Returns:
+        tuple: (table, projected, current). `table` lists the starting slots then the bench, with each player's
+            projection and whether he starts now. `projected` and `current` are the points per game of the best
+            lineup and of the current starters.
+    """
+    import pandas as pd
+
+    players = league.roster(roster_id)
+    lineup, bench = optimize(players, league.roster_positions)
+    starters = league.rosters.loc[league.rosters["roster_id"] == roster_id, "starters"]
+    current_ids = set(starters.iloc[0] or []) if len(starters) else set()
+    table = pd.concat([lineup, bench.assign(slot="BN")], ignore_index=True)
+    table["starting_now"] = table["player_id"].isin(current_ids)
+    table = table[["slot", "full_name", "position", "team_abbr", "injury_status", "fantasy_ppg", "projection",
+                   "starting_now"]]
+    projected = float(lineup["projection"].sum())
+    current = float(players.loc[players["player_id"].isin(current_ids), "projection"].sum())
+    return table, round(projected, 2), round(current, 2)
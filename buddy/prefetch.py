@@ -0,0 +1,208 @@
+"""
+League summary prefetch.
+
+The first questions after loading a league are almost always the same: my roster, the standings, the best free
+agents, this week's matchup. As soon as ingestion finishes, these summaries are computed in the background and kept
+per (league, user, data version). The league_summary tool then serves them without a database round trip. Entries
+for an older data version are never served; they are recomputed on demand.
+
+The cache lives in the process that runs the agent, so the prefetch runs there too: after a load, the frontend sends
+the LangGraph server a background stateless run with `prefetch: true`, which the graph routes to `run()`. Processes
+without an agent (the Streamlit app, the ingest script) don't prefetch. The cache is bounded by entry count and age
+(see `SummaryCache`). The same run rebuilds the league's embedded replica (see `buddy/replica.py`) when it is enabled.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import text
+
+from buddy import replica, telemetry
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SUMMARIES = {
+    # aggregated_player_statistics holds season totals: divide by games for the averages
+    "my_roster": """
+        SELECT p.full_name, p.position, p.team_abbr, p.injury_status, s.gp,
+               ROUND(s.pts / NULLIF(s.gp, 0), 1) AS pts, ROUND(s.reb / NULLIF(s.gp, 0), 1) AS reb,
+               ROUND(s.ast / NULLIF(s.gp, 0), 1) AS ast, ROUND(s.stl / NULLIF(s.gp, 0), 1) AS stl,
+               ROUND(s.blk / NULLIF(s.gp, 0), 1) AS blk, ROUND(s.turnovers / NULLIF(s.gp, 0), 1) AS turnovers,
+               ROUND(s.tpm / NULLIF(s.gp, 0), 1) AS tpm, f.fantasy_points_per_game
+        FROM league_rosters r
+        JOIN league_information l ON l.league_id = r.league_id
+        JOIN league_users u ON u.league_id = r.league_id AND u.user_id = r.owner_id
+        CROSS JOIN LATERAL jsonb_array_elements_text(r.players) AS rp(player_id)
+        JOIN players p ON p.player_id = rp.player_id
+        LEFT JOIN aggregated_player_statistics s ON s.player_id = p.player_id
+        LEFT JOIN league_fantasy_points f ON f.league_id = r.league_id AND f.season = l.season AND f.week = 0
+            AND f.player_id = p.player_id
+        WHERE r.league_id = :league_id AND u.username = :username
+        ORDER BY f.fantasy_points_per_game DESC NULLS LAST
+    """,
+    "standings": """
+        SELECT u.display_name, u.username, r.wins, r.losses, r.ties,
+               r.fpts + r.fpts_decimal / 100.0 AS points_for,
+               r.fpts_against + r.fpts_against_decimal / 100.0 AS points_against
+        FROM league_rosters r
+        JOIN league_users u ON u.league_id = r.league_id AND u.user_id = r.owner_id
+        WHERE r.league_id = :league_id
+        ORDER BY r.wins DESC, points_for DESC
+    """,
+    "top_free_agents": """
+        SELECT position, full_name, team_abbr, injury_status, gp, pts, reb, ast, fantasy_points
+        FROM (
+            SELECT p.position, p.full_name, p.team_abbr, p.injury_status, s.gp, s.pts, s.reb, s.ast,
+                   s.fantasy_points,
+                   row_number() OVER (PARTITION BY p.position ORDER BY s.fantasy_points DESC NULLS LAST) AS rank
+            FROM players p
+            JOIN aggregated_player_statistics s ON s.player_id = p.player_id
+            WHERE p.active AND p.position IS NOT NULL AND NOT EXISTS (
+                SELECT 1 FROM league_rosters r
+                WHERE r.league_id = :league_id
+                  AND (r.players ? p.player_id OR COALESCE(r.reserve, '[]'::jsonb) ? p.player_id)
+            )
+        ) ranked
+        WHERE rank <= 5
+        ORDER BY position, rank
+    """,
+    "this_week_matchup": """
+        SELECT u.display_name, u.username, m.matchup_id, m.points, r.wins, r.losses
+        FROM matchups m
+        JOIN league_rosters r ON r.league_id = m.league_id AND r.roster_id = m.roster_id
+        JOIN league_users u ON u.league_id = r.league_id AND u.user_id = r.owner_id
+        WHERE m.league_id = :league_id AND m.matchup_id = (
+            SELECT m2.matchup_id FROM matchups m2
+            JOIN league_rosters r2 ON r2.league_id = m2.league_id AND r2.roster_id = m2.roster_id
+            JOIN league_users u2 ON u2.league_id = r2.league_id AND u2.user_id = r2.owner_id
+            WHERE m2.league_id = :league_id AND u2.username = :username
+            LIMIT 1
+        )
+    """,
+}
+# Summaries that depend on who is asking
+PERSONAL = {"my_roster", "this_week_matchup"}
+
+
+class SummaryCache:
+    """Prefetched summaries keyed by (league, user, summary) and tagged with the data version they were read at.
+
+    The cache is bounded: entries older than `TTL` seconds are not served, and past `MAX_ENTRIES` the least recently
+    used entry is dropped.
+    """
+    # How many summaries are kept, across all leagues and users
+    MAX_ENTRIES = 256
+    # How long a summary is served after it was computed, in seconds
+    TTL = 3600
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, str, str], tuple[float, int, "pd.DataFrame"]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(league_id: str, username: str, name: str) -> tuple[str, str, str]:
+        return league_id, username if name in PERSONAL else "", name
+
+    def get(self, league_id: str, username: str, name: str, data_version: Optional[int]) -> Optional["pd.DataFrame"]:
+        key = self._key(league_id, username, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        if data_version is None or entry[1] != data_version:
+            return None
+        return entry[2]
+
+    def put(self, league_id: str, username: str, name: str, data_version: int, df: "pd.DataFrame"):
+        with self._lock:
+            # One data version per league is enough; drop older ones as new ones arrive
+            for key in [k for k, (_, v, _) in self._entries.items() if k[0] == league_id and v != data_version]:
+                del self._entries[key]
+            key = self._key(league_id, username, name)
+            self._entries[key] = (time.monotonic(), data_version, df)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+cache = SummaryCache()
+
+
+def compute(name: str, league_id: str, username: str = "") -> "pd.DataFrame":
+    """Run one summary query against the database.
+
+    Args:
+        name: A key of `SUMMARIES`.
+        league_id: The league.
+        username: The Sleeper username, for the personal summaries.
+
+    Returns:
+        pd.DataFrame: The summary.
+    """
+    import pandas as pd
+    from buddy.tools import session
+
+    with telemetry.span(f"prefetch.{name}"), session.engine.connect() as conn:
+        conn.execute(text("SET TRANSACTION READ ONLY"))
+        result = conn.execute(text(SUMMARIES[name]), {"league_id": league_id, "username": username})
+        return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+
+def get(name: str, league_id: str, username: str = "") -> "pd.DataFrame":
+    """Return a summary from the cache if it matches the latest data version, computing and caching it otherwise."""
+    from buddy.tools import session
+
+    data_version = session.data_version(league_id)
+    df = cache.get(league_id, username, name, data_version)
+    if df is None:
+        df = compute(name, league_id, username)
+        if data_version is not None:
+            cache.put(league_id, username, name, data_version, df)
+    return df
+
+
+def run(league_id: str, username: str = "") -> list[str]:
+    """Compute every summary for the league (and user, if given) at the current data version.
+
+    Returns:
+        list[str]: The names of the summaries that were prefetched.
+    """
+    from buddy.tools import session
+
+    # Read fresh: the ingest that triggered this has just bumped the version
+    session.forget_data_version(league_id)
+    data_version = session.data_version(league_id)
+    if data_version is None:
+        logger.info("No ingest recorded for league %s, skipping prefetch", league_id)
+        return []
+
+    done = []
+    for name in SUMMARIES:
+        if name in PERSONAL and not username:
+            continue
+        try:
+            cache.put(league_id, username, name, data_version, compute(name, league_id, username))
+            done.append(name)
+        except Exception as e:
+            logger.warning("Prefetch of %s for league %s failed: %s", name, league_id, e)
+    logger.info("Prefetched %s for league %s (version %s)", done, league_id, data_version)
+
+    if replica.enabled():
+        try:
+            replica.materialize(league_id=league_id, data_version=data_version)
+        except Exception as e:
+            # query_db falls back to Postgres without it
+            logger.warning("Could not materialize replica for league %s: %s", league_id, e)
+    return done
+
@@ -4,4 +4,21 @@ import os
 module_dir = os.path.dirname(os.path.abspath(__file__))
 
 with open(os.path.join(module_dir, 'buddy.md'), 'r') as f:
-    buddy_system_prompt = f.read()
\ No newline at end of file
+    buddy_system_prompt = f.read()
+
+with open(os.path.join(module_dir, 'schema.md'), 'r') as f:
+    schema_doc = f.read()
+
+
+def user_context(username: str | None, league_id: str | None) -> str:
+    """The per-thread context message describing who Buddy is talking to."""
+    username_str = (username or "").strip() or "unknown"
+    league_id_str = (league_id or "").strip() or "unknown"
+    return (
+        "Context for this conversation:\n"
+        f"- Display Name: {username_str}\n"
+        f"- Sleeper league_id: {league_id_str}\n\n"
+        "You should tailor answers, SQL queries, and analysis to this league_id's data in the database "
+        "and communicate as if you are assisting this specific user."
+    )
+
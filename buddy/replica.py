@@ -0,0 +1,248 @@
+"""
+Embedded, read-only replica of a league's tables.
+
+When REPLICA_DIR is set, the process that runs the agent copies every table it queries into a DuckDB file per
+league (`<REPLICA_DIR>/<league_id>.duckdb`). The copy is made by the prefetch run the frontend triggers after each
+load (see `buddy/prefetch.py`), so REPLICA_DIR must be set on the LangGraph server, not the Streamlit app. `query_db`
+then serves read-only queries for that league in-process and only falls back to the hosted Postgres when the replica
+is missing, stale or cannot run the statement.
+
+Tables live in a `public` schema, which is also the search path, so both `players` and `public.players` resolve.
+Every query runs with `integer_division` on, so `/` truncates integers like Postgres does. Other differences remain:
+jsonb columns are stored as DuckDB JSON, so Postgres json operators and functions fail and the query is retried on
+Postgres; `numeric` columns are read as doubles; and DuckDB is more lenient (e.g. `ROUND(double, n)` works), so a
+query that succeeds here may fail on Postgres, never the other way round.
+
+DuckDB is an optional dependency (`pip install .[replica]`, installed by the Dockerfile). Without it the replica is
+simply disabled.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import Engine, create_engine, text
+
+from buddy import env
+
+logger = logging.getLogger(__name__)
+
+
+def _duckdb():
+    """Import DuckDB on first use; it is optional and noticeably slows down process start."""
+    try:
+        import duckdb
+    except ImportError:  # pragma: no cover - optional dependency
+        return None
+    return duckdb
+
+
+# Tables scoped to a single league. Only the rows for the replicated league are copied.
+LEAGUE_TABLES = [
+    "league_information",
+    "league_users",
+    "league_rosters",
+    "matchups",
+    "weekly_player_statistics",
+    "league_fantasy_points",
+]
+
+# Tables shared by every league. They are small, so the replica keeps a full copy.
+GLOBAL_TABLES = [
+    "league_state",
+    "players",
+    "trending_players",
+    "aggregated_player_statistics",
+]
+
+SCHEMA = "public"
+
+_META_TABLE = "_replica_meta"
+
+# Applied to every cursor: settings are per connection and a cursor is a new connection.
+_SESSION_SETTINGS = [
+    f"SET search_path = '{SCHEMA}'",
+    # Postgres truncates integer division (5/2 = 2); DuckDB returns 2.5 unless this is on
+    "SET integer_division = true",
+]
+
+_READ_ONLY = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+_LEAGUE_ID = re.compile(r"league_id\s*(?:=|in\s*\()\s*'([^']+)'", re.IGNORECASE)
+
+
+def enabled() -> bool:
+    """Whether the replica is configured and DuckDB is installed."""
+    return bool(env.REPLICA_DIR) and _duckdb() is not None
+
+
+def replica_path(league_id: str) -> str:
+    return os.path.join(env.REPLICA_DIR, f"{league_id}.duckdb")
+
+
+def league_in_query(query: str) -> Optional[str]:
+    """Return the single league_id a query filters on, or None if it references zero or several leagues."""
+    league_ids = set(_LEAGUE_ID.findall(query))
+    if len(league_ids) != 1:
+        return None
+    return league_ids.pop()
+
+
+_source_engine: Engine = None
+
+
+def source_engine() -> Engine:
+    """A small engine on the hosted Postgres used to read the freshly ingested rows."""
+    global _source_engine
+    if _source_engine is None:
+        _source_engine = create_engine(env.SUPABASE_URL, pool_size=1, max_overflow=0, pool_pre_ping=True)
+    return _source_engine
+
+
+def _to_duckdb_frame(df):
+    """Serialize jsonb columns (decoded to lists/dicts by psycopg2) so DuckDB can store them as JSON."""
+    json_columns = []
+    for column in df.columns:
+        if df[column].map(lambda v: isinstance(v, (list, dict))).any():
+            df[column] = df[column].map(lambda v: None if v is None else json.dumps(v))
+            json_columns.append(column)
+    return df, json_columns
+
+
+def materialize(league_id: str, data_version: int, engine: Engine = None) -> Optional[str]:
+    """Copy a league's tables from Postgres into its replica file.
+
+    The file is built next to the live replica and swapped in with an atomic rename, so readers in other processes
+    never see a partially written database.
+
+    Args:
+        league_id: The league to replicate.
+        data_version: The ingest version the copy corresponds to (see `ingest_versions`).
+        engine: Source engine. Defaults to `source_engine()`.
+
+    Returns:
+        str: The replica path, or None if the replica is disabled.
+    """
+    if not enabled():
+        return None
+
+    import pandas as pd
+
+    engine = engine or source_engine()
+    os.makedirs(env.REPLICA_DIR, exist_ok=True)
+    path = replica_path(league_id)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    started = time.perf_counter()
+    con = _duckdb().connect(tmp_path)
+    try:
+        con.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA}")
+        with engine.connect() as conn:
+            for table in LEAGUE_TABLES + GLOBAL_TABLES:
+                if table in LEAGUE_TABLES:
+                    sql = text(f"SELECT * FROM public.{table} WHERE league_id = :league_id")
+                    df = pd.read_sql_query(sql, conn, params={"league_id": league_id})
+                else:
+                    df = pd.read_sql_query(text(f"SELECT * FROM public.{table}"), conn)
+
+                df, json_columns = _to_duckdb_frame(df)
+                casts = ", ".join(f'CAST("{c}" AS JSON) AS "{c}"' for c in json_columns)
+                select = f"SELECT * REPLACE ({casts}) FROM df" if casts else "SELECT * FROM df"
+                con.register("df", df)
+                con.execute(f'CREATE TABLE {SCHEMA}."{table}" AS {select}')
+                con.unregister("df")
+
+        con.execute(f"CREATE TABLE {_META_TABLE} (league_id TEXT, data_version BIGINT, materialized_at DOUBLE)")
+        con.execute(f"INSERT INTO {_META_TABLE} VALUES (?, ?, ?)", [league_id, data_version, time.time()])
+    finally:
+        con.close()
+
+    os.replace(tmp_path, path)
+    logger.info("Materialized replica for league %s in %.2fs", league_id, time.perf_counter() - started)
+    return path
+
+
+class _Replica:
+    def __init__(self, con, mtime: float, data_version: int, materialized_at: float):
+        self.con = con
+        self.mtime = mtime
+        self.data_version = data_version
+        self.materialized_at = materialized_at
+
+
+class ReplicaReader:
+    """Keeps one read-only DuckDB connection per league and reopens it when the file is replaced."""
+
+    def __init__(self):
+        self._replicas: dict[str, _Replica] = {}
+        self._lock = threading.Lock()
+
+    def _open(self, league_id: str) -> Optional[_Replica]:
+        path = replica_path(league_id)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            replica = self._replicas.get(league_id)
+            if replica is not None and replica.mtime == mtime:
+                return replica
+
+            con = _duckdb().connect(path, read_only=True)
+            data_version, materialized_at = con.execute(
+                f"SELECT data_version, materialized_at FROM {_META_TABLE}"
+            ).fetchone()
+            if replica is not None:
+                replica.con.close()
+            replica = _Replica(con, mtime, data_version, materialized_at)
+            self._replicas[league_id] = replica
+            return replica
+
+    def query(self, query: str, league_id: str, data_version: Optional[int] = None):
+        """Run a read-only query against the league's replica.
+
+        Args:
+            query: The SQL query.
+            league_id: The league the query is scoped to.
+            data_version: The latest ingested version for the league, if known. A replica built from an older
+                ingest is treated as stale.
+
+        Returns:
+            pd.DataFrame | None: The result, or None when the caller should fall back to Postgres.
+        """
+        if not enabled() or not _READ_ONLY.match(query):
+            return None
+
+        try:
+            replica = self._open(league_id)
+        except Exception as e:
+            logger.warning("Could not open replica for league %s: %s", league_id, e)
+            return None
+        if replica is None:
+            return None
+        if data_version is not None and replica.data_version != data_version:
+            return None
+        if time.time() - replica.materialized_at > env.REPLICA_MAX_AGE_SECONDS:
+            return None
+
+        try:
+            # A cursor is a separate connection to the same database, so concurrent tool calls don't share state.
+            cursor = replica.con.cursor()
+            try:
+                for setting in _SESSION_SETTINGS:
+                    cursor.execute(setting)
+                return cursor.execute(query).fetchdf()
+            finally:
+                cursor.close()
+        except Exception as e:
+            # Postgres-only syntax (e.g. jsonb_array_elements_text) lands here and is retried remotely.
+            logger.debug("Replica could not run query, falling back to Postgres: %s", e)
+            return None
+
+
+reader = ReplicaReader()
@@ -0,0 +1,116 @@
+"""
+Model routing.
+
+Most questions are lookups ("show my roster", "who leads the league in assists") that a small model answers with one
+query. Trade evaluations, comparisons and recommendations need the larger model. The router classifies each turn
+with cheap heuristics before any LLM call: only short, single questions that open like a retrieval ("show", "who
+leads", ...) and carry no analysis term go to the small model. `RouteStats` keeps per-route latency and token numbers,
+served on the telemetry metrics endpoint, so the thresholds can be tuned against real traffic.
+"""
+import logging
+import re
+import statistics
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+
+from buddy import telemetry
+
+logger = logging.getLogger(__name__)
+
+LOOKUP = "lookup"
+ANALYSIS = "analysis"
+
+# Words that signal judgement, comparison or multi-step work
+ANALYSIS_TERMS = (
+    "trade", "evaluate", "compare", "comparison", "versus", "vs", "should", "why", "recommend", "better", "best",
+    "worst", "improve", "optimize", "strategy", "predict", "project", "projection", "trend", "analyze", "analysis",
+    "explain", "worth", "value", "fair", "sell", "buy", "drop", "pick up", "stream", "start or sit", "chart", "plot",
+)
+# Openers of simple retrieval questions
+LOOKUP_OPENERS = (
+    "show", "list", "what is", "what are", "who is", "who are", "who has", "who leads", "how many", "when",
+    "which team", "get", "give",
+)
+
+
+@dataclass
+class Router:
+    """Classifies a turn as a lookup or an analysis request.
+
+    Attributes:
+        max_lookup_words: Questions longer than this always go to the analysis model.
+        max_lookup_questions: Messages asking more than this many questions always go to the analysis model.
+        analysis_terms: Terms that send a question to the analysis model.
+        lookup_openers: Openers that mark a short question as a lookup.
+        default_lookup: Send short questions with neither an analysis term nor a lookup opener to the lookup model
+            too. Off by default, so the small model only gets questions that look like retrieval.
+    """
+    max_lookup_words: int = 20
+    max_lookup_questions: int = 1
+    analysis_terms: tuple = ANALYSIS_TERMS
+    lookup_openers: tuple = LOOKUP_OPENERS
+    default_lookup: bool = False
+
+    def __post_init__(self):
+        self._analysis = re.compile(r"\b(" + "|".join(re.escape(t) for t in self.analysis_terms) + r")\b")
+
+    def route(self, question: str) -> str:
+        """Return `LOOKUP` or `ANALYSIS` for the question."""
+        text = " ".join(question.lower().split())
+        if len(text.split()) > self.max_lookup_words or text.count("?") > self.max_lookup_questions:
+            return ANALYSIS
+        if self._analysis.search(text):
+            return ANALYSIS
+        if text.startswith(self.lookup_openers) or self.default_lookup:
+            return LOOKUP
+        return ANALYSIS
+
+
+@dataclass
+class RouteStats:
+    """Rolling per-route turn metrics.
+
+    Attributes:
+        window: The number of most recent turns kept per route.
+    """
+    window: int = 500
+    _turns: dict = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def record(self, route: str, latency_ms: float, input_tokens: int, output_tokens: int, llm_calls: int):
+        """Record one finished turn."""
+        with self._lock:
+            turns = self._turns.setdefault(route, deque(maxlen=self.window))
+            turns.append((latency_ms, input_tokens, output_tokens, llm_calls))
+        logger.info(
+            "Route %s: %.0fms, %d input / %d output tokens, %d LLM calls",
+            route, latency_ms, input_tokens, output_tokens, llm_calls
+        )
+
+    def snapshot(self) -> dict:
+        """Per-route turn count, latency percentiles and mean tokens and LLM calls over the window.
+
+        Returns:
+            dict: `{route: {"turns", "p50_ms", "p95_ms", "mean_input_tokens", "mean_output_tokens",
+            "mean_llm_calls"}}`
+        """
+        with self._lock:
+            turns = {route: list(samples) for route, samples in self._turns.items()}
+
+        report = {}
+        for route, samples in turns.items():
+            latencies = sorted(s[0] for s in samples)
+            report[route] = {
+                "turns": len(samples),
+                "p50_ms": round(statistics.median(latencies)),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]),
+                "mean_input_tokens": round(statistics.fmean(s[1] for s in samples)),
+                "mean_output_tokens": round(statistics.fmean(s[2] for s in samples)),
+                "mean_llm_calls": round(statistics.fmean(s[3] for s in samples), 2),
+            }
+        return report
+
+
+stats = RouteStats()
+telemetry.register_source("route", stats.snapshot)
@@ -0,0 +1,248 @@
+"""
+Database schema for the system prompt.
+
+The schema is introspected from Postgres once per process and rendered in a compact one-line-per-table format.
+Only the tables relevant to the current question are injected into the prompt, which keeps most of the per-turn
+input tokens out of the LLM call. Column notes (e.g. "reserve players are injured") come from `prompts/schema.md`,
+which is also the fallback when the database can't be reached.
+"""
+import asyncio
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+
+from sqlalchemy import text
+
+from buddy.prompts import prompts
+from buddy.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+# Bookkeeping columns that never help answer a question.
+HIDDEN_COLUMNS = {"inserted_at", "updated_at"}
+
+# Tables used by ingestion and the agent internally. Not exposed to the LLM.
+HIDDEN_TABLES = {"ingest_versions", "ingest_locks"}
+
+# Tables that nearly every question needs to resolve users, teams and player names.
+CORE_TABLES = ["league_users", "league_rosters", "players"]
+
+# Words users actually type, mapped to the tables that answer them. Table and column names are matched as well.
+KEYWORDS = {
+    "league_state": ["week", "season", "today", "current", "schedule"],
+    "league_information": ["league", "scoring", "settings", "format", "roster positions", "slots", "categories"],
+    "league_users": ["user", "owner", "manager", "opponent", "display name", "team name", "standings"],
+    "league_rosters": ["roster", "team", "lineup", "starter", "start", "sit", "bench", "injur", "reserve",
+                       "free agent", "waiver", "pickup", "drop", "add", "trade", "standings", "record", "wins"],
+    "players": ["player", "position", "center", "guard", "forward", "injur", "age", "rookie", "free agent"],
+    "trending_players": ["trending", "hot", "popular", "most added", "pickup", "buzz"],
+    "aggregated_player_statistics": ["stat", "average", "avg", "per game", "best", "top", "worst", "rank",
+                                     "value", "game score", "fantasy points", "points", "rebound", "assist",
+                                     "steal", "block", "season", "free agent", "trade", "compare"],
+    "weekly_player_statistics": ["week", "weekly", "last week", "this week", "recent", "trend", "quarter",
+                                 "half", "hot", "cold", "lately"],
+    "league_fantasy_points": ["fantasy points", "fpts", "points", "per game", "scoring", "value", "best", "top",
+                              "worst", "rank", "compare", "trade", "start", "sit", "lineup", "free agent"],
+    "matchups": ["matchup", "opponent", "versus", "vs", "playing against", "head to head", "this week", "score"],
+}
+
+
+@dataclass
+class Column:
+    name: str
+    type: str
+    primary_key: bool = False
+    note: str = ""
+
+
+@dataclass
+class Table:
+    name: str
+    columns: List[Column] = field(default_factory=list)
+
+    def render(self) -> str:
+        """Render as `table(col type PK, col type /* note */, ...)` on a single line."""
+        parts = []
+        for c in self.columns:
+            if c.name in HIDDEN_COLUMNS:
+                continue
+            part = f"{c.name} {c.type}"
+            if c.primary_key:
+                part += " PK"
+            if c.note:
+                part += f" /* {c.note} */"
+            parts.append(part)
+        return f"{self.name}({', '.join(parts)})"
+
+
+_TABLE_HEADER = re.compile(r"^\[(\w+)\]\s*$")
+_COLUMN_LINE = re.compile(r"^(\w+):\s*(\w+)\s*(\([^)]*\))?\s*(?:--\s*(.*))?$")
+
+_TYPE_ALIASES = {
+    "integer": "int",
+    "bigint": "bigint",
+    "numeric": "num",
+    "boolean": "bool",
+    "text": "text",
+    "jsonb": "jsonb",
+    "date": "date",
+    "timestamp with time zone": "timestamptz",
+    "character varying": "text",
+    "double precision": "float",
+}
+
+
+def parse_schema_doc(doc: str) -> dict[str, Table]:
+    """Parse the `[table]` / `column: type (...) -- note` format used by `prompts/schema.md`."""
+    tables: dict[str, Table] = {}
+    current: Optional[Table] = None
+    for line in doc.splitlines():
+        line = line.strip()
+        header = _TABLE_HEADER.match(line)
+        if header:
+            current = tables.setdefault(header.group(1), Table(header.group(1)))
+            continue
+        column = _COLUMN_LINE.match(line)
+        if current is None or column is None:
+            continue
+        name, type_, constraints, note = column.groups()
+        if any(c.name == name for c in current.columns):
+            continue
+        current.columns.append(Column(
+            name=name,
+            type=_TYPE_ALIASES.get(type_.lower(), type_.lower()),
+            primary_key="primary key" in (constraints or "").lower(),
+            note=(note or "").strip(),
+        ))
+    return tables
+
+
+class SchemaProvider:
+    """Introspects the public schema once and renders the parts of it a question needs.
+
+    Attributes:
+        engine_factory: Callable returning the SQLAlchemy engine to introspect.
+        doc: Annotated schema document used for column notes and as the offline fallback.
+    """
+
+    def __init__(self, engine_factory=None, doc: str = prompts.schema_doc):
+        self.engine_factory = engine_factory
+        self.doc = doc
+        self._tables: Optional[dict[str, Table]] = None
+        self._full_tokens: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _introspect(self) -> dict[str, Table]:
+        engine = self.engine_factory()
+        with engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT c.table_name, c.column_name, c.data_type,
+                       (k.column_name IS NOT NULL) AS primary_key
+                FROM information_schema.columns c
+                LEFT JOIN information_schema.table_constraints t
+                  ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+                 AND t.constraint_type = 'PRIMARY KEY'
+                LEFT JOIN information_schema.key_column_usage k
+                  ON k.constraint_name = t.constraint_name AND k.table_schema = c.table_schema
+                 AND k.table_name = c.table_name AND k.column_name = c.column_name
+                WHERE c.table_schema = 'public'
+                ORDER BY c.table_name, c.ordinal_position
+            """)).fetchall()
+
+        notes = {
+            (table.name, column.name): column.note
+            for table in parse_schema_doc(self.doc).values()
+            for column in table.columns
+        }
+        tables: dict[str, Table] = {}
+        for table_name, column_name, data_type, primary_key in rows:
+            if table_name in HIDDEN_TABLES or table_name.startswith("_"):
+                continue
+            tables.setdefault(table_name, Table(table_name)).columns.append(Column(
+                name=column_name,
+                type=_TYPE_ALIASES.get(data_type, data_type),
+                primary_key=bool(primary_key),
+                note=notes.get((table_name, column_name), ""),
+            ))
+        return tables
+
+    def tables(self) -> dict[str, Table]:
+        """All tables, introspected on first use and cached for the life of the process."""
+        if self._tables is None:
+            with self._lock:
+                if self._tables is None:
+                    try:
+                        self._tables = self._introspect()
+                    except Exception as e:
+                        logger.warning("Schema introspection failed, using prompts/schema.md: %s", e)
+                        self._tables = parse_schema_doc(self.doc)
+        return self._tables
+
+    def relevant_tables(self, texts: Iterable[str]) -> List[str]:
+        """Pick the tables a question touches, matching keywords, table names and column names.
+
+        Args:
+            texts: The recent user messages (the current question first).
+
+        Returns:
+            list: Table names in schema order. Always includes CORE_TABLES.
+        """
+        question = " ".join(texts).lower()
+        words = set(re.findall(r"[a-z_]+", question))
+        tables = self.tables()
+
+        selected = set(t for t in CORE_TABLES if t in tables)
+        for name, table in tables.items():
+            if name in question or any(k in question for k in KEYWORDS.get(name, [])):
+                selected.add(name)
+                continue
+            if any(c.name in words for c in table.columns if len(c.name) > 3 and c.name not in HIDDEN_COLUMNS):
+                selected.add(name)
+        return [name for name in tables if name in selected]
+
+    def render(self, table_names: Optional[Iterable[str]] = None) -> str:
+        """Render the given tables (or all of them) as a compact schema block."""
+        tables = self.tables()
+        names = list(tables) if table_names is None else table_names
+        lines = [
+            "Tables on the `public` schema (only use these; PK = primary key, /* */ = notes):",
+            *[tables[name].render() for name in names if name in tables],
+        ]
+        return "\n".join(lines)
+
+    def render_for(self, texts: Iterable[str], exclude: Iterable[str] = ()) -> tuple[str, int, List[str]]:
+        """Render the schema for a question.
+
+        Args:
+            texts: The recent user messages (the current question first).
+            exclude: Tables the conversation already has in its history.
+
+        Returns:
+            tuple: The schema block for the newly needed tables (empty if there are none), the number of tokens
+                saved compared to sending every table, and the names of the rendered tables.
+        """
+        if self._full_tokens is None:
+            self._full_tokens = count_tokens(self.render())
+        exclude = set(exclude)
+        tables = [name for name in self.relevant_tables(texts) if name not in exclude]
+        if not tables:
+            return "", self._full_tokens, []
+        schema = self.render(tables)
+        return schema, self._full_tokens - count_tokens(schema), tables
+
+    async def arender_for(self, texts: Iterable[str], exclude: Iterable[str] = ()) -> tuple[str, int, List[str]]:
+        """Async `render_for`. The first call introspects the database on a worker thread."""
+        if self._tables is None:
+            return await asyncio.to_thread(self.render_for, list(texts), list(exclude))
+        return self.render_for(texts, exclude)
+
+
+def _session_engine():
+    from buddy.tools import session
+    return session.engine
+
+
+provider = SchemaProvider(engine_factory=_session_engine)
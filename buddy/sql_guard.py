@@ -0,0 +1,160 @@
+"""
+Preflight checks for model-generated SQL.
+
+Before `query_db` executes a statement it is parsed to make sure it is a single read-only query, given a default
+LIMIT when it has none, and (against Postgres) costed with EXPLAIN. Statements over the cost budget are rejected with
+an explanation the model can act on instead of holding a pooled connection until `statement_timeout` fires.
+"""
+import re
+
+from sqlalchemy import Connection, text
+
+from buddy import env
+
+
+class PreflightError(ValueError):
+    """Raised when a statement is rejected before execution. The message is returned to the model."""
+
+
+# Comments, string literals, quoted identifiers and dollar-quoted bodies, in the order Postgres lexes them.
+_LEXEMES = re.compile(
+    r"""--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'|"(?:[^"]|"")*"|\$(\w*)\$.*?\$\1\$""",
+    re.DOTALL
+)
+
+_FIRST_KEYWORD = re.compile(r"^\s*\(*\s*(\w+)")
+
+_WRITE_KEYWORDS = re.compile(
+    r"\b(insert|update|delete|merge|upsert|drop|alter|create|truncate|grant|revoke|copy|call|do|vacuum|analyze|"
+    r"refresh|reindex|cluster|lock|set|reset|comment|security|listen|notify|prepare|execute|into)\b",
+    re.IGNORECASE
+)
+
+_UNSAFE_FUNCTIONS = re.compile(
+    r"\b(pg_sleep\w*|pg_terminate_backend|pg_cancel_backend|pg_read_\w+|pg_ls_dir|lo_\w+|dblink\w*|set_config)\s*\(",
+    re.IGNORECASE
+)
+
+_LOCKING_CLAUSE = re.compile(r"\bfor\s+(update|share|no\s+key\s+update|key\s+share)\b", re.IGNORECASE)
+
+_ROW_LIMIT = re.compile(r"\b(limit|fetch\s+(first|next))\b", re.IGNORECASE)
+
+
+def _mask(query: str) -> str:
+    """Blank out comments and literals so keyword checks only see SQL structure."""
+    return _LEXEMES.sub(lambda m: " " if m.group(0).startswith(("--", "/*")) else "''", query)
+
+
+def _top_level(masked: str) -> str:
+    """Drop everything nested inside parentheses, leaving the outermost statement."""
+    depth = 0
+    out = []
+    for ch in masked:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth = max(depth - 1, 0)
+        elif depth == 0:
+            out.append(ch)
+    return "".join(out)
+
+
+def check_read_only(query: str) -> str:
+    """Validate that `query` is exactly one read-only statement.
+
+    Args:
+        query: The SQL generated by the model.
+
+    Returns:
+        str: The statement without a trailing semicolon.
+
+    Raises:
+        PreflightError: If the statement is empty, contains several statements or could modify data.
+    """
+    statement = query.strip().rstrip(";").strip()
+    masked = _mask(statement)
+
+    if not masked.strip():
+        raise PreflightError("The query is empty.")
+    if ";" in masked:
+        raise PreflightError("Only one SQL statement can be run per call. Split it into separate query_db calls.")
+
+    first = _FIRST_KEYWORD.match(masked)
+    if first is None or first.group(1).lower() not in ("select", "with", "values", "table"):
+        raise PreflightError("Only read-only SELECT queries are allowed.")
+
+    for pattern in (_WRITE_KEYWORDS, _LOCKING_CLAUSE, _UNSAFE_FUNCTIONS):
+        match = pattern.search(masked)
+        if match:
+            raise PreflightError(
+                f"Only read-only SELECT queries are allowed ('{match.group(0).strip()}' is not permitted)."
+            )
+    return statement
+
+
+def ensure_limit(statement: str, default_limit: int = None) -> tuple[str, int | None]:
+    """Append a LIMIT to statements that don't already bound their row count at the top level.
+
+    Returns:
+        tuple[str, int | None]: The statement, and the LIMIT that was added (None if it already had one).
+    """
+    default_limit = default_limit or env.QUERY_DEFAULT_LIMIT
+    if _ROW_LIMIT.search(_top_level(_mask(statement))):
+        return statement, None
+    return f"{statement}\nLIMIT {default_limit}", default_limit
+
+
+def prepare(query: str) -> tuple[str, int | None]:
+    """Run the parse-only checks: read-only validation and LIMIT injection.
+
+    Returns:
+        tuple[str, int | None]: The statement to run, and the row cap added to it, if any.
+    """
+    return ensure_limit(check_read_only(query))
+
+
+def explain(conn: Connection, statement: str) -> tuple[float, float]:
+    """Return the planner's (total cost, estimated rows) for a statement without executing it."""
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {statement}")).scalar()
+    if isinstance(plan, str):
+        import json
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+    return float(root["Total Cost"]), float(root["Plan Rows"])
+
+
+def enforce_budget(
+        conn: Connection, statement: str, max_cost: float = None, max_rows: int = None
+) -> tuple[str, int | None]:
+    """Cost a prepared statement with EXPLAIN and reject or rewrite it if it is over budget.
+
+    Args:
+        conn: An open Postgres connection. The statement is only planned, never executed.
+        statement: A statement returned by `prepare`.
+        max_cost: Maximum planner cost. Defaults to QUERY_MAX_COST.
+        max_rows: Maximum estimated result rows. Defaults to QUERY_MAX_ROWS.
+
+    Returns:
+        tuple[str, int | None]: The statement to execute, capped to `max_rows` if the planner expects more, and the
+            cap (None if the statement was left as it is).
+
+    Raises:
+        PreflightError: If the estimated cost is over budget.
+    """
+    max_cost = max_cost or env.QUERY_MAX_COST
+    max_rows = max_rows or env.QUERY_MAX_ROWS
+
+    try:
+        cost, rows = explain(conn, statement)
+    except Exception as e:
+        raise PreflightError(f"The query could not be planned: {e}") from e
+
+    if cost > max_cost:
+        raise PreflightError(
+            f"The query is too expensive to run (estimated cost {cost:,.0f}, budget {max_cost:,.0f}; "
+            f"about {rows:,.0f} rows). Filter on league_id and other keys, join on key columns instead of "
+            f"cross joining, aggregate in SQL, or select fewer columns, then retry."
+        )
+    if rows > max_rows:
+        return f"SELECT * FROM (\n{statement}\n) AS capped LIMIT {max_rows}", max_rows
+    return statement, None
@@ -0,0 +1,354 @@
+"""
+In-process tracing and latency histograms.
+
+`span(name)` times a block, records it in a rolling histogram per span name and, when `TELEMETRY_JSONL` is set,
+appends the span (with trace and parent ids) to a JSONL file. When `TELEMETRY_PORT` is set, `start_exporters()` also
+serves the histograms on `http://<TELEMETRY_HOST>:<port>/metrics` (Prometheus text format; the host defaults to
+127.0.0.1, so only local scrapers can reach it) and `/metrics.json`, together
+with the gauges of any source added with `register_source()` (e.g. per-route turn stats from `buddy/routing.py`).
+Nothing here needs an external service.
+
+Span names used by the agent:
+- node.<name>: one graph node execution
+- llm.ttft / llm.total: time to first streamed token and total time of a chat model call
+- tool.<name>: one tool call, including time waiting for a concurrency slot
+- db.checkout, db.execute, db.fetch, replica.query, render: the stages of a query_db call
+- turn.<route>: a whole turn, from routing to the final answer, per model route
+"""
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from buddy import env
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the cumulative histogram buckets; the rolling window gives the quantiles
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("buddy_span", default=None)
+
+
+class Histogram:
+    """Cumulative bucket counts plus a rolling window of recent samples for quantiles.
+
+    Attributes:
+        window: The number of most recent samples used for quantiles.
+    """
+
+    def __init__(self, window: int):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def observe(self, value_ms: float):
+        self.counts[bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.total += value_ms
+        self.count += 1
+        self.recent.append(value_ms)
+
+    def quantiles(self) -> dict[float, float]:
+        ordered = sorted(self.recent)
+        if not ordered:
+            return {}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+
+class Registry:
+    """Histograms by span name, shared by every thread and event loop in the process."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._histograms: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value_ms: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.window)
+            histogram.observe(value_ms)
+
+    def snapshot(self) -> dict:
+        """Count, mean and rolling quantiles per span name.
+
+        Returns:
+            dict: `{name: {"count", "mean_ms", "p50_ms", "p90_ms", "p95_ms", "p99_ms"}}`
+        """
+        with self._lock:
+            report = {}
+            for name, h in sorted(self._histograms.items()):
+                report[name] = {"count": h.count, "mean_ms": round(h.total / h.count, 2) if h.count else 0.0}
+                report[name].update({f"p{int(q * 100)}_ms": round(v, 2) for q, v in h.quantiles().items()})
+            return report
+
+    def prometheus(self) -> str:
+        """Render the histograms in the Prometheus text exposition format."""
+        lines = [
+            "# TYPE buddy_span_duration_ms histogram",
+        ]
+        with self._lock:
+            items = sorted(self._histograms.items())
+            for name, h in items:
+                cumulative = 0
+                for bound, count in zip((*BUCKETS_MS, "+Inf"), h.counts):
+                    cumulative += count
+                    lines.append(f'buddy_span_duration_ms_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'buddy_span_duration_ms_sum{{span="{name}"}} {h.total:.3f}')
+                lines.append(f'buddy_span_duration_ms_count{{span="{name}"}} {h.count}')
+            lines.append("# TYPE buddy_span_recent_ms summary")
+            for name, h in items:
+                for q, v in h.quantiles().items():
+                    lines.append(f'buddy_span_recent_ms{{span="{name}",quantile="{q}"}} {v:.3f}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry(window=env.TELEMETRY_WINDOW)
+
+# Gauge sources served next to the histograms: name -> snapshot function returning {label: {metric: value}}
+_sources: dict[str, Callable[[], dict]] = {}
+
+
+def register_source(name: str, snapshot: Callable[[], dict]):
+    """Serve a snapshot function's numbers on the metrics endpoints.
+
+    Args:
+        name: The source name. Its metrics are exported as `buddy_<name>_<metric>{<name>="<label>"}` gauges and under
+            `name` in /metrics.json.
+        snapshot: Returns `{label: {metric: value}}`, e.g. `RouteStats.snapshot`.
+    """
+    _sources[name] = snapshot
+
+
+def _sources_prometheus() -> str:
+    lines = []
+    for name, snapshot in sorted(_sources.items()):
+        metrics: dict[str, list[str]] = {}
+        for label, values in sorted(snapshot().items()):
+            for metric, value in values.items():
+                metrics.setdefault(metric, []).append(f'buddy_{name}_{metric}{{{name}="{label}"}} {value}')
+        for metric, samples in metrics.items():
+            lines.append(f"# TYPE buddy_{name}_{metric} gauge")
+            lines.extend(samples)
+    return "".join(line + "\n" for line in lines)
+
+
+def _sources_json() -> dict:
+    return {name: snapshot() for name, snapshot in sorted(_sources.items())}
+
+
+class _JsonlWriter:
+    """Appends finished spans to a JSONL file from a background thread, so spans never wait on disk I/O."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        threading.Thread(target=self._run, name="buddy-telemetry-writer", daemon=True).start()
+
+    def write(self, record: dict):
+        self._queue.put(record)
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                records = [self._queue.get()]
+                while not self._queue.empty() and len(records) < 500:
+                    records.append(self._queue.get())
+                f.write("".join(json.dumps(r, default=str) + "\n" for r in records))
+                f.flush()
+
+
+_writer: Optional[_JsonlWriter] = _JsonlWriter(env.TELEMETRY_JSONL) if env.TELEMETRY_JSONL else None
+
+
+class Span:
+    """A timed operation. Use `span()` rather than creating spans directly."""
+
+    def __init__(self, name: str, attributes: dict):
+        parent = _current_span.get()
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = 0.0
+
+    def set(self, **attributes):
+        """Add attributes to the exported span."""
+        self.attributes.update(attributes)
+
+    def end(self, error: Optional[BaseException] = None):
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        registry.observe(self.name, self.duration_ms)
+        if _writer is not None:
+            _writer.write({
+                "name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "start": self.start, "duration_ms": round(self.duration_ms, 3),
+                "error": repr(error) if error else None, **self.attributes,
+            })
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the enclosed block as a span named `name`. Nested spans share the trace id.
+
+    Args:
+        name: The span (and histogram) name.
+        **attributes: Extra fields for the exported span.
+    """
+    current = Span(name, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(error=e)
+        raise
+    else:
+        current.end()
+    finally:
+        _current_span.reset(token)
+
+
+def observe(name: str, value_ms: float):
+    """Record a duration measured elsewhere."""
+    registry.observe(name, value_ms)
+
+
+def traced(name: str) -> Callable:
+    """Decorate a graph node so each execution is a span. Keeps the signature LangGraph inspects for injected
+    arguments such as `config` and `store`."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LLMTimingHandler(BaseCallbackHandler):
+    """Records time to first token and total time of chat model calls."""
+    run_inline = True
+
+    def __init__(self):
+        self._started: dict = {}
+        self._first_token: set = set()
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            if run_id in self._first_token or run_id not in self._started:
+                return
+            self._first_token.add(run_id)
+            started = self._started[run_id]
+        observe("llm.ttft", (time.perf_counter() - started) * 1000)
+
+    def _finish(self, run_id):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+            self._first_token.discard(run_id)
+        if started is not None:
+            observe("llm.total", (time.perf_counter() - started) * 1000)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+
+llm_timing = LLMTimingHandler()
+
+
+def with_llm_timing(config: Optional[dict]) -> dict:
+    """A copy of a node's runnable config whose callbacks also include `llm_timing`.
+
+    Pass the result to a chat model's `ainvoke()`. Binding the handler to the model with `with_config(callbacks=...)`
+    would replace the callbacks the graph passes down, and with them the handler behind the "messages" stream.
+    """
+    config = dict(config or {})
+    callbacks = config.get("callbacks")
+    if callbacks is None:
+        callbacks = [llm_timing]
+    elif isinstance(callbacks, list):
+        callbacks = [*callbacks, llm_timing]
+    else:
+        callbacks = callbacks.copy()
+        callbacks.add_handler(llm_timing, inherit=False)
+    config["callbacks"] = callbacks
+    return config
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = (registry.prometheus() + _sources_prometheus()).encode(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = json.dumps({**registry.snapshot(), **_sources_json()}).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server_lock = threading.Lock()
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_exporters(port: Optional[int] = None, host: Optional[str] = None) -> Optional[ThreadingHTTPServer]:
+    """Serve the metrics endpoint on `host:port` (default `TELEMETRY_HOST:TELEMETRY_PORT`) if a port is configured.
+    Safe to call repeatedly.
+
+    Returns:
+        ThreadingHTTPServer: The running server, or None when no port is configured.
+    """
+    global _server
+    port = port or env.TELEMETRY_PORT
+    host = host or env.TELEMETRY_HOST
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.warning("Telemetry endpoint not started on %s:%d: %s", host, port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, name="buddy-telemetry-http", daemon=True).start()
+            logger.info("Serving metrics on http://%s:%d/metrics", host, port)
+    return _server
@@ -0,0 +1,47 @@
+"""
+Token counting helpers.
+
+Uses tiktoken's o200k_base encoding when it can be loaded and falls back to the usual ~4 characters per token estimate
+otherwise. tiktoken downloads the encoding on first use, which can take seconds or fail offline, so the encoding is
+loaded on a background thread and counts are estimated until it is ready. A failed load is logged once and the
+estimate is used from then on.
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_loading = threading.Lock()
+_started = False
+
+
+def _load():
+    global _encoding
+    try:
+        import tiktoken
+
+        _encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning("tiktoken encoding unavailable, estimating token counts: %s", e)
+
+
+def warm_up():
+    """Start loading the encoding in the background. Only the first call does anything."""
+    global _started
+    with _loading:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_load, name="buddy-tiktoken-load", daemon=True).start()
+
+
+def count_tokens(text: str) -> int:
+    """Count (or estimate) the number of tokens in `text`."""
+    if not text:
+        return 0
+    encoding = _encoding
+    if encoding is None:
+        warm_up()
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,192 @@
+"""
+Tool execution node.
+
+Replaces the prebuilt `ToolNode` so the graph controls how tool calls run: all calls from one AI message run
+concurrently, bounded by a per-run and a process-wide limit, each call has its own deadline (which includes waiting for
+a slot) and is given up on when it passes it, and every call's latency is recorded on its ToolMessage.
+"""
+import asyncio
+import logging
+import time
+import weakref
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from langgraph.types import Command
+
+from buddy import events, telemetry
+
+logger = logging.getLogger(__name__)
+
+# Per-tool deadlines in seconds. query_db passes what is left of its deadline to Postgres as the statement timeout.
+DEFAULT_TIMEOUTS = {
+    "query_db": 20.0,
+    "league_summary": 20.0,
+    "optimize_lineup": 20.0,
+    "find_trades": 20.0,
+    "make_chart": 10.0,
+}
+
+
+async def _acquire(run_semaphore: asyncio.Semaphore, global_semaphore: asyncio.Semaphore):
+    """Take a slot in both semaphores, or neither if cancelled while waiting."""
+    await run_semaphore.acquire()
+    try:
+        await global_semaphore.acquire()
+    except BaseException:
+        run_semaphore.release()
+        raise
+
+
+class ToolExecutor:
+    """Runs the tool calls of the last AI message concurrently.
+
+    Attributes:
+        tools: The tools that can be called.
+        timeouts: Deadline in seconds per tool name, including time spent waiting for a free slot.
+        default_timeout: Deadline for tools not listed in `timeouts`.
+        per_run_limit: Maximum concurrent tool calls within one graph run.
+        global_limit: Maximum concurrent tool calls across all runs in the process, which bounds DB load.
+    """
+
+    def __init__(
+            self,
+            tools: List[BaseTool],
+            timeouts: Optional[dict[str, float]] = None,
+            default_timeout: float = 30.0,
+            per_run_limit: int = 4,
+            global_limit: int = 16
+    ):
+        self.tools_by_name = {t.name: t for t in tools}
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.default_timeout = default_timeout
+        self.per_run_limit = per_run_limit
+        self.global_limit = global_limit
+        # asyncio primitives belong to one event loop, so the process-wide limit is kept per loop
+        self._global_semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _global_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._global_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._global_semaphores[loop] = asyncio.Semaphore(self.global_limit)
+        return semaphore
+
+    async def _invoke(self, tool: BaseTool, tool_call: dict, config: RunnableConfig, deadline: float,
+                      run_semaphore: asyncio.Semaphore):
+        """Run one tool call once it gets a slot in both limits, and give up on it at `deadline`.
+
+        The slots are held until the call really ends. A sync tool runs on a worker thread that can't be stopped,
+        so after the deadline the caller gets a timeout while the slots stay taken until the thread returns; that
+        keeps timed-out queries from piling up beyond the limits.
+        """
+        global_semaphore = self._global_semaphore()
+        loop = asyncio.get_running_loop()
+        await asyncio.wait_for(_acquire(run_semaphore, global_semaphore), deadline - loop.time())
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            run_semaphore.release()
+            global_semaphore.release()
+            raise asyncio.TimeoutError
+
+        configurable = {
+            **config.get("configurable", {}),
+            # Only what is left of the deadline after waiting for a slot
+            "statement_timeout_ms": max(1, int(remaining * 1000)),
+            "tool_call_id": tool_call["id"],
+        }
+        call = asyncio.ensure_future(
+            tool.ainvoke({**tool_call, "type": "tool_call"}, {**config, "configurable": configurable})
+        )
+
+        def release(_):
+            run_semaphore.release()
+            global_semaphore.release()
+
+        call.add_done_callback(release)
+        try:
+            done, _ = await asyncio.wait({call}, timeout=remaining)
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        if not done:
+            if getattr(tool, "coroutine", None) is not None:
+                # Async tools stop when cancelled; sync ones finish on their thread and release the slots then
+                call.cancel()
+            else:
+                # The result is never read, so don't let a late exception be logged as unretrieved
+                call.add_done_callback(lambda f: f.cancelled() or f.exception())
+            raise asyncio.TimeoutError
+        return call.result()
+
+    async def _call(self, tool_call: dict, config: RunnableConfig, run_semaphore: asyncio.Semaphore):
+        name = tool_call["name"]
+        tool = self.tools_by_name.get(name)
+        timeout = self.timeouts.get(name, self.default_timeout)
+        started = time.perf_counter()
+
+        if tool is None:
+            result = ToolMessage(
+                content=f"Error: {name} is not a valid tool, try one of {list(self.tools_by_name)}.",
+                name=name, tool_call_id=tool_call["id"], status="error"
+            )
+        else:
+            events.tool_event("started", name, tool_call["id"])
+            deadline = asyncio.get_running_loop().time() + timeout
+            try:
+                with telemetry.span(f"tool.{name}"):
+                    result = await self._invoke(tool, tool_call, config, deadline, run_semaphore)
+            except asyncio.TimeoutError:
+                result = ToolMessage(
+                    content=f"Error: {name} did not finish within {timeout:.0f}s and was stopped. "
+                            f"Simplify the request (e.g. a narrower query) and try again.",
+                    name=name, tool_call_id=tool_call["id"], status="error"
+                )
+            except Exception as e:
+                result = ToolMessage(
+                    content=f"Error: {repr(e)}\n Please fix your mistakes.",
+                    name=name, tool_call_id=tool_call["id"], status="error"
+                )
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        logger.info("Tool %s finished in %.0fms", name, latency_ms)
+        artifact = getattr(result, "artifact", None)
+        events.tool_event(
+            "finished", name, tool_call["id"],
+            duration_ms=round(latency_ms, 1),
+            status=getattr(result, "status", "success"),
+            rows=artifact.get("rows") if isinstance(artifact, dict) else None
+        )
+        return result, latency_ms
+
+    async def arun(self, state, config: RunnableConfig) -> dict:
+        """Graph node: execute the tool calls of the last message and return the resulting state update."""
+        message = state.messages[-1]
+        if not isinstance(message, AIMessage) or not message.tool_calls:
+            return {}
+
+        # Tools read the conversation's league and user from the config rather than from the model's arguments
+        config = {**config, "configurable": {
+            **config.get("configurable", {}),
+            "league_id": getattr(state, "league_id", ""),
+            "username": getattr(state, "username", ""),
+        }}
+        run_semaphore = asyncio.Semaphore(self.per_run_limit)
+        results = await asyncio.gather(*(self._call(tc, config, run_semaphore) for tc in message.tool_calls))
+
+        messages, update = [], {}
+        for result, latency_ms in results:
+            if isinstance(result, Command):
+                result_update = dict(result.update or {})
+                tool_messages = result_update.pop("messages", [])
+                update.update(result_update)
+            else:
+                tool_messages = [result]
+            for tool_message in tool_messages:
+                if isinstance(tool_message, ToolMessage):
+                    tool_message.response_metadata = {**tool_message.response_metadata, "latency_ms": latency_ms}
+                messages.append(tool_message)
+
+        return {**update, "messages": messages}
@@ -3,12 +3,23 @@ Tools for the agent to use.
 """
 from langchain_core.tools import tool
 from sqlalchemy import create_engine, text, Engine
-import pandas as pd
-from buddy import env
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from buddy import env, events, replica, sql_guard, charts, telemetry
 from langgraph.types import Command
 from langchain_core.tools.base import InjectedToolCallId
-from typing import Annotated
+from typing import Annotated, Literal, Optional, TYPE_CHECKING
 from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
 
 
 class ServerSession:
@@ -17,14 +28,30 @@ class ServerSession:
     In practice, this would be a separate service from where the agent is running and the agent would communicate with it using a REST API. In this simplified example, we use it to persist the db engine and data returned from the query_db tool.
     """
 
+    # How long a looked-up ingest version is trusted before asking Postgres again
+    DATA_VERSION_TTL = 30
+    # How many query results are kept for follow-up tools such as make_chart
+    MAX_RESULTS = 64
+
     def __init__(self):
-        self.engine: Engine = None
-        self.df: pd.DataFrame = None
+        self._engine: Engine = None
+        self._engine_lock = threading.Lock()
+        self.df: "pd.DataFrame" = None
+        self.results: OrderedDict[str, "pd.DataFrame"] = OrderedDict()
+        self._results_lock = threading.Lock()
+        self._data_versions: dict[str, tuple[float, int | None]] = {}
 
-        self.engine = self._get_engine()
+    @property
+    def engine(self) -> Engine:
+        """The pooled engine, created on first use so importing the graph never touches the database."""
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    self._engine = self._get_engine()
+        return self._engine
 
     def _get_engine(self):
-        if self.engine is None:
+        if self._engine is None:
             # Configure SQLAlchemy for session pooling
             _engine = create_engine(
                 env.SUPABASE_URL,
@@ -45,41 +72,360 @@ class ServerSession:
                 }
             )
             return _engine
-        return self.engine
+        return self._engine
+
+    def warm_up(self, connections: int = 2) -> threading.Thread:
+        """Create the engine and open a few pooled connections in a background thread.
+
+        Called on the first graph run so the TCP/TLS handshakes overlap with the first LLM call instead of
+        delaying the first query_db.
+
+        Args:
+            connections: The number of connections to open and return to the pool.
+
+        Returns:
+            threading.Thread: The started warm-up thread.
+        """
+        def _warm():
+            started = time.perf_counter()
+            conns = []
+            try:
+                for _ in range(connections):
+                    conn = self.engine.connect()
+                    conn.execute(text("SELECT 1"))
+                    conns.append(conn)
+            except Exception as e:
+                logger.warning("Engine warm-up failed: %s", e)
+            finally:
+                for conn in conns:
+                    conn.close()
+            logger.info("Warmed %d pooled connections in %.2fs", len(conns), time.perf_counter() - started)
+
+        thread = threading.Thread(target=_warm, name="buddy-engine-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def data_version(self, league_id: str) -> int | None:
+        """Return the latest ingested data version for a league, cached for a few seconds.
+
+        Returns None if the league has never been ingested or the version can't be read.
+        """
+        now = time.monotonic()
+        cached = self._data_versions.get(league_id)
+        if cached is not None and now - cached[0] < self.DATA_VERSION_TTL:
+            return cached[1]
+
+        try:
+            with self.engine.connect() as conn:
+                version = conn.execute(
+                    text("SELECT data_version FROM public.ingest_versions WHERE league_id = :league_id"),
+                    {"league_id": league_id}
+                ).scalar()
+        except Exception:
+            version = None
+
+        self._data_versions[league_id] = (now, version)
+        return version
+
+    def forget_data_version(self, league_id: str):
+        """Drop the cached data version so the next lookup reads it from Postgres, e.g. right after an ingest."""
+        self._data_versions.pop(league_id, None)
+
+    async def adata_version(self, league_id: str) -> int | None:
+        """Async `data_version`. Cached versions are returned without leaving the event loop."""
+        cached = self._data_versions.get(league_id)
+        if cached is not None and time.monotonic() - cached[0] < self.DATA_VERSION_TTL:
+            return cached[1]
+        return await asyncio.to_thread(self.data_version, league_id)
+
+    def store_result(self, df: "pd.DataFrame") -> str:
+        """Keep a query result so later tool calls can reference it by id.
+
+        Returns:
+            str: The result id.
+        """
+        result_id = f"r_{uuid.uuid4().hex[:8]}"
+        with self._results_lock:
+            self.df = df
+            self.results[result_id] = df
+            while len(self.results) > self.MAX_RESULTS:
+                self.results.popitem(last=False)
+        return result_id
+
+    def get_result(self, result_id: str) -> Optional["pd.DataFrame"]:
+        with self._results_lock:
+            df = self.results.get(result_id)
+            if df is not None:
+                self.results.move_to_end(result_id)
+            return df
 
 
 # Create a global instance of the ServerSession
 session = ServerSession()
 
 
-@tool
-def query_db(query: str) -> str:
+@tool(response_format="content_and_artifact")
+def query_db(query: str, config: RunnableConfig) -> tuple[str, dict | None]:
     """Query the database using Postgres SQL.
 
     Args:
         query: The SQL query to execute. Must be a valid postgres SQL string that can be executed directly.
+        config: Injected run config; `statement_timeout_ms` in `configurable` lowers the statement timeout to the
+            tool call's deadline.
 
     Returns:
-        str: The query result as a markdown table.
+        str: The query result as a markdown table, followed by the result id that make_chart can plot.
     """
+    import pandas as pd
+
     try:
-        # Use the global engine in the server session to connect to Supabase
-        with session.engine.connect().execution_options(
-                isolation_level="READ COMMITTED"
-        ) as conn:
-            result = conn.execute(text(query))
+        # Reject writes and multi-statement input, and cap unbounded result sets before touching a connection
+        query, row_cap = sql_guard.prepare(query)
 
-            columns = list(result.keys())
-            rows = result.fetchall()
-            df = pd.DataFrame(rows, columns=columns)
+        # Serve league-scoped reads from the local replica when it is up to date with the latest ingest
+        league_id = replica.league_in_query(query)
+        if league_id and replica.enabled():
+            with telemetry.span("replica.query"):
+                df = replica.reader.query(query, league_id, data_version=session.data_version(league_id))
+            if df is not None:
+                with telemetry.span("render", rows=len(df)):
+                    return _format_result(df, session.store_result(df), row_cap=row_cap)
 
-            # Store the DataFrame in the server session
-            session.df = df
+        # Use the global engine in the server session to connect to Supabase
+        with telemetry.span("db.checkout"):
+            conn = session.engine.connect().execution_options(isolation_level="READ COMMITTED")
+        with conn:
+            conn.execute(text("SET TRANSACTION READ ONLY"))
+            # Stop the statement server-side when the tool call times out instead of letting it run on
+            timeout_ms = (config or {}).get("configurable", {}).get("statement_timeout_ms")
+            if timeout_ms:
+                conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+            with telemetry.span("db.execute"):
+                query, budget_cap = sql_guard.enforce_budget(conn, query)
+                row_cap = min(filter(None, (row_cap, budget_cap)), default=None)
+                # A server-side cursor, so rows arrive batch by batch and the progress events are real progress.
+                # Only this statement: SET and EXPLAIN can't run through a named cursor.
+                result = conn.execute(text(query).execution_options(stream_results=True))
+
+            with telemetry.span("db.fetch") as fetch_span:
+                columns = list(result.keys())
+                rows = _fetch_with_progress(result, columns, events.tool_call_id(config))
+                df = pd.DataFrame(rows, columns=columns)
+                fetch_span.set(rows=len(df))
 
             conn.close()  # Explicitly close the connection
-        return df.to_markdown(index=False)
+
+        # Store the DataFrame in the server session
+        with telemetry.span("render", rows=len(df)):
+            return _format_result(df, session.store_result(df), row_cap=row_cap)
+    except sql_guard.PreflightError as e:
+        return f"Query rejected before execution: {str(e)}", None
     except Exception as e:
-        return f"Error executing query: {str(e)}"
+        return f"Error executing query: {str(e)}", None
+
+
+# Rows fetched per round trip while streaming progress events
+FETCH_BATCH = 500
+
+
+def _fetch_with_progress(result, columns: list[str], tool_call_id: Optional[str]) -> list:
+    """Fetch all rows in batches, sending a preview of the first rows and a running row count to the stream."""
+    import pandas as pd
+
+    rows = []
+    while batch := result.fetchmany(FETCH_BATCH):
+        if not rows:
+            preview = pd.DataFrame(batch[:events.PREVIEW_ROWS], columns=columns)
+            events.tool_event(
+                "preview", "query_db", tool_call_id,
+                rows=len(preview), columns=[str(c) for c in columns], preview=preview.to_markdown(index=False)
+            )
+        rows.extend(batch)
+        if len(batch) == FETCH_BATCH:
+            events.tool_event("progress", "query_db", tool_call_id, rows=len(rows))
+    return rows
+
 
+def _format_result(df: "pd.DataFrame", result_id: str, row_cap: Optional[int] = None) -> tuple[str, dict]:
+    """Render a result for the model. The artifact stays out of the prompt and lets history compaction
+    describe the result without re-reading the table.
+
+    `row_cap` is the LIMIT query_db added to the statement, if any. When the result fills it, the model is told the
+    rows may be incomplete rather than reading them as the full answer.
+    """
+    content = f"{df.to_markdown(index=False)}\n\nresult_id: {result_id} ({len(df)} rows)"
+    artifact = {"result_id": result_id, "rows": len(df), "columns": [str(c) for c in df.columns]}
+    if row_cap is not None and len(df) >= row_cap:
+        content += (
+            f"\nCapped at {row_cap} rows: there may be more. Aggregate, filter or add your own ORDER BY ... LIMIT "
+            f"if the rest matters."
+        )
+        artifact["capped_at"] = row_cap
+    return content, artifact
+
+
+@tool(response_format="content_and_artifact")
+def league_summary(
+        summary: Literal["my_roster", "standings", "top_free_agents", "this_week_matchup"],
+        config: RunnableConfig
+) -> tuple[str, dict | None]:
+    """Get a common league summary, usually prefetched right after the league was loaded.
+
+    Args:
+        summary: Which summary to get:
+            - my_roster: the user's players with per-game season averages and fantasy points per game under the
+              league's scoring
+            - standings: every team's record and points for/against
+            - top_free_agents: the 5 best unrostered players per position
+            - this_week_matchup: the user's team and opponent in the current matchup
+        config: Injected run config carrying the league_id and username of the conversation.
+
+    Returns:
+        str: The summary as a markdown table, followed by the result id that make_chart can plot.
+    """
+    from buddy import prefetch
+
+    configurable = (config or {}).get("configurable", {})
+    league_id, username = configurable.get("league_id", ""), configurable.get("username", "")
+    if not league_id:
+        return "Error: no league is loaded for this conversation. Use query_db instead.", None
+    if summary in prefetch.PERSONAL and not username:
+        return "Error: the username is unknown, so there is no 'my' team. Ask the user for it.", None
+
+    try:
+        df = prefetch.get(summary, league_id, username)
+    except Exception as e:
+        return f"Error getting summary: {str(e)}", None
+    with telemetry.span("render", rows=len(df)):
+        return _format_result(df, session.store_result(df))
+
+
+@tool(response_format="content_and_artifact")
+def optimize_lineup(config: RunnableConfig, team: Optional[str] = None) -> tuple[str, dict | None]:
+    """Find the best possible starting lineup for a team. The slot assignment is solved exactly, so prefer this
+    tool over reasoning about lineups yourself.
+
+    Args:
+        config: Injected run config carrying the league_id and username of the conversation.
+        team: Username or display name of the team. Defaults to the user's own team.
+
+    Returns:
+        str: The best lineup as a markdown table (starting slots, then the bench) with each player's projected
+            fantasy points per game under the league's scoring, followed by the projected total and the gain
+            over the current starters.
+    """
+    from buddy import lineup
+
+    configurable = (config or {}).get("configurable", {})
+    league_id, username = configurable.get("league_id", ""), configurable.get("username", "")
+    if not league_id:
+        return "Error: no league is loaded for this conversation. Use query_db instead.", None
+    if not (team or username):
+        return "Error: the username is unknown, so there is no 'my' team. Ask the user for it.", None
+
+    try:
+        league = lineup.load(league_id)
+        roster_id = league.find_roster(team or username)
+        if roster_id is None:
+            return f"Error: no team named '{team or username}' in this league.", None
+        with telemetry.span("lineup.optimize"):
+            df, projected, current = lineup.best_lineup(league, roster_id)
+    except Exception as e:
+        return f"Error optimizing the lineup: {str(e)}", None
+    with telemetry.span("render", rows=len(df)):
+        content, artifact = _format_result(df, session.store_result(df))
+    summary = f"Projected: {projected} fantasy points per game; current starters: {current} ({projected - current:+.2f})."
+    return f"{content}\n{summary}", artifact
+
+
+@tool(response_format="content_and_artifact")
+def find_trades(config: RunnableConfig, partner: Optional[str] = None, top_k: int = 10) -> tuple[str, dict | None]:
+    """Find the best balanced trades for the user's team. Every 1-for-1 and 2-for-1 trade with every other team is
+    evaluated at once, so use this instead of exploring trades one by one with query_db.
+
+    Deltas come from real lineups that respect G/F/C eligibility, and the ranking is exact: no unlisted trade of
+    these shapes is more balanced. A 2-for-1 whose extra player changes neither lineup is listed as the 1-for-1.
+
+    Args:
+        config: Injected run config carrying the league_id and username of the conversation.
+        partner: Username or display name of a team to trade with. Defaults to every other team.
+        top_k: The number of trades to return.
+
+    Returns:
+        str: The trades as a markdown table: the partner, the players given and received, the change of each
+            side's best lineup in projected fantasy points per game (your_delta, their_delta), and the value of the
+            players each side gives up (z-scores of game_score, fantasy points per game and rank_std).
+    """
+    from buddy import lineup, trades
+
+    configurable = (config or {}).get("configurable", {})
+    league_id, username = configurable.get("league_id", ""), configurable.get("username", "")
+    if not league_id:
+        return "Error: no league is loaded for this conversation. Use query_db instead.", None
+    if not username:
+        return "Error: the username is unknown, so there is no 'my' team. Ask the user for it.", None
+
+    try:
+        league = lineup.load(league_id)
+        roster_id = league.find_roster(username)
+        if roster_id is None:
+            return f"Error: no team for user '{username}' in this league.", None
+        partner_id = None
+        if partner:
+            partner_id = league.find_roster(partner)
+            if partner_id is None:
+                return f"Error: no team named '{partner}' in this league.", None
+        with telemetry.span("trades.find"):
+            df = trades.find(league, roster_id, partner_id, top_k=max(1, min(top_k, 50)))
+    except Exception as e:
+        return f"Error finding trades: {str(e)}", None
+    if df.empty:
+        return "No 1-for-1 or 2-for-1 trade improves your lineup.", None
+    with telemetry.span("render", rows=len(df)):
+        return _format_result(df, session.store_result(df))
+
+
+@tool
+def make_chart(
+        result_id: str,
+        chart_type: Literal["bar", "line", "scatter", "histogram"],
+        x: str,
+        tool_call_id: Annotated[str, InjectedToolCallId],
+        y: Optional[str] = None,
+        color: Optional[str] = None,
+        aggregate: Optional[Literal["sum", "mean", "count", "min", "max"]] = None,
+        title: str = ""
+) -> Command:
+    """Draw a chart from a previous query_db result without re-sending its data.
+
+    Args:
+        result_id: The result_id printed under a query_db result.
+        chart_type: The kind of chart to draw.
+        x: Column for the x-axis (the value to bin for a histogram).
+        y: Column for the y-axis. Not needed for a histogram.
+        color: Optional column to split the series by.
+        aggregate: Optional aggregation of y per x (and color) value, e.g. "mean" points per week.
+        title: The chart title.
+
+    Returns:
+        Command: Updates the chart shown to the user.
+    """
+    df = session.get_result(result_id)
+    if df is None:
+        content = f"Error creating chart: unknown result_id {result_id}. Run query_db again and use its result_id."
+        return Command(update={"messages": [ToolMessage(content=content, tool_call_id=tool_call_id, status="error")]})
+
+    try:
+        chart_json, points = charts.build_chart_json(
+            df, chart_type=chart_type, x=x, y=y, color=color, aggregate=aggregate, title=title
+        )
+    except Exception as e:
+        content = f"Error creating chart: {str(e)}"
+        return Command(update={"messages": [ToolMessage(content=content, tool_call_id=tool_call_id, status="error")]})
 
+    content = f"Chart created ({chart_type}, {points} points). It is shown to the user below your answer."
+    return Command(update={
+        "chart_json": chart_json,
+        "messages": [ToolMessage(content=content, tool_call_id=tool_call_id)]
+    })
 
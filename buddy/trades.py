@@ -0,0 +1,341 @@
+"""
+Batch trade evaluation.
+
+`find()` evaluates every 1-for-1 and 2-for-1 trade (in both directions) between the user and every other team of a
+league. A 12-team league with 13-man rosters has about 24,000 candidates, too many to solve every lineup exactly, so
+the search screens them first:
+
+1. Screening, in one vectorized pass, bounds each side's lineup after every candidate from above. A team's best
+   lineup is a linear program whose dual gives each starting slot and player a price, with slot + player prices
+   covering the player's projection in every slot he may fill. The prices of the players a team keeps and of the
+   slots, plus the cheapest prices that cover the incoming players under the same slot prices, bound the lineup
+   after the trade. Two sets of prices are used, from each team's lineup without one slot and without one player,
+   and the smaller bound wins. Unlike a sum of the best projections, the bound respects positions.
+2. Candidates are re-scored exactly in batches (`lineup.best_points()` on stacks of lineups), in order of their
+   bound, until no remaining bound can beat the trades found. The ranking is therefore exact.
+
+A trade is balanced when both sides improve their lineup: trades are ranked by the smaller of the two deltas, so a
+trade that helps the user a lot and hurts the partner ranks below a smaller win-win. A 2-for-1 whose extra player
+changes neither lineup (a bench throw-in) is dropped in favor of the 1-for-1 it contains. The side that receives two
+players for one is assumed to drop a bench player. Each player also gets a value score from game_score, fantasy
+points per game and rank_std (weighted 65:35 as in the system prompt), reported as the value each side gives up.
+"""
+from typing import TYPE_CHECKING, Optional
+
+from buddy import lineup, telemetry
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Weight of (game_score and fantasy points per game) vs rank_std in a player's value
+PRODUCTION_WEIGHT, RANK_WEIGHT = 0.65, 0.35
+
+# Candidates re-scored exactly per batch; a stack of lineups is much cheaper per lineup than one at a time
+RESCORE_BATCH = 64
+
+
+def player_values(players: "pd.DataFrame") -> "np.ndarray":
+    """Value score of each player: a weighted sum of z-scores of game_score, fantasy points per game and rank_std
+    (lower ranks are better). Missing stats count as the worst value seen."""
+    import numpy as np
+
+    def z(column: "pd.Series") -> "np.ndarray":
+        values = column.to_numpy(dtype=float, na_value=np.nan)
+        if np.isnan(values).all():
+            return np.zeros(len(values))
+        values = np.where(np.isnan(values), np.nanmin(values), values)
+        std = values.std()
+        return (values - values.mean()) / std if std else np.zeros(len(values))
+
+    production = (z(players["game_score"]) + z(players["fantasy_ppg"])) / 2
+    return PRODUCTION_WEIGHT * production + RANK_WEIGHT * z(-players["rank_std"])
+
+
+def _sets(n: int, size: int) -> "np.ndarray":
+    """All index sets of one or two of n players, as rows padded with -1."""
+    import numpy as np
+
+    if size == 1:
+        return np.column_stack([np.arange(n), np.full(n, -1)])
+    first, second = np.triu_indices(n, k=1)
+    return np.column_stack([first, second])
+
+
+def _candidates(n_user: int, partner_sizes: list[int]) -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """Every (give, get) pair of a 1-for-1, 2-for-1 or 1-for-2 trade with every partner.
+
+    Returns:
+        tuple: (partner, give, get). `partner` is the partner's position in `partner_sizes`; `give` and `get` are
+            (candidates x 2) local indices into the user's and the partner's roster, padded with -1.
+    """
+    import numpy as np
+
+    partners, gives, gets = [], [], []
+    for p, n_partner in enumerate(partner_sizes):
+        for give_size, get_size in ((1, 1), (2, 1), (1, 2)):
+            give, get = _sets(n_user, give_size), _sets(n_partner, get_size)
+            if not len(give) or not len(get):
+                continue
+            gives.append(np.repeat(give, len(get), axis=0))
+            gets.append(np.tile(get, (len(give), 1)))
+            partners.append(np.full(len(give) * len(get), p))
+    if not partners:
+        empty = np.empty((0, 2), dtype=int)
+        return np.empty(0, dtype=int), empty, empty
+    return np.concatenate(partners), np.concatenate(gives), np.concatenate(gets)
+
+
+def _team(players: "pd.DataFrame", slots: list[str]) -> tuple["np.ndarray", "np.ndarray"]:
+    """A team's slot eligibility matrix and projections, for `lineup.best_points()`."""
+    positions = [lineup.positions_of(p) for p in players["fantasy_positions"]]
+    return lineup.eligibility(slots, positions).reshape(len(slots), len(players)), \
+        players["projection"].to_numpy(dtype=float)
+
+
+def _stack(teams: list[tuple]) -> tuple["np.ndarray", "np.ndarray"]:
+    """The teams' eligibility matrices and projections, padded with players no slot accepts to the largest roster."""
+    import numpy as np
+
+    slots = teams[0][0].shape[0]
+    width = max([len(value) for _, value in teams] + [1])
+    eligible, values = np.zeros((len(teams), slots, width), dtype=bool), np.zeros((len(teams), width))
+    for t, (team_eligible, value) in enumerate(teams):
+        eligible[t, :, :len(value)], values[t, :len(value)] = team_eligible, value
+    return eligible, values
+
+
+def _prices(eligible: "np.ndarray", values: "np.ndarray") -> tuple["np.ndarray", list[tuple]]:
+    """Best lineup points of each team, and two sets of dual prices (slot prices, player prices) per team.
+
+    Any slot prices u >= 0 with player prices v = max(0, max over the player's slots of projection - u) bound the
+    best lineup by sum(u) + sum(v). The prices used are each slot's and each player's marginal value to the lineup,
+    which make that bound tight for the current roster.
+    """
+    import numpy as np
+
+    teams, slots, width = eligible.shape
+    # Per team: the roster as is, without each slot, then without each player
+    stacked = np.repeat(eligible[:, None], 1 + slots + width, axis=1)
+    stacked[:, 1 + np.arange(slots), np.arange(slots), :] = False
+    stacked[:, 1 + slots + np.arange(width), :, np.arange(width)] = False
+    points = lineup.best_points(
+        stacked.reshape(-1, slots, width), np.repeat(values, 1 + slots + width, axis=0)
+    ).reshape(teams, 1 + slots + width)
+    best = points[:, 0]
+    covered = np.where(eligible, values[:, None, :], -np.inf)
+
+    slot_prices = np.maximum(best[:, None] - points[:, 1:1 + slots], 0.0)
+    player_prices = np.maximum((covered - slot_prices[:, :, None]).max(axis=1), 0.0)
+    by_slot = slot_prices, player_prices
+
+    player_prices = np.maximum(best[:, None] - points[:, 1 + slots:], 0.0)
+    slot_prices = np.maximum((covered - player_prices[:, None, :]).max(axis=2), 0.0)
+    by_player = slot_prices, player_prices
+    return best, [by_slot, by_player]
+
+
+def _cover(eligible: "np.ndarray", values: "np.ndarray", slot_prices: "np.ndarray") -> "np.ndarray":
+    """The price each player of a team would need to join a lineup with the given slot prices, for every pair of
+    (prices, team): (len(slot_prices) x teams x players)."""
+    import numpy as np
+
+    need = values[None, :, None, :] - slot_prices[:, None, :, None]
+    return np.maximum(np.where(eligible[None], need, -np.inf).max(axis=2), 0.0)
+
+
+def _sum_at(matrix: "np.ndarray", rows: "np.ndarray", index: "np.ndarray") -> "np.ndarray":
+    """Sum of matrix[rows, index[:, j]] over the columns of `index`, skipping -1 padding."""
+    import numpy as np
+
+    rows = np.broadcast_to(rows, (index.shape[1], len(index))).T
+    return np.where(index >= 0, matrix[rows, np.maximum(index, 0)], 0.0).sum(axis=1)
+
+
+def screen(user: tuple, partners: list[tuple]) -> dict[str, "np.ndarray"]:
+    """Upper bounds of both sides' lineup deltas for every candidate trade.
+
+    Args:
+        user: The user's team, as (eligibility matrix, projections).
+        partners: Each partner's team, likewise.
+
+    Returns:
+        dict: Arrays over all candidates: partner, give, get (as in `_candidates`), user_bound and partner_bound, and
+            the current best lineup points of the user (user_before) and of each partner (partner_before).
+    """
+    import numpy as np
+
+    partner, give, get = _candidates(len(user[1]), [len(p[1]) for p in partners])
+    eligible, values = _stack([user, *partners])
+    best, prices = _prices(eligible, values)
+    user_bound = partner_bound = np.inf
+    for slot_prices, player_prices in prices:
+        total = slot_prices.sum(axis=1) + player_prices.sum(axis=1)
+        # What the user pays for each partner player under the user's slot prices, and each partner for the user's
+        user_cover = _cover(eligible[1:], values[1:], slot_prices[:1])[0]
+        partner_cover = _cover(eligible[:1], values[:1], slot_prices[1:])[:, 0]
+        user_bound = np.minimum(
+            user_bound,
+            total[0] - _sum_at(player_prices[:1], np.zeros_like(partner), give) + _sum_at(user_cover, partner, get),
+        )
+        partner_bound = np.minimum(
+            partner_bound,
+            total[1 + partner] - _sum_at(player_prices[1:], partner, get) + _sum_at(partner_cover, partner, give),
+        )
+    return {
+        "partner": partner,
+        "give": give,
+        "get": get,
+        "user_bound": user_bound - best[0],
+        "partner_bound": partner_bound - best[1 + partner],
+        "user_before": best[0],
+        "partner_before": best[1:],
+    }
+
+
+def rescore(user: tuple, partners: list[tuple], partner: "np.ndarray", give: "np.ndarray", get: "np.ndarray"
+            ) -> tuple["np.ndarray", "np.ndarray"]:
+    """Exact best lineup points of both sides after each trade, solved as one stack of lineups.
+
+    Args:
+        user: The user's team, as (eligibility matrix, projections).
+        partners: Each partner's team, likewise.
+        partner, give, get: The trades, as in `_candidates`.
+
+    Returns:
+        tuple: (user points, partner points) after each trade.
+    """
+    import numpy as np
+
+    eligible, values = _stack([user, *partners])
+    rows = np.arange(len(partner))
+
+    def after(team: "np.ndarray", out: "np.ndarray", incoming: "np.ndarray", taken: "np.ndarray") -> tuple:
+        # The team's roster without the `out` players, then the `taken` players of `incoming` (or nobody)
+        kept_eligible, kept_values = eligible[team], values[team]
+        for j in range(out.shape[1]):
+            gone = out[:, j] >= 0
+            kept_eligible[rows[gone], :, out[gone, j]] = False
+        taken_eligible = np.take_along_axis(eligible[incoming], np.maximum(taken, 0)[:, None, :], axis=2)
+        taken_eligible &= (taken >= 0)[:, None, :]
+        taken_values = np.take_along_axis(values[incoming], np.maximum(taken, 0), axis=1)
+        return np.concatenate([kept_eligible, taken_eligible], axis=2), np.concatenate([kept_values, taken_values], 1)
+
+    user_side = after(np.zeros_like(partner), give, 1 + partner, get)
+    partner_side = after(1 + partner, get, np.zeros_like(partner), give)
+    points = lineup.best_points(
+        np.concatenate([user_side[0], partner_side[0]]), np.concatenate([user_side[1], partner_side[1]])
+    )
+    return points[:len(partner)], points[len(partner):]
+
+
+def _throw_ins(key: tuple) -> list[tuple]:
+    """The 1-for-1 trades inside a 2-for-1 trade `key` of (partner, give, get); none for a 1-for-1."""
+    partner, give, get = key
+    if give[1] >= 0:
+        return [(partner, (g, -1), get) for g in give]
+    if get[1] >= 0:
+        return [(partner, give, (g, -1)) for g in get]
+    return []
+
+
+def ranked(deltas: dict[tuple, tuple[float, float]], top_k: int) -> list[tuple]:
+    """The best `top_k` trades that improve the user's lineup, most balanced first.
+
+    Args:
+        deltas: (your_delta, their_delta), rounded, of trades keyed by (partner, give, get). A 2-for-1 with the same
+            deltas as a 1-for-1 inside it is left out; the 1-for-1 inside must be in `deltas` too.
+        top_k: The number of trades to return.
+
+    Returns:
+        list: The keys of the trades.
+    """
+    kept = [
+        key for key, (yours, theirs) in deltas.items()
+        if yours > 0 and not any(deltas[inner] == (yours, theirs) for inner in _throw_ins(key))
+    ]
+    return sorted(kept, key=lambda k: (-min(deltas[k]), -deltas[k][0], -deltas[k][1], k))[:top_k]
+
+
+def find(
+        league: lineup.League, roster_id: int, partner_id: Optional[int] = None, top_k: int = 10
+) -> "pd.DataFrame":
+    """The best balanced trades between one team and the rest of the league.
+
+    Args:
+        league: The league, from `lineup.load()`.
+        roster_id: The team looking for a trade.
+        partner_id: Only trade with this team. Defaults to every other team.
+        top_k: The number of trades to return.
+
+    Returns:
+        pd.DataFrame: One trade per row: partner, give, get, your_delta and their_delta (lineup change in fantasy
+            points per game), value_given and value_received. Sorted from the most balanced improvement down.
+    """
+    import numpy as np
+    import pandas as pd
+
+    players = league.players.reset_index(drop=True)
+    players = players.assign(value=player_values(players))
+    starting = lineup.starting_slots(league.roster_positions)
+    user = players[players["roster_id"] == roster_id].reset_index(drop=True)
+    partner_ids = [
+        r for r in league.rosters["roster_id"]
+        if r != roster_id and (partner_id is None or r == partner_id)
+    ]
+    partners = [players[players["roster_id"] == r].reset_index(drop=True) for r in partner_ids]
+    columns = ["partner", "give", "get", "your_delta", "their_delta", "value_given", "value_received"]
+    if not partners or not starting:
+        return pd.DataFrame(columns=columns)
+
+    with telemetry.span("trades.screen"):
+        user_team = _team(user, starting)
+        partner_teams = [_team(p, starting) for p in partners]
+        screened = screen(user_team, partner_teams)
+        bound = np.minimum(screened["user_bound"], screened["partner_bound"])
+        candidates = np.flatnonzero(screened["user_bound"] > 0)
+        order = candidates[np.argsort(-bound[candidates], kind="stable")]
+
+    with telemetry.span("trades.rescore") as rescore_span:
+        deltas: dict[tuple, tuple[float, float]] = {}
+        top: list[tuple] = []
+        for start in range(0, len(order), RESCORE_BATCH):
+            # Deltas are rounded, so a bound below the last trade's balance after rounding can't even tie it
+            if len(top) == top_k and round(float(bound[order[start]]), 2) < min(deltas[top[-1]]):
+                break
+            batch = order[start:start + RESCORE_BATCH]
+            keys = [
+                (int(screened["partner"][c]), tuple(int(i) for i in screened["give"][c]),
+                 tuple(int(i) for i in screened["get"][c]))
+                for c in batch
+            ]
+            # The 1-for-1 trades inside the 2-for-1s, to recognize throw-ins
+            todo = list(dict.fromkeys(k for key in keys for k in [*_throw_ins(key), key] if k not in deltas))
+            user_after, partner_after = rescore(
+                user_team, partner_teams,
+                np.array([k[0] for k in todo]), np.array([k[1] for k in todo]), np.array([k[2] for k in todo]),
+            )
+            for key, yours, theirs in zip(todo, user_after, partner_after):
+                deltas[key] = (
+                    round(float(yours - screened["user_before"]), 2),
+                    round(float(theirs - screened["partner_before"][key[0]]), 2),
+                )
+            top = ranked(deltas, top_k)
+        rescore_span.set(candidates=len(deltas))
+
+    names = {r.roster_id: r.display_name or r.username for r in league.rosters.itertuples()}
+    user_names, user_values = user["full_name"].to_numpy(), user["value"].to_numpy()
+    rows = []
+    for key in top:
+        p, give, get = key[0], [i for i in key[1] if i >= 0], [i for i in key[2] if i >= 0]
+        partner = partners[p]
+        rows.append({
+            "partner": names[partner_ids[p]],
+            "give": " + ".join(user_names[give]),
+            "get": " + ".join(partner["full_name"].to_numpy()[get]),
+            "your_delta": deltas[key][0],
+            "their_delta": deltas[key][1],
+            "value_given": round(float(user_values[give].sum()), 2),
+            "value_received": round(float(partner["value"].to_numpy()[get].sum()), 2),
+        })
+    return pd.DataFrame(rows, columns=columns)
@@ -5,7 +5,7 @@ import requests
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from supabase.lib.client_options import ClientOptions
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 import time
 
 load_dotenv()
@@ -40,15 +40,21 @@ SUPABASE_KEY, SUPABASE_URL = get_supabase_credentials()
 
 
 
-def main(username: str = None, league_id: str = None) -> None:
+def main(
+    username: str = None,
+    league_id: str = None,
+    progress: Optional[Callable[[int, str], None]] = None,
+) -> None:
     """
     Main function to extract and upsert Sleeper data.
     
     Args:
         username: Sleeper username (optional, for future use)
         league_id: Sleeper League ID (required)
+        progress: Called with (percent done, description of the current step) before each step.
     """
     url = "https://api.sleeper.app/v1/"
+    report = progress or (lambda percent, step: None)
     
     # If parameters not provided, prompt for them (backward compatibility)
     if league_id is None:
@@ -56,15 +62,30 @@ def main(username: str = None, league_id: str = None) -> None:
     if username is None:
         username = input("Enter Sleeper Username (optional): ")
     
+    report(5, "Fetching league information...")
     get_league_information(url=url, league_id=league_id)
+    report(10, "Fetching players...")
     get_players(url=url)
+    report(25, "Fetching league state...")
     get_state(url=url)
+    report(30, "Fetching rosters...")
     get_league_rosters(url=url, league_id=league_id)
+    report(35, "Fetching league members...")
     get_users(url=url, league_id=league_id)
+    report(40, "Fetching trending players...")
     get_trending_players(url=url)
+    report(45, "Fetching season statistics...")
     get_player_statistics(url=url)
+    report(60, "Fetching matchups...")
     get_matchups(url=url, league_id=league_id)
+    report(65, "Fetching weekly statistics...")
     get_weekly_player_statistics(url=url, league_id=league_id)
+    report(80, "Computing fantasy points...")
+    compute_fantasy_points(league_id=league_id)
+
+    report(90, "Finishing up...")
+    record_ingest(league_id=league_id)
+    report(100, "Data loaded successfully!")
 
 
 def get_players(url:str):
@@ -138,6 +159,30 @@ def get_matchups(url: str, league_id:str):
     rows = transform_matchups(payload, league_id)
     upsert_rows(rows, "matchups")
 
+def compute_fantasy_points(league_id: str):
+    """
+    Score every player's season and weekly stats under the league's scoring_settings into league_fantasy_points.
+    A failure here never fails the ingest; the agent can still compute points in SQL.
+    """
+    try:
+        from buddy import fantasy_points
+        df = fantasy_points.compute(league_id=league_id)
+        # NaN is not valid JSON
+        rows = df.astype(object).where(df.notna(), None).to_dict("records")
+        upsert_rows(rows, "league_fantasy_points")
+    except Exception as e:
+        logging.warning("Could not compute fantasy points for league %s: %s", league_id, e)
+
+def record_ingest(league_id: str) -> int:
+    """
+    Bump the league's data version in ingest_versions so readers can tell their cached copies are stale.
+    :param league_id: the league that was just ingested
+    :return: the new data version (milliseconds since epoch)
+    """
+    data_version = int(time.time() * 1000)
+    upsert_rows([{"league_id": league_id, "data_version": data_version}], "ingest_versions")
+    return data_version
+
 def transform_players_payload(payload: Dict[str, Dict[str, Any]]):
     """
     Transform the raw players dict (keyed by player_id) into a flat list of row dicts
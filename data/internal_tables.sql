@@ -0,0 +1,18 @@
+-- Internal bookkeeping tables used by the ingestion job and the agent.
+-- These are not part of the schema exposed to the LLM.
+
+-- One row per league, bumped every time extract_sleeper_data.main() finishes.
+create table if not exists public.ingest_versions (
+    league_id text primary key,
+    data_version bigint not null,
+    ingested_at timestamptz not null default now()
+);
+
+-- At most one ingest per league at a time across app processes. data/league_loader.py inserts a row before
+-- extracting and deletes it when done; a row past expires_at belongs to a crashed loader and may be taken over.
+create table if not exists public.ingest_locks (
+    league_id text primary key,
+    owner text not null,
+    acquired_at timestamptz not null default now(),
+    expires_at timestamptz not null
+);
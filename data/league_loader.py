@@ -0,0 +1,197 @@
+"""
+Single-flight league loading.
+
+When several members of a league open the app at once, each session used to run `extract_sleeper_data.main` for
+the same league, duplicating every Sleeper fetch and upsert. `loader.load()` makes sure one league is loaded at
+most once at a time:
+
+- Within a process (all Streamlit sessions share one), a second request for a league that is already loading
+  attaches to the running job and sees the same progress.
+- Across processes, a row in `ingest_locks` (see internal_tables.sql) marks the league as loading. Other processes
+  wait for that row to go away instead of starting their own ingest.
+- A league ingested less than `LEAGUE_FRESH_SECONDS` ago (per `ingest_versions`) is not loaded again.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from data.extract_sleeper_data import SUPABASE_KEY, SUPABASE_URL, main as extract_data
+
+logger = logging.getLogger(__name__)
+
+# How long an ingested league is reused before it's loaded again
+LEAGUE_FRESH_SECONDS = int(os.getenv("LEAGUE_FRESH_SECONDS", "900"))
+# How long a lock row is honoured; longer than any real ingest, so only crashed loaders' locks expire
+LOCK_TTL_SECONDS = 600
+# How often a process waiting on another process's ingest checks on it
+LOCK_POLL_SECONDS = 2.0
+
+
+class LoadJob:
+    """One league load, shared by every session that asked for it while it was running.
+
+    Attributes:
+        league_id: The league being loaded.
+        percent: Progress of the load, 0-100.
+        step: Description of the current step.
+        reused: True if no ingest ran because fresh data (or another process's ingest) was used.
+        error: The exception that failed the load, if any.
+    """
+
+    def __init__(self, league_id: str):
+        self.league_id = league_id
+        self.percent = 0
+        self.step = "Starting..."
+        self.reused = False
+        self.error: Optional[BaseException] = None
+        self._done = threading.Event()
+
+    def report(self, percent: int, step: str):
+        self.percent, self.step = percent, step
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.error = error
+        if error is None:
+            self.report(100, "Data loaded successfully!")
+        self._done.set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the load to finish.
+
+        Args:
+            timeout: Seconds to wait, or None to wait until it finishes.
+
+        Returns:
+            bool: True if the load has finished (successfully or not).
+        """
+        return self._done.wait(timeout)
+
+    def result(self):
+        """Wait for the load and raise its error, if it failed."""
+        self.wait()
+        if self.error is not None:
+            raise self.error
+
+
+class LeagueLoader:
+    """Runs league loads in background threads, at most one per league."""
+
+    def __init__(self, fresh_seconds: int = LEAGUE_FRESH_SECONDS):
+        self.fresh_seconds = fresh_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._jobs: dict[str, LoadJob] = {}
+        self._lock = threading.Lock()
+        self._client = None
+
+    def load(self, league_id: str, username: Optional[str] = None) -> LoadJob:
+        """Load a league, attaching to a load of the same league that is already running in this process.
+
+        Args:
+            league_id: The Sleeper league id.
+            username: The Sleeper username of the session that starts the load.
+
+        Returns:
+            LoadJob: The running (or finished) job. Poll `percent` and `step` while waiting on it.
+        """
+        with self._lock:
+            job = self._jobs.get(league_id)
+            if job is not None and not job.done:
+                logger.info("League %s is already loading, attaching", league_id)
+                return job
+            job = self._jobs[league_id] = LoadJob(league_id)
+
+        threading.Thread(
+            target=self._run, args=(job, username or ""), name="buddy-league-load", daemon=True
+        ).start()
+        return job
+
+    def _run(self, job: LoadJob, username: str):
+        try:
+            if self._is_fresh(job.league_id):
+                job.reused = True
+                job.finish()
+                return
+            while not self._acquire(job.league_id):
+                # Another process is loading this league: wait for it instead of ingesting again
+                job.report(job.percent, "Waiting for another load of this league to finish...")
+                time.sleep(LOCK_POLL_SECONDS)
+                if self._is_fresh(job.league_id):
+                    job.reused = True
+                    job.finish()
+                    return
+            try:
+                extract_data(username=username, league_id=job.league_id, progress=job.report)
+            finally:
+                self._release(job.league_id)
+            job.finish()
+        except Exception as e:
+            logger.exception("Loading league %s failed", job.league_id)
+            job.finish(error=e)
+
+    @property
+    def client(self):
+        if self._client is None:
+            from supabase import create_client
+
+            if not SUPABASE_URL or not SUPABASE_KEY:
+                raise RuntimeError("Supabase key not set")
+            self._client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        return self._client
+
+    def _is_fresh(self, league_id: str) -> bool:
+        """Whether the league was ingested less than `fresh_seconds` ago."""
+        if self.fresh_seconds <= 0:
+            return False
+        try:
+            rows = (self.client.table("ingest_versions")
+                    .select("data_version")
+                    .eq("league_id", league_id)
+                    .execute()
+                    ).data
+        except Exception as e:
+            logger.warning("Could not read the ingest version of league %s: %s", league_id, e)
+            return False
+        if not rows:
+            return False
+        # data_version is the ingest time in milliseconds since the epoch
+        return time.time() - rows[0]["data_version"] / 1000 < self.fresh_seconds
+
+    def _acquire(self, league_id: str) -> bool:
+        """Insert this process's lock row for the league, taking over an expired one. False if it's held."""
+        from postgrest.exceptions import APIError
+
+        now = datetime.now(timezone.utc)
+        locks = self.client.table("ingest_locks")
+        try:
+            locks.delete().eq("league_id", league_id).lt("expires_at", now.isoformat()).execute()
+            locks.insert({
+                "league_id": league_id,
+                "owner": self.owner,
+                "acquired_at": now.isoformat(),
+                "expires_at": (now + timedelta(seconds=LOCK_TTL_SECONDS)).isoformat(),
+            }).execute()
+        except APIError as e:
+            # 23505: unique violation, someone else holds the lock
+            if getattr(e, "code", None) == "23505":
+                return False
+            # E.g. the lock table hasn't been created: load without cross-process coordination
+            logger.warning("Could not take ingest lock for league %s: %s", league_id, e)
+        return True
+
+    def _release(self, league_id: str):
+        try:
+            self.client.table("ingest_locks").delete().eq("league_id", league_id).eq("owner", self.owner).execute()
+        except Exception as e:
+            # The lock expires on its own
+            logger.warning("Could not release ingest lock for league %s: %s", league_id, e)
+
+
+loader = LeagueLoader()
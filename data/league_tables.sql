@@ -0,0 +1,17 @@
+-- Derived league tables written by the ingestion job (data/extract_sleeper_data.py).
+-- Unlike internal_tables.sql, these are documented in buddy/prompts/schema.md for the agent.
+
+-- Fantasy points under each league's own scoring_settings (see buddy/fantasy_points.py).
+-- week 0 holds the season totals; games and fantasy_points_per_game are only set there.
+create table if not exists public.league_fantasy_points (
+    league_id text not null,
+    season text not null,
+    week integer not null,
+    player_id text not null,
+    fantasy_points numeric not null,
+    games numeric,
+    fantasy_points_per_game numeric,
+    inserted_at timestamptz not null default now(),
+    updated_at timestamptz not null default now(),
+    primary key (league_id, season, week, player_id)
+);
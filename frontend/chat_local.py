@@ -1,6 +1,11 @@
+from buddy import env
+from buddy.budget import format_usage
 from buddy.graph import Agent
 from buddy.prompts import prompts
 
+# Local runs keep threads in memory; set CHECKPOINT_URI (e.g. sqlite:///buddy_checkpoints.sqlite) to persist them
+DEFAULT_CHECKPOINT_URI = "memory://"
+
 
 def main():
     try:
@@ -15,7 +20,8 @@ def main():
             name="Buddy",
             system_prompt=prompts.buddy_system_prompt,
             model="gpt-4.1-mini-2025-04-14",
-            temperature=0.1
+            temperature=0.1,
+            checkpoint_uri=env.CHECKPOINT_URI or DEFAULT_CHECKPOINT_URI
         )
 
         # Stream responses
@@ -34,7 +40,10 @@ def main():
                 if message_chunk:
                     print(message_chunk, end="", flush=True)
 
-            thread_state = agent.runnable.get_state(config=config)
+            thread_state = agent.get_state(config=config)
+            usage = format_usage(thread_state.values.get("usage", {}))
+            if usage:
+                print(f"\n\n[{usage}]")
 
             if "chart_json" in thread_state.values:
                 chart_json = thread_state.values["chart_json"]
@@ -0,0 +1,250 @@
+"""
+Streaming client for the LangGraph server, shared by app.py and frontend/chat_deployed.py.
+
+- `SSEParser` parses the server-sent event stream incrementally from raw bytes, following the SSE spec: multi-line
+  `data:` fields, comments, and `\\n`, `\\r\\n` or `\\r` line endings, with events split across network chunks.
+- Event payloads are decoded with orjson when it's installed, and with the standard json module otherwise.
+- `client()` and `async_client()` return pooled keep-alive clients, so a message doesn't pay for a new TCP/TLS
+  connection.
+- `stream_run()` and `astream_run()` yield decoded ("text" | "tool_call" | "tool", payload) items; callers join the
+  text parts once at the end instead of concatenating strings.
+"""
+import asyncio
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator, Optional
+
+import httpx
+
+try:
+    import orjson
+
+    loads = orjson.loads
+except ImportError:
+    import json
+
+    def loads(data: bytes):
+        # json.loads sniffs the encoding of bytes input; the stream is always UTF-8
+        return json.loads(data.decode("utf-8", errors="replace"))
+
+STREAM_MODES = ["messages-tuple", "custom"]
+
+_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=300.0)
+
+
+@dataclass(slots=True)
+class Event:
+    """One dispatched server-sent event.
+
+    Attributes:
+        event: The event type, "message" if the server didn't name one.
+        data: The UTF-8 encoded data, with multiple `data:` lines joined by "\\n". Left as bytes because both JSON
+            decoders read bytes directly.
+        id: The last event id seen on the stream.
+    """
+    event: str
+    data: bytes
+    id: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        return self.data.decode("utf-8", errors="replace")
+
+
+class SSEParser:
+    """Incremental server-sent events parser.
+
+    Feed it chunks as they arrive; each call returns the events completed by that chunk. Lines are split on the raw
+    bytes with `bytes.splitlines`, which breaks on exactly the SSE line endings ("\\r\\n", "\\n" and "\\r") and is
+    safe for UTF-8 since line breaks never occur inside a multi-byte character.
+    """
+
+    def __init__(self):
+        self._pending: list[bytes] = []
+        self._skip_lf = False
+        self._event = ""
+        self._data: list[bytes] = []
+        self._last_id: Optional[str] = None
+        self._first = True
+
+    def feed(self, chunk: bytes | str) -> list[Event]:
+        """Parse a chunk of the stream.
+
+        Args:
+            chunk: The next bytes (or text) of the stream.
+
+        Returns:
+            list[Event]: The events completed by this chunk, in order.
+        """
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        if not chunk:
+            return []
+        if self._first:
+            # A leading byte order mark is ignored
+            if chunk.startswith(b"\xef\xbb\xbf"):
+                chunk = chunk[3:]
+            self._first = False
+        if self._skip_lf:
+            # The previous chunk ended with "\r", already taken as a line end; this "\n" completes it
+            self._skip_lf = False
+            if chunk[:1] == b"\n":
+                chunk = chunk[1:]
+        cut = max(chunk.rfind(b"\n"), chunk.rfind(b"\r"))
+        if cut < 0:
+            # Still inside one line: collect the parts, so long lines aren't copied again on every read
+            self._pending.append(chunk)
+            return []
+        pending = self._pending
+        self._pending = [chunk[cut + 1:]] if cut + 1 < len(chunk) else []
+        self._skip_lf = chunk[cut] == 13 and not self._pending
+        if pending:
+            pending.append(chunk[:cut + 1])
+            buffer = b"".join(pending)
+        else:
+            buffer = chunk[:cut + 1]
+
+        events = []
+        data = self._data
+        for line in buffer.splitlines():
+            # Fast path: nearly every line of a token stream is a data line
+            if line.startswith(b"data:"):
+                data.append(line[6:] if line[5:6] == b" " else line[5:])
+            elif not line:
+                if data:
+                    events.append(Event(
+                        self._event or "message", data[0] if len(data) == 1 else b"\n".join(data), self._last_id
+                    ))
+                    data = self._data = []
+                self._event = ""
+            elif line.startswith(b"event: "):
+                self._event = line[7:].decode("utf-8", errors="replace")
+            elif line[:1] != b":":
+                self._field(line)
+        return events
+
+    def _field(self, line: bytes):
+        field, sep, value = line.decode("utf-8", errors="replace").partition(":")
+        if sep and value[:1] == " ":
+            value = value[1:]
+        if field == "event":
+            self._event = value
+        elif field == "data":
+            # "data" with no colon
+            self._data.append(value.encode())
+        elif field == "id":
+            if "\0" not in value:
+                self._last_id = value
+        # "retry" and unknown fields don't affect parsing
+
+
+def decode(event: Event) -> Optional[tuple[str, object]]:
+    """Turn one LangGraph stream event into something to show.
+
+    Returns:
+        One of ("text", str) for assistant text, ("tool_call", str) with a tool name when the model starts a tool
+        call, ("tool", dict) for tool lifecycle events from the custom stream, or None.
+    """
+    if event.event == "messages":
+        return _message(*loads(event.data))
+    if event.event == "custom":
+        payload = loads(event.data)
+        return ("tool", payload) if isinstance(payload, dict) and payload.get("type") == "tool" else None
+    return None
+
+
+def _message(message_chunk: dict, metadata: dict) -> Optional[tuple[str, object]]:
+    """Printable part of one messages-tuple event."""
+    if message_chunk.get("type") == "AIMessageChunk":
+        rm = message_chunk.get("response_metadata") or {}
+        if rm.get("finish_reason") == "tool_calls":
+            return "text", "\n\n"
+
+        tool_call_chunks = message_chunk.get("tool_call_chunks") or []
+        if tool_call_chunks:
+            # Argument fragments aren't worth showing; the tool name arrives with the first chunk of each call
+            name = tool_call_chunks[0].get("name")
+            return ("tool_call", name) if name else None
+
+        content = message_chunk.get("content")
+        return ("text", content) if content else None
+    if message_chunk.get("type") == "ai" and (
+        (metadata or {}).get("langgraph_node") == "cache_lookup"
+        or "budget_exceeded" in (message_chunk.get("response_metadata") or {})
+    ):
+        # Answer served from the semantic answer cache, or the thread limit reply, sent as one complete message
+        return "text", message_chunk.get("content", "")
+    return None
+
+
+def _new_client(cls, base_url: str):
+    try:
+        return cls(base_url=base_url, http2=True, limits=_LIMITS, timeout=60.0)
+    except ImportError:
+        # httpx without the http2 extra
+        return cls(base_url=base_url, limits=_LIMITS, timeout=60.0)
+
+
+_clients: dict[str, httpx.Client] = {}
+_clients_lock = threading.Lock()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def client(base_url: str) -> httpx.Client:
+    """The process-wide pooled client for `base_url`."""
+    with _clients_lock:
+        if base_url not in _clients:
+            _clients[base_url] = _new_client(httpx.Client, base_url)
+        return _clients[base_url]
+
+
+def async_client(base_url: str) -> httpx.AsyncClient:
+    """The pooled async client for `base_url` on the running event loop. Async connections can't move between
+    loops, so each loop gets its own."""
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    if base_url not in clients:
+        clients[base_url] = _new_client(httpx.AsyncClient, base_url)
+    return clients[base_url]
+
+
+def run_request(message: str, context: Optional[dict] = None, stream_mode: Optional[list[str]] = None) -> dict:
+    """Body of a POST /threads/{thread_id}/runs/stream request for one human message."""
+    return {
+        "assistant_id": "buddy",
+        "input": {
+            "messages": [
+                {"role": "human", "content": message},
+            ],
+            **(context or {}),
+        },
+        "stream_mode": stream_mode or STREAM_MODES,
+    }
+
+
+def stream_run(http: httpx.Client, thread_id: str, body: dict, timeout: float = 60.0) -> Iterator[tuple[str, object]]:
+    """Stream a run and yield the decoded items (see `decode`)."""
+    parser = SSEParser()
+    with http.stream("POST", f"/threads/{thread_id}/runs/stream", json=body, timeout=timeout) as r:
+        r.raise_for_status()
+        for chunk in r.iter_bytes():
+            for event in parser.feed(chunk):
+                item = decode(event)
+                if item is not None:
+                    yield item
+
+
+async def astream_run(
+    http: httpx.AsyncClient, thread_id: str, body: dict, timeout: float = 60.0
+) -> AsyncIterator[tuple[str, object]]:
+    """Async `stream_run`."""
+    parser = SSEParser()
+    async with http.stream("POST", f"/threads/{thread_id}/runs/stream", json=body, timeout=timeout) as r:
+        r.raise_for_status()
+        async for chunk in r.aiter_bytes():
+            for event in parser.feed(chunk):
+                item = decode(event)
+                if item is not None:
+                    yield item